@@ -269,6 +269,136 @@ def human2bytes(
 
 #------------------------------------------------------------------------
 
+def bytes2human(value, precision = 1):
+    '''
+    Converts the given amount of bytes into a human readable string
+    with a binary prefix (e.g. 5.0 MiB, 8.4 GiB). The reverse
+    function of human2bytes().
+
+    @param value:     the amount of bytes to convert
+    @type value:      int, long or float
+    @param precision: number of digits after the decimal point
+    @type precision:  int
+
+    @return: the human readable byte value
+    @rtype:  str
+    '''
+
+    value = float(value)
+    prefixes = ('B', 'KiB', 'MiB', 'GiB', 'TiB', 'PiB')
+
+    i = 0
+    while abs(value) >= 1024 and i < (len(prefixes) - 1):
+        value /= 1024
+        i += 1
+
+    if i == 0:
+        return "%d %s" % (int(value), prefixes[i])
+    return ("%." + str(precision) + "f %s") % (value, prefixes[i])
+
+#------------------------------------------------------------------------
+
+def duration2seconds(duration):
+    '''
+    Converts the given string of the form »1h 30m« in an amount of seconds.
+    It raises a ValueError on invalid values.
+
+    Valid units for durations are:
+        - »s[ec[onds]]« - default, if bare numbers are given
+        - »m[in[utes]]«
+        - »h[ours]«
+        - »d[ays]«
+
+    @param duration: the duration to convert
+    @type duration:  str
+
+    @return: amount of seconds
+    @rtype:  float
+    '''
+
+    t = gettext.translation('pylogrotate', locale_dir, fallback=True)
+    _ = t.lgettext
+
+    if duration is None:
+        msg = _("Given duration is 'None'.")
+        raise ValueError(msg)
+
+    value = str(duration).strip().lower()
+    if value == '':
+        msg = _("Given duration was empty.")
+        raise ValueError(msg)
+
+    factors = {
+        's': 1,
+        'm': 60,
+        'h': (60 * 60),
+        'd': (24 * 60 * 60),
+    }
+
+    pattern = (r'^(\d+(?:\.\d*)?)\s*' +
+               r'(s(?:ec(?:onds?)?)?|m(?:in(?:utes?)?)?|h(?:ours?)?|' +
+               r'd(?:ays?)?)?\s*')
+    seconds = float(0)
+    while value != '':
+        match = re.search(pattern, value)
+        if not match:
+            msg = _("Invalid content for a duration: '%s'.") % (duration)
+            raise ValueError(msg)
+        unit = 's'
+        if match.group(2):
+            unit = match.group(2)[0]
+        seconds += float(match.group(1)) * factors[unit]
+        value = value[match.end():]
+
+    return seconds
+
+#------------------------------------------------------------------------
+
+def cpulist2list(cpulist):
+    '''
+    Converts the given list of CPUs of the form »0,2,28-31« (like in
+    taskset(1) or /sys/devices/system/cpu/online) in a sorted list of
+    CPU numbers. It raises a ValueError on invalid values.
+
+    @param cpulist: the list of CPUs to convert
+    @type cpulist:  str
+
+    @return: the CPU numbers
+    @rtype:  list of int
+    '''
+
+    t = gettext.translation('pylogrotate', locale_dir, fallback=True)
+    _ = t.lgettext
+
+    if cpulist is None:
+        msg = _("Given list of CPUs is 'None'.")
+        raise ValueError(msg)
+
+    value = str(cpulist).strip()
+    if value == '':
+        msg = _("Given list of CPUs was empty.")
+        raise ValueError(msg)
+
+    cpus = {}
+    for part in re.split(r'\s*,\s*', value):
+        match = re.search(r'^(\d+)(?:\s*-\s*(\d+))?$', part)
+        if not match:
+            msg = _("Invalid content for a list of CPUs: '%s'.") % (cpulist)
+            raise ValueError(msg)
+        first = int(match.group(1))
+        last = first
+        if match.group(2) is not None:
+            last = int(match.group(2))
+        if last < first:
+            msg = _("Invalid content for a list of CPUs: '%s'.") % (cpulist)
+            raise ValueError(msg)
+        for cpu in range(first, last + 1):
+            cpus[cpu] = True
+
+    return sorted(cpus.keys())
+
+#------------------------------------------------------------------------
+
 def period2days(period, use_locale_radix = False, verbose = 0):
     '''
     Converts the given string of the form »5d 8h« in an amount of days.
@@ -0,0 +1,1051 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: module with the registry of all internal compressors
+          and their compression functions
+'''
+
+# Standard modules
+import re
+import os
+import os.path
+import zlib
+import gzip
+import bz2
+import zipfile
+import tarfile
+import time
+import struct
+import multiprocessing
+from collections import deque
+
+# Third party modules
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Own modules
+from LogRotate.Copy import iter_chunks
+from LogRotate.Copy import drop_cache
+from LogRotate.Digest import DigestWriter
+
+from LogRotate.Throttle import throttled
+
+revision = '$Revision$'
+revision = re.sub( r'\$', '', revision )
+revision = re.sub( r'Revision: ', r'r', revision )
+revision = re.sub( r'\s*$', '', revision )
+
+__author__    = 'Frank Brehm'
+__copyright__ = '(C) 2011 by Frank Brehm, Berlin'
+__contact__    = 'frank@brehm-online.com'
+__version__    = '0.1.0 ' + revision
+__license__    = 'GPL3'
+
+#========================================================================
+# Module variables
+
+pgzip_block_size = (4 * 1024 * 1024)
+'''
+@var: size of the uncompressed blocks, which are compressed in parallel
+      by pgzip_file() as independent gzip members
+@type: int
+'''
+
+budget_levels = (9, 6, 3, 1)
+'''
+@var: compression levels to probe for a compression budget,
+      from the best to the fastest one
+@type: tuple
+'''
+
+probe_size = (1024 * 1024)
+'''
+@var: size of the sample from the beginning of a file, which is
+      compressed to measure the throughput of a compression level
+@type: int
+'''
+
+sample_chunks = 4
+'''
+@var: number of chunks spread over a file, which are trial-compressed
+      to estimate, whether the file is compressible at all
+@type: int
+'''
+
+sample_chunk_size = (64 * 1024)
+'''
+@var: size of a chunk for estimating the compressibility of a file
+@type: int
+'''
+
+incompressible_actions = (
+    'skip',
+    'store',
+)
+'''
+@var: valid actions for incompressible files: leave them uncompressed
+      or compress them with the cheapest level of the compressor
+@type: tuple
+'''
+
+index_block_size = (1024 * 1024)
+'''
+@var: default size of the uncompressed blocks of a seekable compressed
+      file, the blocks are extended up to the next end of line
+@type: int
+'''
+
+index_suffix = '.idx'
+'''
+@var: suffix of the sidecar index of a seekable compressed file
+@type: str
+'''
+
+index_format = 1
+'''
+@var: version of the format of the sidecar index
+@type: int
+'''
+
+timestamp_patterns = (
+    # ISO 8601, e.g. 2011-10-18T21:14:48.123+02:00
+    r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?' +
+            r'(?:Z|[+-]\d{2}:?\d{2})?',
+    # common log format, e.g. 18/Oct/2011:21:14:48 +0200
+    r'\d{2}/[A-Z][a-z]{2}/\d{4}:\d{2}:\d{2}:\d{2}(?: [+-]\d{4})?',
+    # syslog, e.g. Oct 18 21:14:48
+    r'[A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2}',
+)
+'''
+@var: regular expressions for timestamps at the beginning of a
+      log line, which are taken into the sidecar index
+@type: tuple
+'''
+
+bundle_formats = {
+    'gz':  '.tar.gz',
+    'bz2': '.tar.bz2',
+}
+'''
+@var: compressions of tarfile for bundles of old logfiles
+      and the extensions of the bundles
+@type: dict
+'''
+
+temp_suffix = '.compressing'
+'''
+@var: suffix of the hidden temporary files in the directory of the
+      compressed file, which are renamed to it after a successful
+      compression
+@type: str
+'''
+
+fsync_policies = (
+    'none',
+    'file',
+    'full',
+)
+'''
+@var: valid policies for syncing a compressed file onto disk before
+      deleting the uncompressed file: not at all, only the compressed
+      file or the compressed file and its directory after renaming
+@type: tuple
+'''
+
+compressors = {}
+'''
+@var: registry of all internal compressors, keys are the names, how they
+      are used in the 'compresscmd' option, values are dicts with the keys:
+        - 'function':  the compression function, called with the
+                       arguments source, target, level, buffer_size
+                       and options (see compress_gzip())
+        - 'extension': default extension of the compressed files
+        - 'module':    the name of the Python module used for compression
+        - 'available': the Python module could be imported
+        - 'probe':     function to compress a sample in memory with
+                       the arguments data and level, or None, if the
+                       compressor has no compression levels
+        - 'store_level': the cheapest compression level for storing
+                       incompressible files
+        - 'default_level': the default compression level
+        - 'block':     function to compress a block of data with the
+                       arguments data and level into a self-contained
+                       stream, which can be concatenated with others,
+                       or None, if the compressor can't write seekable
+                       files with an index
+        - 'parallel':  blocks of seekable files are compressed
+                       in parallel
+        - 'digests':   the compression function computes digests
+                       of the input and output data on the fly
+@type: dict
+'''
+
+#========================================================================
+
+def register_compressor(name, function, extension, module,
+        available = True, probe = None, store_level = 1,
+        default_level = None, block = None, parallel = False,
+        digests = True, max_level = 9):
+    '''
+    Registers a new internal compressor, which can be used afterwards
+    as compresscmd.
+
+    @param name:      name of the compressor, e.g. 'internal_gzip'
+    @type name:       str
+    @param function:  the compression function
+    @type function:   callable
+    @param extension: default extension of the compressed files
+    @type extension:  str
+    @param module:    the name of the Python module used for compression
+    @type module:     str
+    @param available: the Python module could be imported
+    @type available:  bool
+    @param probe:     function to compress a sample in memory with the
+                      arguments data and level or None, if the compressor
+                      has no compression levels
+    @type probe:      callable or None
+    @param store_level: the cheapest compression level of the compressor
+    @type store_level:  int
+    @param default_level: the default compression level of the compressor
+    @type default_level:  int or None
+    @param block:     function to compress a block into a self-contained
+                      stream with the arguments data and level or None
+    @type block:      callable or None
+    @param parallel:  compress the blocks in parallel, the compression
+                      function takes the number of worker processes
+                      as keyword argument 'jobs'
+    @type parallel:   bool
+    @param digests:   the compression function computes digests
+                      on the fly
+    @type digests:    bool
+    @param max_level: the highest compression level of the compressor
+    @type max_level:  int
+
+    @return: None
+    '''
+
+    compressors[name] = {
+        'function':  function,
+        'extension': extension,
+        'module':    module,
+        'available': available,
+        'probe':     probe,
+        'store_level': store_level,
+        'default_level': default_level,
+        'block':     block,
+        'parallel':  parallel,
+        'digests':   digests,
+        'max_level': max_level,
+    }
+
+#------------------------------------------------------------------------
+def temp_target(target):
+    '''
+    Gives back the name of the temporary file for compressing into
+    the given target, which is a hidden file in the same directory.
+
+    @param target: the compressed file to create
+    @type target:  str
+
+    @return: name of the temporary file
+    @rtype:  str
+    '''
+
+    return os.path.join(os.path.dirname(target),
+            '.' + os.path.basename(target) + temp_suffix)
+
+#------------------------------------------------------------------------
+def is_temp_target(filename):
+    '''
+    Checks, whether the given file is a temporary file of a compression.
+
+    @param filename: the file to check
+    @type filename:  str
+
+    @rtype: bool
+    '''
+
+    basename = os.path.basename(filename)
+    return (basename.startswith('.') and basename.endswith(temp_suffix)
+            and len(basename) > len(temp_suffix) + 1)
+
+#------------------------------------------------------------------------
+def _open_target(target, output_digests = None):
+    '''
+    Opens the target file of a compression for writing, wrapped by a
+    DigestWriter, if the digests of the written data are requested,
+    and by a ThrottledFile, if the bandwidth is limited.
+    '''
+
+    f_out = throttled(open(target, 'wb'))
+    if output_digests is None:
+        return f_out
+    return DigestWriter(f_out, output_digests)
+
+#------------------------------------------------------------------------
+def bundle_format(name):
+    '''
+    Gives back the compression of tarfile for a bundle of old logfiles,
+    which fits best to the given compress command.
+
+    @param name: the compress command of the logfile definition
+    @type name:  str or None
+
+    @return: the compression of tarfile ('gz' or 'bz2')
+    @rtype:  str
+    '''
+
+    if name is not None and re.search(r'bzip2', name):
+        return 'bz2'
+    return 'gz'
+
+#------------------------------------------------------------------------
+def write_bundle(target, files, base_dir, compression = 'gz',
+        output_digests = None):
+    '''
+    Packs the given files into a compressed tar archive. The archive
+    is written as a stream, so every file is read in small chunks and
+    the memory usage doesn't depend on the count or the size of the
+    files.
+
+    @param target:      the tar archive to create
+    @type target:       str
+    @param files:       the files to pack
+    @type files:        list
+    @param base_dir:    the names of the files in the archive are
+                        relative to this directory, if they are below
+    @type base_dir:     str
+    @param compression: the compression of tarfile ('gz' or 'bz2')
+    @type compression:  str
+    @param output_digests: digests of the written archive to compute
+                           on the fly or None
+    @type output_digests:  LogRotate.Digest.DigestSet or None
+
+    @return: None
+    '''
+
+    base_dir = os.path.join(os.path.abspath(base_dir), '')
+    f_out = _open_target(target, output_digests)
+    try:
+        tar = tarfile.open(target, 'w|' + compression, f_out)
+        try:
+            for filename in files:
+                arcname = os.path.abspath(filename)
+                if arcname.startswith(base_dir):
+                    arcname = arcname[len(base_dir):]
+                else:
+                    arcname = arcname.lstrip(os.sep)
+                tarinfo = tar.gettarinfo(filename, arcname)
+                if not tarinfo.isreg():
+                    tar.addfile(tarinfo)
+                    continue
+                f_in = throttled(open(filename, 'rb'))
+                try:
+                    tar.addfile(tarinfo, f_in)
+                finally:
+                    f_in.close()
+        finally:
+            tar.close()
+    finally:
+        f_out.close()
+
+#------------------------------------------------------------------------
+def read_sample(filename, size = probe_size):
+    '''
+    Reads a sample for probing compressors from the beginning of the file.
+
+    @param filename: the file to read from
+    @type filename:  str
+    @param size:     maximum size of the sample
+    @type size:      int
+
+    @return: the sample
+    @rtype:  str
+    '''
+
+    f_in = throttled(open(filename, 'rb'))
+    try:
+        return f_in.read(size)
+    finally:
+        f_in.close()
+
+#------------------------------------------------------------------------
+def sample_ratio(filename, chunks = sample_chunks,
+        chunk_size = sample_chunk_size):
+    '''
+    Estimates the compression ratio of the given file by compressing
+    some chunks evenly spread over the file with the fastest level of
+    zlib. Base64 encoded or allready compressed data give a ratio
+    near to or above 1.
+
+    @param filename:   the file to estimate
+    @type filename:    str
+    @param chunks:     number of chunks to compress
+    @type chunks:      int
+    @param chunk_size: size of a chunk
+    @type chunk_size:  int
+
+    @return: size of the compressed chunks divided by their size
+             or None for an empty file
+    @rtype:  float or None
+    '''
+
+    size = os.path.getsize(filename)
+    if size <= 0:
+        return None
+
+    offsets = [0]
+    if size > chunks * chunk_size:
+        step = (size - chunk_size) / (chunks - 1)
+        offsets = [i * step for i in range(chunks)]
+    else:
+        chunk_size = chunks * chunk_size
+
+    raw = 0
+    compressed = 0
+    f_in = throttled(open(filename, 'rb'))
+    try:
+        for offset in offsets:
+            f_in.seek(offset)
+            data = f_in.read(chunk_size)
+            raw += len(data)
+            compressed += len(zlib.compress(data, 1))
+    finally:
+        f_in.close()
+
+    if not raw:
+        return None
+    return float(compressed) / raw
+
+#------------------------------------------------------------------------
+def probe_rate(name, data, level):
+    '''
+    Measures the throughput of the given internal compressor with the
+    given level by compressing the sample in memory.
+
+    @param name:  name of the internal compressor
+    @type name:   str
+    @param data:  the sample to compress
+    @type data:   str
+    @param level: the compression level
+    @type level:  int
+
+    @return: throughput in bytes per second of uncompressed data
+             and compressed size of the sample
+    @rtype:  tuple of (float, int)
+    '''
+
+    start = time.time()
+    compressed = compressors[name]['probe'](data, level)
+    duration = max(time.time() - start, 1e-6)
+    return (len(data) / duration, len(compressed))
+
+#------------------------------------------------------------------------
+def gzip_member(data, level = 9, mtime = 0, name = None):
+    '''
+    Compresses the given data into a complete gzip member (RFC 1952)
+    with header and trailer. The concatenation of such members is
+    a valid gzip stream, which is read by gunzip and zcat like one file.
+
+    @param data:  the uncompressed data
+    @type data:   str
+    @param level: the compression level (1 - 9)
+    @type level:  int
+    @param mtime: modification time to store in the header
+    @type mtime:  int
+    @param name:  original file name to store in the header or None
+    @type name:   str or None
+
+    @return: the gzip member
+    @rtype:  str
+    '''
+
+    flags = 0
+    if name:
+        flags = 0x08
+
+    xfl = 0
+    if level >= 9:
+        xfl = 2
+    elif level <= 1:
+        xfl = 4
+
+    header = '\037\213\010' + struct.pack('<BIBB',
+            flags, (int(mtime) & 0xffffffffL), xfl, 3)
+    if name:
+        header += name + '\000'
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS,
+            zlib.DEF_MEM_LEVEL, 0)
+    body = compressor.compress(data) + compressor.flush()
+
+    trailer = struct.pack('<II', (zlib.crc32(data) & 0xffffffffL),
+            (len(data) & 0xffffffffL))
+
+    return header + body + trailer
+
+#------------------------------------------------------------------------
+def _gzip_block(args):
+    '''
+    Wrapper of gzip_member() for multiprocessing.Pool.
+    '''
+
+    return gzip_member(*args)
+
+#------------------------------------------------------------------------
+def _compress_block(args):
+    '''
+    Calls the block function for multiprocessing.Pool.
+    '''
+
+    (function, data, level) = args
+    return function(data, level)
+
+#------------------------------------------------------------------------
+def iter_line_blocks(fd, block_size, cache_policy = 'keep'):
+    '''
+    Generator for the content of the file in blocks of at least
+    block_size bytes, which are extended up to the next end of line,
+    so every block starts with a complete log line. A block is extended
+    by at most block_size bytes, so a longer line is split. The holes
+    of a sparse file are not read.
+
+    @param fd:           file descriptor of a file open for reading
+    @type fd:            int
+    @param block_size:   minimum size of a block
+    @type block_size:    int
+    @param cache_policy: the usage of the page cache, one of
+                         LogRotate.Copy.cache_policies
+    @type cache_policy:  str
+
+    @return: the blocks of the file
+    @rtype:  generator
+    '''
+
+    data = ''
+    for chunk in iter_chunks(fd, block_size, cache_policy):
+        data += chunk
+        while len(data) >= block_size:
+            end = data.find('\n', block_size - 1, 2 * block_size)
+            if end >= 0:
+                end += 1
+            elif len(data) >= 2 * block_size:
+                end = 2 * block_size
+            else:
+                break
+            yield data[:end]
+            data = data[end:]
+
+    if data:
+        yield data
+
+#------------------------------------------------------------------------
+def first_timestamp(data):
+    '''
+    Searches a timestamp in the first line of the given block.
+
+    @param data: the block of log lines
+    @type data:  str
+
+    @return: the timestamp, how found in the line, or None
+    @rtype:  str or None
+    '''
+
+    line = data[:256].split('\n', 1)[0]
+    for pattern in timestamp_patterns:
+        match = re.search(pattern, line)
+        if match:
+            return match.group(0)
+    return None
+
+#------------------------------------------------------------------------
+def compress_seekable(source, target, name, level = None,
+        block_size = index_block_size, input_digests = None,
+        output_digests = None, cache_policy = 'keep', jobs = None):
+    '''
+    Compresses the source file with the given internal compressor into
+    independent compressed blocks, which are concatenated into the target.
+    The result is a valid file of its format, but a reader may start
+    decompressing at the beginning of every block.
+
+    @param source:     the file to compress
+    @type source:      str
+    @param target:     the compressed file to create
+    @type target:      str
+    @param name:       name of the internal compressor
+    @type name:        str
+    @param level:      compression level, if None, the default level
+                       of the compressor is used
+    @type level:       int or None
+    @param block_size: minimum size of the uncompressed blocks
+    @type block_size:  int
+    @param input_digests:  digests of the uncompressed data to compute
+                           on the fly or None
+    @type input_digests:   LogRotate.Digest.DigestSet or None
+    @param output_digests: digests of the written compressed file to
+                           compute on the fly or None
+    @type output_digests:  LogRotate.Digest.DigestSet or None
+    @param cache_policy:   the usage of the page cache for reading the
+                           source, one of LogRotate.Copy.cache_policies
+    @type cache_policy:    str
+    @param jobs:           number of worker processes for a parallel
+                           compressor, if None, the number of CPUs is used
+    @type jobs:            int or None
+
+    @return: the index with a tuple of (uncompressed offset, compressed
+             offset, timestamp of the first line or None) for every block
+    @rtype:  list
+    '''
+
+    compressor = compressors[name]
+    function = compressor['block']
+    if level is None:
+        level = compressor['default_level']
+
+    if not compressor['parallel']:
+        jobs = 1
+    elif jobs is None:
+        try:
+            jobs = multiprocessing.cpu_count()
+        except NotImplementedError:
+            jobs = 1
+
+    index = []
+    offsets = [0, 0]
+
+    def _write(data, length, timestamp):
+        index.append((offsets[0], offsets[1], timestamp))
+        if output_digests is not None:
+            output_digests.update(data)
+        f_out.write(data)
+        offsets[0] += length
+        offsets[1] += len(data)
+
+    f_in = open(source, 'rb')
+    try:
+        f_out = throttled(open(target, 'wb'))
+        try:
+            if jobs < 2:
+                for block in iter_line_blocks(f_in.fileno(), block_size,
+                        cache_policy):
+                    if input_digests is not None:
+                        input_digests.update(block)
+                    _write(function(block, level), len(block),
+                            first_timestamp(block))
+            else:
+                pool = multiprocessing.Pool(jobs)
+                try:
+                    pending = deque()
+                    for block in iter_line_blocks(f_in.fileno(),
+                            block_size, cache_policy):
+                        if input_digests is not None:
+                            input_digests.update(block)
+                        result = pool.apply_async(_compress_block,
+                                ((function, block, level), ))
+                        pending.append((result, len(block),
+                                first_timestamp(block)))
+                        # write back in order, keeping the pool busy
+                        while len(pending) >= (2 * jobs):
+                            (result, length, timestamp) = pending.popleft()
+                            _write(result.get(), length, timestamp)
+                    while pending:
+                        (result, length, timestamp) = pending.popleft()
+                        _write(result.get(), length, timestamp)
+                    pool.close()
+                except:
+                    pool.terminate()
+                    raise
+                pool.join()
+            if not index:
+                _write(function('', level), 0, None)
+        finally:
+            f_out.close()
+        if cache_policy == 'dontneed':
+            drop_cache(f_in.fileno())
+    finally:
+        f_in.close()
+
+    return index
+
+#------------------------------------------------------------------------
+def write_index(filename, index, name):
+    '''
+    Writes the sidecar index of a seekable compressed file. It is a
+    text file with a comment header and a tab separated line for every
+    block with the uncompressed offset, the compressed offset and the
+    timestamp of the first line ('-', if not found).
+
+    @param filename: the index file to write
+    @type filename:  str
+    @param index:    the index given back by compress_seekable()
+    @type index:     list
+    @param name:     name of the internal compressor
+    @type name:      str
+
+    @return: None
+    '''
+
+    f_out = open(filename, 'w')
+    try:
+        f_out.write("# pylogrotate block index, format %d, %s\n"
+                % (index_format, name))
+        f_out.write("# uncompressed_offset\tcompressed_offset\t" +
+                "first_timestamp\n")
+        for (raw_offset, offset, timestamp) in index:
+            if timestamp is None:
+                timestamp = '-'
+            f_out.write("%d\t%d\t%s\n" % (raw_offset, offset, timestamp))
+    finally:
+        f_out.close()
+
+#------------------------------------------------------------------------
+def pgzip_file(source, f_out, jobs = None, level = 9,
+        block_size = pgzip_block_size, input_digests = None,
+        cache_policy = 'keep'):
+    '''
+    Compresses the source file block by block in parallel into a
+    multi-member gzip stream. Holes of sparse files are not read.
+    At most two blocks per job are hold in memory.
+
+    @param source:     the file to compress
+    @type source:      str
+    @param f_out:      the opened target file
+    @type f_out:       file
+    @param jobs:       number of worker processes, if None,
+                       the number of CPUs is used
+    @type jobs:        int or None
+    @param level:      the compression level (1 - 9)
+    @type level:       int
+    @param block_size: size of the uncompressed blocks
+    @type block_size:  int
+    @param input_digests: digests of the uncompressed data to compute
+                          on the fly or None
+    @type input_digests:  LogRotate.Digest.DigestSet or None
+    @param cache_policy:  the usage of the page cache, one of
+                          LogRotate.Copy.cache_policies
+    @type cache_policy:   str
+
+    @return: number of compressed blocks
+    @rtype:  int
+    '''
+
+    if jobs is None:
+        try:
+            jobs = multiprocessing.cpu_count()
+        except NotImplementedError:
+            jobs = 1
+
+    f_in = open(source, 'rb')
+    try:
+        statinfo = os.fstat(f_in.fileno())
+        name = os.path.basename(source)
+        blocks = 0
+
+        if jobs < 2:
+            for chunk in iter_chunks(f_in.fileno(), block_size,
+                    cache_policy):
+                if input_digests is not None:
+                    input_digests.update(chunk)
+                if blocks:
+                    f_out.write(gzip_member(chunk, level))
+                else:
+                    f_out.write(gzip_member(chunk, level,
+                            statinfo.st_mtime, name))
+                blocks += 1
+            if not blocks:
+                f_out.write(gzip_member('', level, statinfo.st_mtime, name))
+                blocks = 1
+            return blocks
+
+        pool = multiprocessing.Pool(jobs)
+        try:
+            pending = deque()
+            for chunk in iter_chunks(f_in.fileno(), block_size,
+                    cache_policy):
+                if input_digests is not None:
+                    input_digests.update(chunk)
+                if blocks:
+                    args = (chunk, level)
+                else:
+                    args = (chunk, level, statinfo.st_mtime, name)
+                pending.append(pool.apply_async(_gzip_block, (args, )))
+                blocks += 1
+                # write back in order, keeping the pool busy
+                while len(pending) >= (2 * jobs):
+                    f_out.write(pending.popleft().get())
+            while pending:
+                f_out.write(pending.popleft().get())
+            if not blocks:
+                f_out.write(gzip_member('', level, statinfo.st_mtime, name))
+                blocks = 1
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        pool.join()
+    finally:
+        f_in.close()
+
+    return blocks
+
+#------------------------------------------------------------------------
+def compress_gzip(source, target, level = None, buffer_size = None,
+        options = None, input_digests = None, output_digests = None,
+        cache_policy = 'keep'):
+    '''
+    Compresses the source file into the target file with the module gzip
+    in chunks of buffer_size. All compression functions of the registry
+    have this signature.
+
+    @param source:      the file to compress
+    @type source:       str
+    @param target:      the compressed file to create
+    @type target:       str
+    @param level:       compression level, if None, the default level
+                        of the compressor is used
+    @type level:        int or None
+    @param buffer_size: size of the chunks to compress
+    @type buffer_size:  int or None
+    @param options:     the compressoptions of the logfile definition
+    @type options:      str or None
+    @param input_digests:  digests of the uncompressed data to compute
+                           on the fly or None
+    @type input_digests:   LogRotate.Digest.DigestSet or None
+    @param output_digests: digests of the written compressed file to
+                           compute on the fly or None
+    @type output_digests:  LogRotate.Digest.DigestSet or None
+    @param cache_policy:   the usage of the page cache for reading the
+                           source, one of LogRotate.Copy.cache_policies
+    @type cache_policy:    str
+
+    @return: None
+    '''
+
+    if level is None:
+        level = 9
+    if buffer_size is None:
+        buffer_size = pgzip_block_size
+
+    f_in = open(source, 'rb')
+    try:
+        f_raw = _open_target(target, output_digests)
+        try:
+            # the original name in the header is the name of the source
+            f_out = gzip.GzipFile(source, 'wb', level, f_raw)
+            try:
+                # holes of sparse files are not read
+                for chunk in iter_chunks(f_in.fileno(), buffer_size,
+                        cache_policy):
+                    if input_digests is not None:
+                        input_digests.update(chunk)
+                    f_out.write(chunk)
+            finally:
+                f_out.close()
+        finally:
+            f_raw.close()
+    finally:
+        f_in.close()
+
+#------------------------------------------------------------------------
+def compress_pgzip(source, target, level = None, buffer_size = None,
+        options = None, input_digests = None, output_digests = None,
+        cache_policy = 'keep', jobs = None):
+    '''
+    Compresses the source file into the target file block by block
+    in parallel with pgzip_file() in the given number of worker processes.
+    '''
+
+    if level is None:
+        level = 9
+
+    f_out = _open_target(target, output_digests)
+    try:
+        pgzip_file(source, f_out, jobs = jobs, level = level,
+                input_digests = input_digests, cache_policy = cache_policy)
+    finally:
+        f_out.close()
+
+#------------------------------------------------------------------------
+def compress_bzip2(source, target, level = None, buffer_size = None,
+        options = None, input_digests = None, output_digests = None,
+        cache_policy = 'keep'):
+    '''
+    Compresses the source file into the target file with the module bz2
+    in chunks of buffer_size.
+    '''
+
+    if level is None:
+        level = 9
+    if buffer_size is None:
+        buffer_size = pgzip_block_size
+
+    compressor = bz2.BZ2Compressor(level)
+
+    f_in = open(source, 'rb')
+    try:
+        f_out = _open_target(target, output_digests)
+        try:
+            for chunk in iter_chunks(f_in.fileno(), buffer_size,
+                    cache_policy):
+                if input_digests is not None:
+                    input_digests.update(chunk)
+                f_out.write(compressor.compress(chunk))
+            f_out.write(compressor.flush())
+        finally:
+            f_out.close()
+    finally:
+        f_in.close()
+
+#------------------------------------------------------------------------
+def compress_zip(source, target, level = None, buffer_size = None,
+        options = None, input_digests = None, output_digests = None,
+        cache_policy = 'keep'):
+    '''
+    Compresses the source file into a zip archive with the module zipfile,
+    which reads the source in small chunks. The module zipfile allways
+    uses the default compression level of zlib, so level is ignored,
+    except of level 0, which stores the file uncompressed. The module
+    zipfile reads the source and seeks in the target itself, so no
+    digests are computed on the fly and no cache policy is applied.
+    '''
+
+    compression = zipfile.ZIP_DEFLATED
+    if level == 0:
+        compression = zipfile.ZIP_STORED
+
+    f_out = zipfile.ZipFile(
+                file=target,
+                mode='w',
+                compression=compression
+    )
+    try:
+        f_out.write(source, os.path.basename(source))
+    finally:
+        f_out.close()
+
+#------------------------------------------------------------------------
+def compress_xz(source, target, level = None, buffer_size = None,
+        options = None, input_digests = None, output_digests = None,
+        cache_policy = 'keep'):
+    '''
+    Compresses the source file into the target file with the module lzma
+    in the xz format in chunks of buffer_size. The level is used as the
+    preset (default 6), the compressoptions '-e' or '--extreme' add
+    the extreme flag to the preset.
+    '''
+
+    if level is None:
+        level = 6
+    if buffer_size is None:
+        buffer_size = pgzip_block_size
+
+    preset = level
+    if options and re.search(r'(?:^|\s)(?:-e|--extreme)(?:\s|$)', options):
+        preset |= lzma.PRESET_EXTREME
+
+    compressor = lzma.LZMACompressor(format = lzma.FORMAT_XZ,
+            check = lzma.CHECK_CRC64, preset = preset)
+
+    f_in = open(source, 'rb')
+    try:
+        f_out = _open_target(target, output_digests)
+        try:
+            for chunk in iter_chunks(f_in.fileno(), buffer_size,
+                    cache_policy):
+                if input_digests is not None:
+                    input_digests.update(chunk)
+                f_out.write(compressor.compress(chunk))
+            f_out.write(compressor.flush())
+        finally:
+            f_out.close()
+    finally:
+        f_in.close()
+
+#------------------------------------------------------------------------
+def compress_zstd(source, target, level = None, buffer_size = None,
+        options = None, input_digests = None, output_digests = None,
+        cache_policy = 'keep'):
+    '''
+    Compresses the source file into the target file with the module
+    zstandard in chunks of buffer_size (default level 3).
+    '''
+
+    if level is None:
+        level = 3
+    if buffer_size is None:
+        buffer_size = pgzip_block_size
+
+    compressor = zstandard.ZstdCompressor(level = level,
+            write_content_size = True)
+
+    f_in = open(source, 'rb')
+    try:
+        f_out = _open_target(target, output_digests)
+        try:
+            size = os.fstat(f_in.fileno()).st_size
+            writer = compressor.stream_writer(f_out, size = size)
+            for chunk in iter_chunks(f_in.fileno(), buffer_size,
+                    cache_policy):
+                if input_digests is not None:
+                    input_digests.update(chunk)
+                writer.write(chunk)
+            writer.flush(zstandard.FLUSH_FRAME)
+        finally:
+            f_out.close()
+    finally:
+        f_in.close()
+
+#========================================================================
+
+def _xz_stream(data, level):
+    return lzma.compress(data, format = lzma.FORMAT_XZ, preset = level)
+
+def _zstd_frame(data, level):
+    return zstandard.ZstdCompressor(level = level,
+            write_content_size = True).compress(data)
+
+register_compressor('internal_gzip', compress_gzip, '.gz', 'gzip',
+        probe = zlib.compress, store_level = 0, default_level = 9,
+        block = gzip_member)
+register_compressor('internal_pgzip', compress_pgzip, '.gz', 'zlib',
+        probe = zlib.compress, store_level = 0, default_level = 9,
+        block = gzip_member, parallel = True)
+register_compressor('internal_bzip2', compress_bzip2, '.bz2', 'bz2',
+        probe = bz2.compress, default_level = 9, block = bz2.compress)
+register_compressor('internal_zip', compress_zip, '.zip', 'zipfile',
+        store_level = 0, digests = False)
+register_compressor('internal_xz', compress_xz, '.xz', 'lzma',
+        available = (lzma is not None), probe = _xz_stream,
+        store_level = 0, default_level = 6, block = _xz_stream)
+register_compressor('internal_zstd', compress_zstd, '.zst', 'zstandard',
+        available = (zstandard is not None), probe = _zstd_frame,
+        default_level = 3, block = _zstd_frame, max_level = 22)
+
+#========================================================================
+
+if __name__ == "__main__":
+    pass
+
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
@@ -36,8 +36,23 @@ except ImportError:
     import LogRotate.Common
 
 from LogRotate.Common import split_parts, email_valid, period2days
+from LogRotate.Common import duration2seconds
+from LogRotate.Common import cpulist2list
 from LogRotate.Common import human2bytes, get_address_list
 from LogRotate.Script import LogRotateScript
+from LogRotate.Copy import inplace_methods
+from LogRotate.Copy import cache_policies
+
+from LogRotate.JobPool import ioprio_classes
+
+from LogRotate.Unlink import truncate_step, truncate_pause
+from LogRotate.Compress import compressors
+from LogRotate.Compress import incompressible_actions
+from LogRotate.Compress import fsync_policies
+from LogRotate.Compress import index_block_size
+
+from LogRotate.Digest import digest_modes
+from LogRotate.Digest import valid_algorithm
 
 revision = '$Revision$'
 revision = re.sub( r'\$', '', revision )
@@ -80,14 +95,29 @@ options_with_values = (
     'statusfile',
     'pidfile',
     'compressext',
+    'compresslevel',
     'rotate',
     'maxage',
+    'compressbudget',
+    'incompressible',
+    'cachepolicy',
     'mailfrom',
     'smtphost',
     'smtpport',
     'smtptls',
     'smtpuser',
     'smtppasswd',
+    'compressjobs',
+    'compressfsync',
+    'compressnice',
+    'compressioprio',
+    'compressaffinity',
+    'maxbandwidth',
+    'devicejobs',
+    'deletejobs',
+    'gradualdelete',
+    'minfreespace',
+    'purgepriority',
 )
 
 boolean_options = (
@@ -100,7 +130,9 @@ boolean_options = (
 )
 
 integer_options = (
+    'compresslevel',
     'delaycompress',
+    'purgepriority',
     'rotate',
     'start',
 )
@@ -112,6 +144,11 @@ string_options = (
     'compressoptions',
 )
 
+size_options = (
+    'copytruncatedelta',
+    'maxtotalsize',
+)
+
 global_options = (
     'statusfile',
     'pidfile',
@@ -121,6 +158,17 @@ global_options = (
     'smtptls',
     'smtpuser',
     'smtppasswd',
+    'compresspipeline',
+    'compressjobs',
+    'compressfsync',
+    'compressnice',
+    'compressioprio',
+    'compressaffinity',
+    'maxbandwidth',
+    'devicejobs',
+    'deletejobs',
+    'gradualdelete',
+    'minfreespace',
 )
 
 path_options = (
@@ -407,9 +455,18 @@ class LogrotateConfigurationReader(object):
         self.default['compress']      = False
         self.default['compresscmd']   = 'internal_gzip'
         self.default['compressext']   = None
+        self.default['compresslevel'] = None
+        self.default['compressbudget'] = None
+        self.default['incompressible'] = None
+        self.default['compressindex'] = None
+        self.default['bundle'] = None
+        self.default['digest'] = None
+        self.default['cachepolicy'] = 'keep'
         self.default['compressoptions']  = None
         self.default['copy']          = False
         self.default['copytruncate']  = False
+        self.default['copytruncatedelta'] = None
+        self.default['copyinplace']   = None
         self.default['create']        = {
             'enabled': False,
             'mode':    None,
@@ -425,6 +482,7 @@ class LogrotateConfigurationReader(object):
         self.default['mailaddress']   = None
         self.default['mailfirst']     = None
         self.default['maxage']        = None
+        self.default['maxtotalsize']  = None
         self.default['missingok']     = False
         self.default['olddir']        = {
             'dirname':    '',
@@ -439,6 +497,7 @@ class LogrotateConfigurationReader(object):
         self.default['shred']         = False
         self.default['size']          = None
         self.default['start']         = 0
+        self.default['purgepriority'] = 0
 
     #------------------------------------------------------------
     def add_taboo(self, pattern, pattern_type = 'file'):
@@ -591,36 +650,39 @@ class LogrotateConfigurationReader(object):
         '''
         Checks the availability of the given compress command.
 
-        'internal_zip, 'internal_gzip' and 'internal_bzip2' are accepted as
-        valid compress commands for compressing
+        The names of all internal compressors of the registry of
+        LogRotate.Compress ('internal_gzip', 'internal_bzip2', 'internal_xz'
+        a.s.o.) are accepted as valid compress commands for compressing
         with the appropriate python modules.
 
         @param command: command to validate (absolute or relative for
                         searching in standard search path)
         @type command:  str
 
-        @return: absolute path of the compress command, 'internal_gzip',
-                 'internal_bzip2' or None if not found or invalid
+        @return: absolute path of the compress command, the name of the
+                 internal compressor or None if not found or invalid
         @rtype:  str or None
         '''
 
         _ = self.t.lgettext
         path_list = self._get_std_search_path(True)
  
-        pat = r'^\s*internal[\-_\s]?zip\s*'
-        match = re.search(pat, command, re.IGNORECASE)
-        if match:
-            return 'internal_zip'
-
-        pat = r'^\s*internal[\-_\s]?gzip\s*'
+        pat = r'^\s*internal[\-_\s]?([a-z0-9]+)\s*$'
         match = re.search(pat, command, re.IGNORECASE)
         if match:
-            return 'internal_gzip'
-
-        pat = r'^\s*internal[\-_\s]?bzip2\s*'
-        match = re.search(pat, command, re.IGNORECASE)
-        if match:
-            return 'internal_bzip2'
+            name = 'internal_' + match.group(1).lower()
+            if not name in compressors:
+                msg = _("Unknown internal compressor '%s'.") % (command)
+                self.logger.warning(msg)
+                return None
+            if not compressors[name]['available']:
+                msg = (_("Python module '%(module)s' for compressor " +
+                         "'%(cmd)s' is not available.")
+                        % {'module': compressors[name]['module'],
+                           'cmd': name})
+                self.logger.warning(msg)
+                return None
+            return name
 
         if os.path.isabs(command):
             if os.access(command, os.X_OK):
@@ -872,12 +934,10 @@ class LogrotateConfigurationReader(object):
                 # set a compress ext, if Compress is True
                 if self.new_log['compress']:
                     if not self.new_log['compressext']:
-                        if self.new_log['compresscmd'] == 'internal_gzip':
-                            self.new_log['compressext'] = '.gz'
-                        elif self.new_log['compresscmd'] == 'internal_zip':
-                            self.new_log['compressext'] = '.zip'
-                        elif self.new_log['compresscmd'] == 'internal_bzip2':
-                            self.new_log['compressext'] = '.bz2'
+                        cmd = self.new_log['compresscmd']
+                        if cmd in compressors:
+                            self.new_log['compressext'] = \
+                                    compressors[cmd]['extension']
                         else:
                             msg = (_("No extension for compressed logfiles " +
                                      "given (File of definition: '%(file)s'," +
@@ -885,6 +945,7 @@ class LogrotateConfigurationReader(object):
                                   % {'file': self.new_log['configfile'],
                                      'rownum': self.new_log['configrow']})
                             raise LogrotateConfigurationError(msg)
+                    self._check_compress_level()
                 # set ifempty => True, if a minsize was given
                 if self.new_log['size']:
                     self.new_log['ifempty'] = False
@@ -1084,6 +1145,14 @@ class LogrotateConfigurationReader(object):
                                 % {'file': filename, 'lnr': linenr})
                 self.logger.debug(msg)
             directive[key] = option_value
+            if key in ('copy', 'copytruncate') and option_value:
+                if directive['copyinplace']:
+                    msg = (_("Option '%(by)s' disables option '%(what)s'.")
+                            % {'by': key, 'what': 'copyinplace'})
+                    msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                    % {'file': filename, 'lnr': linenr})
+                    self.logger.warning(msg)
+                    directive['copyinplace'] = None
             if key == 'copy' and option_value:
                 if directive['copytruncate']:
                     msg = (_("Option '%(by)s' disables option '%(what)s'.")
@@ -1146,6 +1215,12 @@ class LogrotateConfigurationReader(object):
                             % {'value': str(option_value), 'option': key}
                 self.logger.warning(msg)
                 return False
+            if key == 'compresslevel':
+                # 0 means the default level of the compressor, the
+                # maximum is checked at the end of the definition
+                option_value = int(option_value)
+                if not option_value:
+                    option_value = None
             if self.verbose > 4:
                 msg = (_("Setting integer option '%(option)s' " +
                          "in '%(directive)s' to '%(value)s'.")
@@ -1298,6 +1373,170 @@ class LogrotateConfigurationReader(object):
                     else:
                         use_tls = bool(val)
                 val = use_tls
+            elif key == 'compresspipeline':
+                pipeline = True
+                if val is not None:
+                    value = val.strip().lower()
+                    if value in no_values:
+                        pipeline = False
+                    elif value != '' and not value in yes_values:
+                        msg = (_("Invalid value '%(value)s' for option " +
+                                 "'%(option)s' given.")
+                                % {'value': val, 'option': key})
+                        self.logger.warning(msg)
+                        return False
+                val = pipeline
+            elif key == 'compressjobs':
+                jobs = 0
+                try:
+                    jobs = int(val)
+                except ValueError, e:
+                    jobs = 0
+                if jobs < 1:
+                    msg = (_("Invalid number of compression jobs '%s' given.")
+                            % (val))
+                    self.logger.warning(msg)
+                    return False
+                val = jobs
+            elif key == 'compressfsync':
+                policy = val.strip().lower()
+                if not policy in fsync_policies:
+                    msg = (_("Invalid value '%(value)s' for option " +
+                             "'%(option)s' given.")
+                            % {'value': val, 'option': key})
+                    self.logger.warning(msg)
+                    return False
+                val = policy
+            elif key == 'compressnice':
+                nice = None
+                try:
+                    nice = int(val)
+                except ValueError, e:
+                    nice = None
+                if nice is None or nice < -20 or nice > 19:
+                    msg = (_("Invalid value '%(value)s' for option " +
+                             "'%(option)s' given.")
+                            % {'value': val, 'option': key})
+                    self.logger.warning(msg)
+                    return False
+                val = nice
+            elif key == 'compressioprio':
+                # <class>[,<priority>] like 'idle' or 'best-effort,7'
+                match = re.search(r'^\s*([a-z-]+)\s*(?:,\s*(\d+)\s*)?$',
+                        val.lower())
+                if (not match or
+                        not match.group(1) in ioprio_classes or
+                        (match.group(2) is not None and
+                            int(match.group(2)) > 7)):
+                    msg = (_("Invalid value '%(value)s' for option " +
+                             "'%(option)s' given.")
+                            % {'value': val, 'option': key})
+                    self.logger.warning(msg)
+                    return False
+                level = 0
+                if match.group(2) is not None:
+                    level = int(match.group(2))
+                val = (match.group(1), level)
+            elif key == 'compressaffinity':
+                try:
+                    val = cpulist2list(val)
+                except ValueError, e:
+                    self.logger.warning(str(e))
+                    return False
+            elif key == 'maxbandwidth':
+                # bytes per second like '200M/s', 0 means unlimited
+                rate = None
+                try:
+                    rate = human2bytes(re.sub(r'(?i)\s*(?:/s|ps)$', '',
+                            val.strip()), verbose = self.verbose)
+                except ValueError, e:
+                    rate = None
+                if rate is None or rate < 0:
+                    msg = (_("Invalid value '%(value)s' for option " +
+                             "'%(option)s' given.")
+                            % {'value': val, 'option': key})
+                    self.logger.warning(msg)
+                    return False
+                val = rate
+            elif key == 'minfreespace':
+                # percentage of the filesystem like '15%' or bytes
+                watermark = None
+                try:
+                    match = re.search(r'^\s*(\d+(?:\.\d*)?)\s*%\s*$', val)
+                    if match:
+                        percent = float(match.group(1))
+                        if percent < 100:
+                            watermark = {'percent': percent}
+                    else:
+                        watermark = {'bytes': human2bytes(val,
+                                verbose = self.verbose)}
+                except ValueError, e:
+                    watermark = None
+                if watermark is None:
+                    msg = (_("Invalid value '%(value)s' for option " +
+                             "'%(option)s' given.")
+                            % {'value': val, 'option': key})
+                    self.logger.warning(msg)
+                    return False
+                val = watermark
+            elif key == 'gradualdelete':
+                # <threshold> [<step> [<pause in seconds>]]
+                gradual = {
+                    'threshold': None,
+                    'step':      truncate_step,
+                    'pause':     truncate_pause,
+                }
+                fields = val.split()
+                try:
+                    if len(fields) < 1 or len(fields) > 3:
+                        raise ValueError()
+                    gradual['threshold'] = human2bytes(fields[0],
+                            verbose = self.verbose)
+                    if len(fields) > 1:
+                        gradual['step'] = human2bytes(fields[1],
+                                verbose = self.verbose)
+                    if len(fields) > 2:
+                        gradual['pause'] = float(fields[2])
+                except ValueError, e:
+                    gradual['threshold'] = None
+                if (gradual['threshold'] is None or
+                        gradual['threshold'] < 0 or
+                        not gradual['step'] or gradual['step'] < 1 or
+                        gradual['pause'] < 0):
+                    msg = (_("Invalid value '%(value)s' for option " +
+                             "'%(option)s' given.")
+                            % {'value': val, 'option': key})
+                    self.logger.warning(msg)
+                    return False
+                val = gradual
+            elif key == 'deletejobs':
+                jobs = 0
+                try:
+                    jobs = int(val)
+                except ValueError, e:
+                    jobs = 0
+                if jobs < 1:
+                    msg = (_("Invalid value '%(value)s' for option " +
+                             "'%(option)s' given.")
+                            % {'value': val, 'option': key})
+                    self.logger.warning(msg)
+                    return False
+                val = jobs
+            elif key == 'devicejobs':
+                # 'auto' (None) or a fixed number for every device
+                jobs = None
+                if val.strip().lower() != 'auto':
+                    try:
+                        jobs = int(val)
+                    except ValueError, e:
+                        jobs = 0
+                    if jobs < 1:
+                        msg = (_("Invalid value '%(value)s' for option " +
+                                 "'%(option)s' given.")
+                                % {'value': val, 'option': key})
+                        self.logger.warning(msg)
+                        return False
+                val = jobs
             if self.verbose > 4:
                 msg = (_("Setting global option '%(option)s' " +
                          "to '%(value)s'.")
@@ -1379,6 +1618,37 @@ class LogrotateConfigurationReader(object):
             directive['maxage'] = option_value
             return True
 
+        # get time budget for compressing the old log files
+        match = re.search(r'^(not?)?compressbudget$', option, re.IGNORECASE)
+        if match:
+            negated = False
+            if match.group(1) is not None:
+                negated = True
+            if (val is None) or re.search(r'^\s*$', val) is not None:
+                negated = True
+            option_value = None
+            if not negated:
+                try:
+                    option_value = duration2seconds(val)
+                except ValueError, e:
+                    msg = _("Invalid compressbudget definition: '%s'") % (val)
+                    self.logger.warning(msg)
+                    return False
+                if option_value <= 0:
+                    option_value = None
+            if self.verbose > 4:
+                msg = (_("Setting '%(what)s' in '%(directive)s' " +
+                         "to %(to)s seconds.")
+                        % { 'what': 'compressbudget',
+                            'directive': directive_str,
+                            'to': str(option_value),
+                          })
+                msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                % {'file': filename, 'lnr': linenr})
+                self.logger.debug(msg)
+            directive['compressbudget'] = option_value
+            return True
+
         # Setting date extension of rotated log files
         match = re.search(r'^(no)?dateext$', option, re.IGNORECASE)
         if match:
@@ -1489,6 +1759,15 @@ class LogrotateConfigurationReader(object):
                 directive['create']['enabled'] = False
                 return True
 
+            if directive['copyinplace']:
+                msg = _("Option '%s' was set, so option 'create' "
+                         + "has no effect.") % ('copyinplace')
+                msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                % {'file': filename, 'lnr': linenr})
+                self.logger.warning(msg)
+                directive['create']['enabled'] = False
+                return True
+
             values = []
             if val is not None:
                 values = split_parts(val)
@@ -1669,6 +1948,297 @@ class LogrotateConfigurationReader(object):
             directive['olddir']['group'] = group
             return True
 
+        # Check for rotation in place
+        match = re.search(r'^(not?)?copyinplace$', option, re.IGNORECASE)
+        if match:
+            if match.group(1) is not None:
+                if self.verbose > 4:
+                    msg = _("Removing '%s'.") % ('copyinplace')
+                    msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                    % {'file': filename, 'lnr': linenr})
+                    self.logger.debug(msg)
+                directive['copyinplace'] = None
+                return True
+            method = 'punchhole'
+            if (val is not None) and (re.search(r'^\s*$', val) is None):
+                method = val.strip().lower()
+            if not method in inplace_methods:
+                msg = (_("Invalid method '%(method)s' for option " +
+                         "'%(option)s'.")
+                        % {'method': val, 'option': 'copyinplace'})
+                self.logger.warning(msg)
+                return False
+            for key in ('copy', 'copytruncate'):
+                if directive[key]:
+                    msg = (_("Option '%(by)s' disables option '%(what)s'.")
+                            % {'by': 'copyinplace', 'what': key})
+                    msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                    % {'file': filename, 'lnr': linenr})
+                    self.logger.warning(msg)
+                    directive[key] = False
+            if directive['create']['enabled']:
+                msg = (_("Option '%(by)s' disables option '%(what)s'.")
+                        % {'by': 'copyinplace', 'what': 'create'})
+                msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                % {'file': filename, 'lnr': linenr})
+                self.logger.warning(msg)
+                directive['create']['enabled'] = False
+            if self.verbose > 4:
+                msg = (_("Setting '%(what)s' in '%(directive)s' to %(to)s.")
+                        % { 'what': 'copyinplace',
+                            'directive': directive_str,
+                            'to': method
+                          })
+                msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                % {'file': filename, 'lnr': linenr})
+                self.logger.debug(msg)
+            directive['copyinplace'] = method
+            return True
+
+        # Check for handling of incompressible files
+        match = re.search(r'^(not?)?incompressible$', option, re.IGNORECASE)
+        if match:
+            if match.group(1) is not None:
+                if self.verbose > 4:
+                    msg = _("Removing '%s'.") % ('incompressible')
+                    msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                    % {'file': filename, 'lnr': linenr})
+                    self.logger.debug(msg)
+                directive['incompressible'] = None
+                return True
+            values = []
+            if val is not None:
+                values = split_parts(val)
+            if len(values) < 1 or len(values) > 2:
+                msg = (_("Invalid definition for '%(option)s': '%(value)s'.")
+                        % {'option': 'incompressible', 'value': val})
+                self.logger.warning(msg)
+                return False
+            ratio = None
+            ratio_match = re.search(r'^\s*(\d+(?:\.\d*)?)\s*(%)?\s*$',
+                    values[0])
+            if ratio_match:
+                ratio = float(ratio_match.group(1))
+                if ratio_match.group(2) is not None:
+                    ratio /= 100
+            if ratio is None or ratio <= 0 or ratio > 1:
+                msg = (_("Invalid ratio '%(value)s' for option " +
+                         "'%(option)s', it must be between 0 and 1 " +
+                         "or between 0%% and 100%%.")
+                        % {'value': values[0], 'option': 'incompressible'})
+                self.logger.warning(msg)
+                return False
+            action = 'skip'
+            if len(values) > 1:
+                action = values[1].lower()
+            if not action in incompressible_actions:
+                msg = (_("Invalid action '%(action)s' for option " +
+                         "'%(option)s'.")
+                        % {'action': values[1], 'option': 'incompressible'})
+                self.logger.warning(msg)
+                return False
+            if self.verbose > 4:
+                msg = (_("Setting '%(what)s' in '%(directive)s' to " +
+                         "%(action)s above a ratio of %(ratio).2f.")
+                        % { 'what': 'incompressible',
+                            'directive': directive_str,
+                            'action': action,
+                            'ratio': ratio,
+                          })
+                msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                % {'file': filename, 'lnr': linenr})
+                self.logger.debug(msg)
+            directive['incompressible'] = {
+                'ratio':  ratio,
+                'action': action,
+            }
+            return True
+
+        # Check for digests of the archived logfiles
+        match = re.search(r'^(not?)?digests?$', option, re.IGNORECASE)
+        if match:
+            if match.group(1) is not None:
+                if self.verbose > 4:
+                    msg = _("Removing '%s'.") % ('digest')
+                    msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                    % {'file': filename, 'lnr': linenr})
+                    self.logger.debug(msg)
+                directive['digest'] = None
+                return True
+            values = []
+            if val is not None:
+                values = split_parts(val)
+            if len(values) < 1 or len(values) > 2:
+                msg = (_("Invalid definition for '%(option)s': '%(value)s'.")
+                        % {'option': 'digest', 'value': val})
+                self.logger.warning(msg)
+                return False
+            algorithms = []
+            for algorithm in re.split(r'\s*,\s*', values[0].lower()):
+                if not valid_algorithm(algorithm):
+                    msg = (_("Invalid digest algorithm '%s' given.")
+                            % (algorithm))
+                    self.logger.warning(msg)
+                    return False
+                if not algorithm in algorithms:
+                    algorithms.append(algorithm)
+            mode = 'output'
+            if len(values) > 1:
+                mode = values[1].lower()
+            if not mode in digest_modes:
+                msg = (_("Invalid mode '%(mode)s' for option " +
+                         "'%(option)s'.")
+                        % {'mode': values[1], 'option': 'digest'})
+                self.logger.warning(msg)
+                return False
+            if self.verbose > 4:
+                msg = (_("Setting '%(what)s' in '%(directive)s' to " +
+                         "%(algorithms)s (%(mode)s).")
+                        % { 'what': 'digest',
+                            'directive': directive_str,
+                            'algorithms': ', '.join(algorithms),
+                            'mode': mode,
+                          })
+                msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                % {'file': filename, 'lnr': linenr})
+                self.logger.debug(msg)
+            directive['digest'] = {
+                'algorithms': algorithms,
+                'mode':       mode,
+            }
+            return True
+
+        # Check for the usage of the page cache by copying and compressing
+        match = re.search(r'^cachepolicy$', option, re.IGNORECASE)
+        if match:
+            if (val is None) or (re.search(r'^\s*$', val) is not None):
+                msg = _("Option '%s' without a value.") % ('cachepolicy')
+                self.logger.warning(msg)
+                return False
+            policy = val.strip().lower()
+            if not policy in cache_policies:
+                msg = (_("Invalid value '%(value)s' for option " +
+                         "'%(option)s'.")
+                        % {'value': val, 'option': 'cachepolicy'})
+                self.logger.warning(msg)
+                return False
+            if self.verbose > 4:
+                msg = (_("Setting '%(what)s' in '%(directive)s' to %(to)s.")
+                        % { 'what': 'cachepolicy',
+                            'directive': directive_str,
+                            'to': policy
+                          })
+                msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                % {'file': filename, 'lnr': linenr})
+                self.logger.debug(msg)
+            directive['cachepolicy'] = policy
+            return True
+
+        # Check for bundling of the rotated logfiles into a tar archive
+        match = re.search(r'^(not?)?bundle$', option, re.IGNORECASE)
+        if match:
+            if match.group(1) is not None:
+                if self.verbose > 4:
+                    msg = _("Removing '%s'.") % ('bundle')
+                    msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                    % {'file': filename, 'lnr': linenr})
+                    self.logger.debug(msg)
+                directive['bundle'] = None
+                return True
+            name = ''
+            if (val is not None) and (re.search(r'^\s*$', val) is None):
+                name = val.strip()
+                if re.search(r'[/\s*?\[\]]', name):
+                    msg = (_("Invalid name '%(value)s' for option " +
+                             "'%(option)s'.")
+                            % {'value': val, 'option': 'bundle'})
+                    self.logger.warning(msg)
+                    return False
+            if self.verbose > 4:
+                msg = (_("Setting '%(what)s' in '%(directive)s' to %(to)s.")
+                        % { 'what': 'bundle',
+                            'directive': directive_str,
+                            'to': (name or '*'),
+                          })
+                msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                % {'file': filename, 'lnr': linenr})
+                self.logger.debug(msg)
+            directive['bundle'] = name
+            return True
+
+        # Check for seekable compressed files with a sidecar index
+        match = re.search(r'^(not?)?compressindex$', option, re.IGNORECASE)
+        if match:
+            if match.group(1) is not None:
+                if self.verbose > 4:
+                    msg = _("Removing '%s'.") % ('compressindex')
+                    msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                    % {'file': filename, 'lnr': linenr})
+                    self.logger.debug(msg)
+                directive['compressindex'] = None
+                return True
+            block_size = index_block_size
+            if (val is not None) and (re.search(r'^\s*$', val) is None):
+                try:
+                    block_size = human2bytes(val, verbose = self.verbose)
+                except ValueError, e:
+                    block_size = 0
+                if block_size <= 0:
+                    msg = (_("Invalid definition for '%(option)s': " +
+                             "'%(value)s'.")
+                            % {'option': 'compressindex', 'value': val})
+                    self.logger.warning(msg)
+                    return False
+            if self.verbose > 4:
+                msg = (_("Setting size option '%(option)s' in " +
+                         "'%(directive)s' to %(bytes)d bytes.")
+                        % {'option': 'compressindex',
+                           'directive': directive_str,
+                           'bytes': block_size})
+                msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                % {'file': filename, 'lnr': linenr})
+                self.logger.debug(msg)
+            directive['compressindex'] = int(block_size)
+            return True
+
+        # Check for options with a size value
+        pattern = r'^(not?)?(' + '|'.join(size_options) + r')$'
+        match = re.search(pattern, option, re.IGNORECASE)
+        if match:
+            negated = match.group(1)
+            key     = match.group(2).lower()
+            if negated is not None:
+                if self.verbose > 4:
+                    msg = _("Removing '%s'.") % (key)
+                    msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                    % {'file': filename, 'lnr': linenr})
+                    self.logger.debug(msg)
+                directive[key] = None
+                return True
+            if (val is None) or (re.search(r'^\s*$', val) is not None):
+                msg = _("Option '%s' must have a value.") % (key)
+                self.logger.warning(msg)
+                return False
+            size_bytes = None
+            try:
+                size_bytes = human2bytes(val, verbose = self.verbose)
+            except ValueError, e:
+                msg = (_("Invalid definition for '%(option)s': '%(value)s'.")
+                        % {'option': key, 'value': val})
+                self.logger.warning(msg)
+                return False
+            if self.verbose > 4:
+                msg = (_("Setting size option '%(option)s' in " +
+                         "'%(directive)s' to %(bytes)d bytes.")
+                        % {'option': key,
+                           'directive': directive_str,
+                           'bytes': size_bytes})
+                msg += " " + ( _("(file '%(file)s', line %(lnr)s)")
+                                % {'file': filename, 'lnr': linenr})
+                self.logger.debug(msg)
+            directive[key] = size_bytes
+            return True
+
         # Check for minimum size for ratation
         match = re.search(r'^size(?:(?:\s*=|\s)|$)', line, re.IGNORECASE)
         if match:
@@ -2093,11 +2663,20 @@ class LogrotateConfigurationReader(object):
         self.new_log['compress']      = self.default['compress']
         self.new_log['compresscmd']   = self.default['compresscmd']
         self.new_log['compressext']   = self.default['compressext']
+        self.new_log['compresslevel'] = self.default['compresslevel']
+        self.new_log['compressbudget'] = self.default['compressbudget']
+        self.new_log['incompressible'] = self.default['incompressible']
+        self.new_log['compressindex'] = self.default['compressindex']
+        self.new_log['bundle'] = self.default['bundle']
+        self.new_log['digest'] = self.default['digest']
+        self.new_log['cachepolicy'] = self.default['cachepolicy']
         self.new_log['compressoptions']  = self.default['compressoptions']
         self.new_log['configfile']    = config_file
         self.new_log['configrow']     = rownum
         self.new_log['copy']          = self.default['copy']
         self.new_log['copytruncate']  = self.default['copytruncate']
+        self.new_log['copytruncatedelta'] = self.default['copytruncatedelta']
+        self.new_log['copyinplace']   = self.default['copyinplace']
         self.new_log['create']        = {
             'enabled': self.default['create']['enabled'],
             'mode':    self.default['create']['mode'],
@@ -2113,6 +2692,7 @@ class LogrotateConfigurationReader(object):
         self.new_log['mailaddress']   = self.default['mailaddress']
         self.new_log['mailfirst']     = self.default['mailfirst']
         self.new_log['maxage']        = self.default['maxage']
+        self.new_log['maxtotalsize']  = self.default['maxtotalsize']
         self.new_log['missingok']     = self.default['missingok']
         self.new_log['olddir']        = {
             'dirname':    self.default['olddir']['dirname'],
@@ -2127,10 +2707,43 @@ class LogrotateConfigurationReader(object):
         self.new_log['shred']         = self.default['shred']
         self.new_log['size']          = self.default['size']
         self.new_log['start']         = self.default['start']
+        self.new_log['purgepriority'] = self.default['purgepriority']
 
         for script_type in script_directives:
             self.new_log[script_type] = None
 
+    #------------------------------------------------------------
+    def _check_compress_level(self):
+        '''
+        Checks the compresslevel of self.new_log against the range of
+        its internal compressor, e.g. 1 - 9 for gzip and 1 - 22 for
+        zstd. An invalid level is replaced by the default level of the
+        compressor. External commands don't get a level.
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        level = self.new_log['compresslevel']
+        cmd = self.new_log['compresscmd']
+        if level is None or not cmd in compressors:
+            return
+
+        max_level = compressors[cmd]['max_level']
+        if level <= max_level:
+            return
+
+        msg = (_("Invalid compression level %(level)d for compressor " +
+                 "'%(cmd)s', it must be between 1 and %(max)d, using " +
+                 "its default level (file of definition: '%(file)s', " +
+                 "start definition: %(rownum)d).")
+                % {'level': level, 'cmd': cmd, 'max': max_level,
+                   'file': self.new_log['configfile'],
+                   'rownum': self.new_log['configrow']})
+        self.logger.warning(msg)
+        self.new_log['compresslevel'] = None
+
     #------------------------------------------------------------
     def _assign_logfiles(self):
         '''
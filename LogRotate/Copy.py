@@ -0,0 +1,1329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: module for a copy engine object to copy logfiles
+          with the fastest method the kernel provides
+'''
+
+# Standard modules
+import re
+import sys
+import logging
+import pprint
+import gettext
+import os
+import os.path
+import errno
+import fcntl
+import shutil
+import time
+
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None
+
+# Third party modules
+
+# Own modules
+try:
+    import LogRotate.Common
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(sys.path[0], '..')))
+    import LogRotate.Common
+
+from LogRotate.Common import bytes2human
+
+from LogRotate.Throttle import consume
+from LogRotate.Throttle import limited
+from LogRotate.Throttle import throttle_chunk
+
+revision = '$Revision$'
+revision = re.sub( r'\$', '', revision )
+revision = re.sub( r'Revision: ', r'r', revision )
+revision = re.sub( r'\s*$', '', revision )
+
+__author__    = 'Frank Brehm'
+__copyright__ = '(C) 2011 by Frank Brehm, Berlin'
+__contact__    = 'frank@brehm-online.com'
+__version__    = '0.1.0 ' + revision
+__license__    = 'GPL3'
+
+#========================================================================
+# Module variables
+
+# @var: ioctl request number of FICLONE (_IOW(0x94, 9, int)),
+#       clones a whole file on btrfs and XFS (reflink)
+FICLONE = 0x40049409
+
+# @var: all copy strategies in the order, in which they are tried
+copy_strategies = (
+    'reflink',
+    'copy_file_range',
+    'sendfile',
+    'userspace',
+)
+
+# @var: error numbers, on which a copy strategy is treated as
+#       not usable for the given files and the next one is tried
+fallback_errnos = (
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EBADF,
+    errno.EPERM,
+)
+
+# @var: maximum amount of bytes to transfer with a single syscall
+max_chunk = 1024 * 1024 * 1024
+
+# @var: whence values of lseek(2) for walking through data and holes
+#       (not defined in the os module of Python 2)
+SEEK_DATA = 3
+SEEK_HOLE = 4
+
+# @var: mode flags of fallocate(2)
+FALLOC_FL_KEEP_SIZE = 0x01
+FALLOC_FL_PUNCH_HOLE = 0x02
+FALLOC_FL_COLLAPSE_RANGE = 0x08
+
+# @var: valid methods for freeing the space of a logfile after
+#       a rotation in place
+inplace_methods = (
+    'punchhole',
+    'collapse',
+)
+
+# @var: maximum number of catch-up rounds of copy_truncate(), before
+#       the logfile is truncated regardless of the remaining delta
+catchup_max_rounds = 16
+
+# @var: advices of posix_fadvise(2)
+POSIX_FADV_SEQUENTIAL = 2
+POSIX_FADV_DONTNEED = 4
+
+# @var: valid values of the option 'cachepolicy':
+#       - keep:       no hints, the data remains in the page cache
+#       - sequential: sequential readahead hints for the read files
+#       - dontneed:   additional the read data and the written data
+#                     (after syncing it) are dropped from the page cache
+cache_policies = (
+    'keep',
+    'sequential',
+    'dontneed',
+)
+
+# @var: suffix of the hidden files in the directory of a logfile, which
+#       wait for their migration into an olddir on another filesystem
+staging_suffix = '.migrating'
+
+# @var: the C library for the syscalls, which are not available
+#       in the os module (copy_file_range(2), sendfile(2))
+libc = None
+if ctypes is not None:
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno = True)
+    except OSError:
+        libc = None
+
+if libc is not None:
+    if hasattr(libc, 'copy_file_range'):
+        libc.copy_file_range.restype = ctypes.c_long
+        libc.copy_file_range.argtypes = [
+                ctypes.c_int, ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p,
+                ctypes.c_size_t, ctypes.c_uint ]
+    if hasattr(libc, 'sendfile'):
+        libc.sendfile.restype = ctypes.c_long
+        libc.sendfile.argtypes = [
+                ctypes.c_int, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t ]
+    if hasattr(libc, 'fallocate64'):
+        libc.fallocate64.restype = ctypes.c_int
+        libc.fallocate64.argtypes = [
+                ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong ]
+
+# @var: posix_fadvise(2) with 64 bit offsets, if available
+_posix_fadvise = None
+if libc is not None:
+    for _name in ('posix_fadvise64', 'posix_fadvise'):
+        if hasattr(libc, _name):
+            _posix_fadvise = getattr(libc, _name)
+            _posix_fadvise.restype = ctypes.c_int
+            _posix_fadvise.argtypes = [
+                    ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong,
+                    ctypes.c_int ]
+            break
+
+#========================================================================
+
+def first_data_offset(fd):
+    '''
+    Retrieves the offset of the first data in the file behind fd, that
+    means the size of a leading hole, e.g. after a rotation in place.
+    Only real holes are skipped, never data bytes, even if they
+    are zero (e.g. the records of wtmp).
+
+    @param fd: file descriptor of an open file
+    @type fd:  int
+
+    @return: offset of the first data byte or the file size, if the
+             file contains no data at all
+    @rtype:  int
+    '''
+
+    pos = os.lseek(fd, 0, os.SEEK_CUR)
+    try:
+        return os.lseek(fd, 0, SEEK_DATA)
+    except OSError, e:
+        if e.errno == errno.ENXIO:
+            return os.fstat(fd).st_size
+        return 0
+    finally:
+        os.lseek(fd, pos, os.SEEK_SET)
+
+#------------------------------------------------------------------------
+
+def is_sparse(fd):
+    '''
+    Checks, whether the file behind fd has holes, that means, it has
+    less allocated blocks than its size needs.
+
+    @param fd: file descriptor of an open file
+    @type fd:  int
+
+    @return: the file is sparse
+    @rtype:  bool
+    '''
+
+    statinfo = os.fstat(fd)
+    return (statinfo.st_blocks * 512) < statinfo.st_size
+
+#------------------------------------------------------------------------
+
+def data_extents(fd, start = 0, end = None):
+    '''
+    Generator for all data extents of the file behind fd between
+    start and end by walking with SEEK_DATA and SEEK_HOLE, the holes
+    between them are skipped. If the filesystem doesn't support
+    SEEK_DATA, the whole range is given back as one extent.
+    The file position is changed.
+
+    @param fd:    file descriptor of an open file
+    @type fd:     int
+    @param start: offset to start from
+    @type start:  int
+    @param end:   offset to stop, None means the end of file
+    @type end:    int or None
+
+    @return: tuples of the start and end offset of the data extents
+    @rtype:  generator
+    '''
+
+    if end is None:
+        end = os.fstat(fd).st_size
+
+    offset = start
+    while offset < end:
+        try:
+            data_start = os.lseek(fd, offset, SEEK_DATA)
+        except OSError, e:
+            if e.errno == errno.ENXIO:
+                return
+            # SEEK_DATA is not supported
+            yield (offset, end)
+            return
+        if data_start >= end:
+            return
+        data_end = min(os.lseek(fd, data_start, SEEK_HOLE), end)
+        yield (data_start, data_end)
+        offset = data_end
+
+#------------------------------------------------------------------------
+
+def fadvise(fd, advice, offset = 0, length = 0):
+    '''
+    Gives an advice about the access pattern of the file behind fd
+    to the kernel with posix_fadvise(2). It's only a hint, so all
+    errors are ignored.
+
+    @param fd:     file descriptor of an open file
+    @type fd:      int
+    @param advice: the advice, e.g. POSIX_FADV_DONTNEED
+    @type advice:  int
+    @param offset: start of the range
+    @type offset:  int
+    @param length: length of the range, 0 means until the end of file
+    @type length:  int
+
+    @return: the advice was given successful
+    @rtype:  bool
+    '''
+
+    if _posix_fadvise is None:
+        return False
+    return _posix_fadvise(fd, offset, length, advice) == 0
+
+#------------------------------------------------------------------------
+
+def advise_read(fd, cache_policy):
+    '''
+    Gives the sequential readahead hint for a file to read completely,
+    if the cache policy is not 'keep'.
+
+    @param fd:           file descriptor of a file open for reading
+    @type fd:            int
+    @param cache_policy: one of cache_policies
+    @type cache_policy:  str
+
+    @return: None
+    '''
+
+    if cache_policy != 'keep':
+        fadvise(fd, POSIX_FADV_SEQUENTIAL)
+
+#------------------------------------------------------------------------
+
+def drop_cache(fd, written = False):
+    '''
+    Drops the pages of the file behind fd from the page cache. Only clean
+    pages can be dropped, so the data of a written file is synced before.
+
+    @param fd:      file descriptor of an open file
+    @type fd:       int
+    @param written: the file was written and is not synced yet
+    @type written:  bool
+
+    @return: None
+    '''
+
+    if _posix_fadvise is None:
+        return
+    if written:
+        os.fdatasync(fd)
+    fadvise(fd, POSIX_FADV_DONTNEED)
+
+#------------------------------------------------------------------------
+
+def iter_chunks(fd, chunk_size, cache_policy = 'keep'):
+    '''
+    Generator for the whole content of the file behind fd in chunks of
+    maximum chunk_size bytes, e.g. for compressing. The holes of a
+    sparse file are given back as zeros without reading them.
+
+    @param fd:           file descriptor of a file open for reading
+    @type fd:            int
+    @param chunk_size:   maximum size of a chunk
+    @type chunk_size:    int
+    @param cache_policy: one of cache_policies, with 'dontneed' every
+                         read chunk is dropped from the page cache
+                         behind the reader
+    @type cache_policy:  str
+
+    @return: chunks of the file content
+    @rtype:  generator
+    '''
+
+    advise_read(fd, cache_policy)
+    drop_behind = (cache_policy == 'dontneed')
+
+    extents = [(0, None)]
+    size = os.fstat(fd).st_size
+    if is_sparse(fd):
+        extents = list(data_extents(fd, 0, size))
+        extents.append((size, size))
+
+    zeros = None
+    offset = 0
+    for (data_start, data_end) in extents:
+
+        # the hole before the data extent
+        while data_start is not None and offset < data_start:
+            if zeros is None:
+                zeros = '\0' * chunk_size
+            length = min(chunk_size, data_start - offset)
+            if length < chunk_size:
+                yield zeros[:length]
+            else:
+                yield zeros
+            offset += length
+
+        os.lseek(fd, offset, os.SEEK_SET)
+        while data_end is None or offset < data_end:
+            length = chunk_size
+            if data_end is not None:
+                length = min(length, data_end - offset)
+            chunk = os.read(fd, length)
+            if not chunk:
+                break
+            consume(len(chunk))
+            if drop_behind:
+                fadvise(fd, POSIX_FADV_DONTNEED, offset, len(chunk))
+            offset += len(chunk)
+            yield chunk
+
+#------------------------------------------------------------------------
+
+def data_size(filename):
+    '''
+    Retrieves the size of the data in the given file without a leading
+    hole, it's the same like the file size for all files, which were
+    not rotated in place by punching holes.
+
+    @param filename: the file to inspect
+    @type filename:  str
+
+    @return: size of the data in the file
+    @rtype:  int
+    '''
+
+    fd = os.open(filename, os.O_RDONLY)
+    try:
+        return os.fstat(fd).st_size - first_data_offset(fd)
+    finally:
+        os.close(fd)
+
+#========================================================================
+
+class LogRotateCopierError(Exception):
+    '''
+    Base class for exceptions in this module.
+    '''
+
+#========================================================================
+
+class LogRotateCopier(object):
+    '''
+    Class for a copy engine object, which copies the content of a file
+    by trying a reflink, copy_file_range(2), sendfile(2) and at last
+    a copy in userspace with a large buffer.
+
+    @author: Frank Brehm
+    @contact: frank@brehm-online.com
+    '''
+
+    #-------------------------------------------------------
+    def __init__( self, local_dir   = None,
+                        verbose     = 0,
+                        test_mode   = False,
+                        strategies  = None,
+                        buffer_size = (4 * 1024 * 1024),
+    ):
+        '''
+        Constructor.
+
+        @param local_dir:   The directory, where the i18n-files (*.mo)
+                            are located. If None, then system default
+                            (/usr/share/locale) is used.
+        @type local_dir:    str or None
+        @param verbose:     verbosity (debug) level
+        @type verbose:      int
+        @param test_mode:   test mode - no write actions are made
+        @type test_mode:    bool
+        @param strategies:  list of copy strategies to try in this order,
+                            if None, all of copy_strategies are tried
+        @type strategies:   list or None
+        @param buffer_size: size of the buffer for copying in userspace
+        @type buffer_size:  int
+
+        @return: None
+        '''
+
+        self.t = gettext.translation(
+            'pylogrotate',
+            local_dir,
+            fallback = True
+        )
+        '''
+        @ivar: a gettext translation object
+        @type: gettext.translation
+        '''
+
+        _ = self.t.lgettext
+
+        self.verbose = verbose
+        '''
+        @ivar: verbosity level (0 - 9)
+        @type: int
+        '''
+
+        self.test_mode = test_mode
+        '''
+        @ivar: test mode - no write actions are made
+        @type: bool
+        '''
+
+        self.logger = logging.getLogger('pylogrotate.copy')
+        '''
+        @ivar: logger object
+        @type: logging.getLogger
+        '''
+
+        self.strategies = list(copy_strategies)
+        '''
+        @ivar: the copy strategies to try in this order
+        @type: list
+        '''
+        if strategies is not None:
+            for strategy in strategies:
+                if not strategy in copy_strategies:
+                    msg = _("Invalid copy strategy '%s' given.") % (strategy)
+                    raise LogRotateCopierError(msg)
+            self.strategies = list(strategies)
+
+        self.buffer_size = buffer_size
+        '''
+        @ivar: size of the buffer for copying in userspace
+        @type: int
+        '''
+
+        self.disabled = {}
+        '''
+        @ivar: copy strategies, which are not supported by the running
+               system at all (ENOSYS or missing in the C library)
+        @type: dict
+        '''
+        if libc is None or not hasattr(libc, 'copy_file_range'):
+            self.disabled['copy_file_range'] = True
+        if libc is None or not hasattr(libc, 'sendfile'):
+            self.disabled['sendfile'] = True
+
+    #------------------------------------------------------------
+    def __str__(self):
+        '''
+        Typecasting function for translating object structure
+        into a string
+
+        @return: structure as string
+        @rtype:  str
+        '''
+
+        pp = pprint.PrettyPrinter(indent=4)
+        structure = self.as_dict()
+        return pp.pformat(structure)
+
+    #-------------------------------------------------------
+    def as_dict(self):
+        '''
+        Transforms the elements of the object into a dict
+
+        @return: structure as dict
+        @rtype:  dict
+        '''
+
+        res = {
+            'buffer_size': self.buffer_size,
+            'disabled':    self.disabled,
+            'logger':      self.logger,
+            'strategies':  self.strategies,
+            't':           self.t,
+            'test_mode':   self.test_mode,
+            'verbose':     self.verbose,
+        }
+
+        return res
+
+    #------------------------------------------------------------
+    def copy(self, source, target, digests = None, cache_policy = 'keep'):
+        '''
+        Copies the content and the metadata of the source file onto
+        the target file (like shutil.copy2()) with the fastest available
+        copy strategy and logs the used strategy and the throughput.
+
+        It raises a LogRotateCopierError on errors.
+
+        @param source:  the file to copy
+        @type source:   str
+        @param target:  the name of the copied file
+        @type target:   str
+        @param digests: digests of the copied data to compute on the fly
+                        (see copy_data()) or None
+        @type digests:  LogRotate.Digest.DigestSet or None
+        @param cache_policy: the usage of the page cache, one of
+                             cache_policies
+        @type cache_policy:  str
+
+        @return: the used copy strategy
+        @rtype:  str
+        '''
+
+        _ = self.t.lgettext
+
+        if self.test_mode:
+            return None
+
+        fd_in = None
+        fd_out = None
+        try:
+            (fd_in, fd_out) = self._open_files(source, target)
+            advise_read(fd_in, cache_policy)
+
+            start = time.time()
+            (strategy, copied) = self.copy_data(fd_in, fd_out,
+                    digests = digests)
+            self._release_cache(fd_in, fd_out, cache_policy)
+            duration = time.time() - start
+        finally:
+            if fd_out is not None:
+                os.close(fd_out)
+            if fd_in is not None:
+                os.close(fd_in)
+
+        try:
+            shutil.copystat(source, target)
+        except OSError, e:
+            msg = (_("Error on copying permissions and timestamps " +
+                     "'%(from)s' => '%(to)s': %(err)s")
+                    % {'from': source, 'to': target, 'err': e.strerror})
+            raise LogRotateCopierError(msg)
+
+        self.log_throughput(source, target, strategy, copied, duration)
+
+        return strategy
+
+    #------------------------------------------------------------
+    def copy_truncate(self, source, target, threshold, digests = None,
+            cache_policy = 'keep'):
+        '''
+        Copies the source file onto the target file and truncates
+        the source file afterwards with a minimal loss of data.
+
+        After the first copy the newly appended delta of the source file
+        is copied again and again, until it is below the given threshold
+        (or catchup_max_rounds is reached). Only then the last delta is
+        copied in one single round and the source file is truncated
+        immediately, so the window, in which written lines get lost,
+        doesn't grow with the size of the file.
+
+        It raises a LogRotateCopierError on errors.
+
+        @param source:    the file to copy and to truncate
+        @type source:     str
+        @param target:    the name of the copied file
+        @type target:     str
+        @param threshold: maximum size of the delta in bytes, which may
+                          be copied directly before truncating
+        @type threshold:  int
+        @param digests:   digests of the copied data to compute on the
+                          fly (see copy_data()) or None
+        @type digests:    LogRotate.Digest.DigestSet or None
+        @param cache_policy: the usage of the page cache, one of
+                             cache_policies
+        @type cache_policy:  str
+
+        @return: the used copy strategy and the number of bytes, which
+                 were appended after the last copy and so have been
+                 lost (a lower bound, writes between the fstat()
+                 directly before the truncation and the truncation
+                 itself can't be detected)
+        @rtype:  tuple
+        '''
+
+        _ = self.t.lgettext
+
+        if self.test_mode:
+            return (None, 0)
+
+        fd_in = None
+        fd_out = None
+        fd_trunc = None
+        try:
+            (fd_in, fd_out) = self._open_files(source, target)
+            try:
+                fd_trunc = os.open(source, os.O_WRONLY)
+            except OSError, e:
+                msg = (_("Error on truncing file '%(from)s': %(err)s")
+                        % {'from': source, 'err': e.strerror})
+                raise LogRotateCopierError(msg)
+            advise_read(fd_in, cache_policy)
+
+            start = time.time()
+            (strategy, copied) = self.copy_data(fd_in, fd_out,
+                    digests = digests)
+
+            rounds = 0
+            while True:
+                delta = os.fstat(fd_in).st_size - copied
+                if delta <= threshold or rounds >= catchup_max_rounds:
+                    break
+                rounds += 1
+                if self.verbose > 2:
+                    msg = (_("Catch-up round %(round)d: copying delta of " +
+                             "%(bytes)d bytes of '%(file)s'.")
+                            % {'round': rounds, 'bytes': delta,
+                               'file': source})
+                    self.logger.debug(msg)
+                copied += self.copy_data(fd_in, fd_out, delta,
+                        digests)[1]
+
+            # the last delta in a single round and truncating as fast as
+            # possible, the size is taken immediately before truncating,
+            # so everything written after the last copy is counted as lost
+            delta = os.fstat(fd_in).st_size - copied
+            if delta > 0:
+                copied += self.copy_data(fd_in, fd_out, delta, digests)[1]
+            statinfo = os.fstat(fd_in)
+            try:
+                os.ftruncate(fd_trunc, 0)
+            except OSError, e:
+                msg = (_("Error on truncing file '%(from)s': %(err)s")
+                        % {'from': source, 'err': e.strerror})
+                raise LogRotateCopierError(msg)
+            self._release_cache(None, fd_out, cache_policy)
+            duration = time.time() - start
+        finally:
+            for fd in (fd_trunc, fd_out, fd_in):
+                if fd is not None:
+                    os.close(fd)
+
+        lost = max(statinfo.st_size - copied, 0)
+
+        self._copy_stat(source, target, statinfo)
+
+        self.log_throughput(source, target, strategy, copied, duration)
+        if lost:
+            msg = (_("Truncated '%(file)s' after %(rounds)d catch-up " +
+                     "rounds, at least %(lost)d bytes have been lost.")
+                    % {'file': source, 'rounds': rounds, 'lost': lost})
+            self.logger.warning(msg)
+        else:
+            msg = (_("Truncated '%(file)s' after %(rounds)d catch-up " +
+                     "rounds without detected loss.")
+                    % {'file': source, 'rounds': rounds})
+            self.logger.info(msg)
+
+        return (strategy, lost)
+
+    #------------------------------------------------------------
+    def migrate(self, source, target, cache_policy = 'keep'):
+        '''
+        Moves the source file onto another filesystem, where a rename(2)
+        is not possible (EXDEV). The data is streamed with the fastest
+        available copy strategy, the target is synced to disk, gets all
+        metadata (including the ownership, if running as root) and
+        only then the source file is removed.
+
+        It raises a LogRotateCopierError on errors.
+
+        @param source: the file to move
+        @type source:  str
+        @param target: the new name of the file on the other filesystem
+        @type target:  str
+        @param cache_policy: the usage of the page cache, one of
+                             cache_policies
+        @type cache_policy:  str
+
+        @return: the used copy strategy
+        @rtype:  str
+        '''
+
+        _ = self.t.lgettext
+
+        if self.test_mode:
+            return None
+
+        fd_in = None
+        fd_out = None
+        try:
+            (fd_in, fd_out) = self._open_files(source, target)
+            statinfo = os.fstat(fd_in)
+            advise_read(fd_in, cache_policy)
+
+            start = time.time()
+            (strategy, copied) = self.copy_data(fd_in, fd_out)
+            try:
+                os.fsync(fd_out)
+            except OSError, e:
+                msg = (_("Error on syncing '%(file)s': %(err)s")
+                        % {'file': target, 'err': e.strerror})
+                raise LogRotateCopierError(msg)
+            if cache_policy == 'dontneed':
+                # the source is removed afterwards, the target is synced
+                drop_cache(fd_out)
+            duration = time.time() - start
+        finally:
+            for fd in (fd_out, fd_in):
+                if fd is not None:
+                    os.close(fd)
+
+        self._copy_stat(source, target, statinfo)
+        if os.geteuid() == 0:
+            try:
+                os.chown(target, statinfo.st_uid, statinfo.st_gid)
+            except OSError, e:
+                msg = (_("Error on chown of '%(file)s': %(err)s")
+                        % {'file': target, 'err': e.strerror})
+                self.logger.warning(msg)
+
+        try:
+            os.remove(source)
+        except OSError, e:
+            msg = (_("Error on removing file '%(file)s': %(err)s")
+                    % {'file': source, 'err': e.strerror})
+            raise LogRotateCopierError(msg)
+
+        rate = 0
+        if duration > 0:
+            rate = copied / duration
+        msg = (_("Migrated %(bytes)s from '%(from)s' to '%(to)s' " +
+                 "using %(strategy)s in %(secs).3f seconds (%(rate)s/s).")
+                % {'bytes': bytes2human(copied),
+                   'from': source,
+                   'to': target,
+                   'strategy': strategy,
+                   'secs': duration,
+                   'rate': bytes2human(rate)})
+        self.logger.info(msg)
+
+        return strategy
+
+    #------------------------------------------------------------
+    def copy_inplace(self, source, target, method = 'punchhole'):
+        '''
+        Rotation in place: copies the data of the source file onto the
+        target file (with a reflink, if possible) and frees afterwards
+        the space of the copied data in the source file with fallocate(2),
+        so there is no window of lost lines like with copytruncate.
+
+        With the method 'punchhole' the copied range is deallocated
+        (FALLOC_FL_PUNCH_HOLE), the size of the source file doesn't change
+        and writers with O_APPEND or an own file offset simply continue.
+        Only whole filesystem blocks are copied and deallocated, the
+        unaligned rest at the end remains in the source file for the
+        next rotation, so no data byte is ever zeroed.
+        With the method 'collapse' the copied range is removed from the
+        file (FALLOC_FL_COLLAPSE_RANGE), this is only possible for whole
+        filesystem blocks, so the unaligned rest at the end remains in the
+        source file for the next rotation. The writer must use O_APPEND.
+
+        If the filesystem doesn't support the method, 'collapse' falls
+        back to 'punchhole' and 'punchhole' to a truncation like
+        copytruncate.
+
+        It raises a LogRotateCopierError on errors.
+
+        @param source: the file to rotate in place
+        @type source:  str
+        @param target: the name of the copied file
+        @type target:  str
+        @param method: 'punchhole' or 'collapse'
+        @type method:  str
+
+        @return: the used copy strategy and the method, which was used
+                 for freeing the space ('punchhole', 'collapse'
+                 or 'truncate')
+        @rtype:  tuple
+        '''
+
+        _ = self.t.lgettext
+
+        if not method in inplace_methods:
+            msg = _("Invalid method '%s' for a rotation in place.") % (method)
+            raise LogRotateCopierError(msg)
+
+        if self.test_mode:
+            return (None, method)
+
+        fd_in = None
+        fd_out = None
+        try:
+            try:
+                fd_in = os.open(source, os.O_RDWR)
+                fd_out = os.open(target,
+                        (os.O_WRONLY | os.O_CREAT | os.O_TRUNC), int('0600', 8))
+            except OSError, e:
+                if fd_in is not None:
+                    os.close(fd_in)
+                    fd_in = None
+                msg = (_("Error on copying '%(from)s' => '%(to)s': %(err)s")
+                        % {'from': source, 'to': target, 'err': e.strerror})
+                raise LogRotateCopierError(msg)
+
+            statinfo = os.fstat(fd_in)
+            start = first_data_offset(fd_in)
+            # Only whole blocks are freed, so the next rotation finds the
+            # remaining data behind a real hole. The unaligned rest stays
+            # in the file for the next rotation.
+            blksize = statinfo.st_blksize
+            if method == 'collapse':
+                # a collapse must not reach the end of the file
+                count = ((statinfo.st_size - 1) // blksize) * blksize
+            else:
+                count = (statinfo.st_size // blksize) * blksize
+            count = max(count - start, 0)
+            os.lseek(fd_in, start, os.SEEK_SET)
+
+            begin = time.time()
+            (strategy, copied) = self.copy_data(fd_in, fd_out, count)
+            duration = time.time() - begin
+
+            used = self._free_copied(fd_in, source, method, start, copied,
+                    fd_out)
+        finally:
+            for fd in (fd_out, fd_in):
+                if fd is not None:
+                    os.close(fd)
+
+        self._copy_stat(source, target, statinfo)
+        self.log_throughput(source, target, strategy, copied, duration)
+
+        msg = (_("Freed %(bytes)s in '%(file)s' by %(method)s.")
+                % {'bytes': bytes2human(copied), 'file': source,
+                   'method': used})
+        self.logger.info(msg)
+
+        return (strategy, used)
+
+    #------------------------------------------------------------
+    def _free_copied(self, fd, source, method, start, length,
+            fd_out = None):
+        '''
+        Frees the space of the already copied range of the source file.
+        If the space can't be freed in place, the rest of the source file
+        is copied onto fd_out before truncating the source file.
+
+        @return: the used method ('punchhole', 'collapse' or 'truncate')
+        @rtype:  str
+        '''
+
+        _ = self.t.lgettext
+
+        if length <= 0:
+            return method
+
+        methods = list(inplace_methods[inplace_methods.index(method):])
+        methods.append('truncate')
+        if libc is None or not hasattr(libc, 'fallocate64'):
+            methods = ['truncate']
+
+        for used in methods:
+            if used == 'truncate':
+                msg = (_("Freeing space in place not supported for '%s', " +
+                         "truncating it.") % (source))
+                self.logger.warning(msg)
+                if fd_out is not None:
+                    # the unaligned rest must not get lost
+                    os.lseek(fd, start + length, os.SEEK_SET)
+                    self.copy_data(fd, fd_out)
+                try:
+                    os.ftruncate(fd, 0)
+                except OSError, e:
+                    msg = (_("Error on truncing file '%(from)s': %(err)s")
+                            % {'from': source, 'err': e.strerror})
+                    raise LogRotateCopierError(msg)
+                return used
+
+            if used == 'collapse':
+                ret = libc.fallocate64(fd, FALLOC_FL_COLLAPSE_RANGE,
+                        0, start + length)
+            else:
+                ret = libc.fallocate64(fd,
+                        (FALLOC_FL_PUNCH_HOLE | FALLOC_FL_KEEP_SIZE),
+                        start, length)
+            if ret == 0:
+                return used
+
+            err = ctypes.get_errno()
+            if not err in fallback_errnos:
+                msg = (_("Error on freeing space in '%(file)s' by " +
+                         "%(method)s: %(err)s")
+                        % {'file': source, 'method': used,
+                           'err': os.strerror(err)})
+                raise LogRotateCopierError(msg)
+            if self.verbose > 2:
+                msg = (_("Method '%(method)s' not possible for " +
+                         "'%(file)s': %(err)s")
+                        % {'method': used, 'file': source,
+                           'err': os.strerror(err)})
+                self.logger.debug(msg)
+
+    #------------------------------------------------------------
+    def _copy_stat(self, source, target, statinfo):
+        '''
+        Copies permissions and timestamps from the given statinfo of the
+        source file onto the target file, used, if the source file was
+        changed after copying (truncated or freed).
+
+        It raises a LogRotateCopierError on errors.
+        '''
+
+        _ = self.t.lgettext
+
+        try:
+            os.utime(target, (statinfo.st_atime, statinfo.st_mtime))
+            os.chmod(target, statinfo.st_mode)
+        except OSError, e:
+            msg = (_("Error on copying permissions and timestamps " +
+                     "'%(from)s' => '%(to)s': %(err)s")
+                    % {'from': source, 'to': target, 'err': e.strerror})
+            raise LogRotateCopierError(msg)
+
+    #------------------------------------------------------------
+    def _release_cache(self, fd_in, fd_out, cache_policy):
+        '''
+        Drops the copied data of the source and the target from the page
+        cache, if the cache policy is 'dontneed'. The target is synced
+        before, because dirty pages can't be dropped.
+
+        It raises a LogRotateCopierError on errors.
+
+        @param fd_in:        file descriptor of the source or None
+        @type fd_in:         int or None
+        @param fd_out:       file descriptor of the target
+        @type fd_out:        int
+        @param cache_policy: one of cache_policies
+        @type cache_policy:  str
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        if cache_policy != 'dontneed':
+            return
+
+        if fd_in is not None:
+            drop_cache(fd_in)
+        try:
+            drop_cache(fd_out, written = True)
+        except OSError, e:
+            msg = _("Error on syncing the copied data: %s") % (e.strerror)
+            raise LogRotateCopierError(msg)
+
+    #------------------------------------------------------------
+    def _open_files(self, source, target):
+        '''
+        Opens the source file for reading and creates the target file
+        for writing.
+
+        It raises a LogRotateCopierError on errors.
+
+        @return: file descriptors of source and target
+        @rtype:  tuple
+        '''
+
+        _ = self.t.lgettext
+
+        fd_in = None
+        try:
+            fd_in = os.open(source, os.O_RDONLY)
+            fd_out = os.open(target,
+                    (os.O_WRONLY | os.O_CREAT | os.O_TRUNC), int('0600', 8))
+        except OSError, e:
+            if fd_in is not None:
+                os.close(fd_in)
+            msg = (_("Error on copying '%(from)s' => '%(to)s': %(err)s")
+                    % {'from': source, 'to': target, 'err': e.strerror})
+            raise LogRotateCopierError(msg)
+
+        return (fd_in, fd_out)
+
+    #------------------------------------------------------------
+    def log_throughput(self, source, target, strategy, copied, duration):
+        '''
+        Logs the used copy strategy and the throughput of a copy action.
+
+        @param source:   the copied file
+        @type source:    str
+        @param target:   the name of the copied file
+        @type target:    str
+        @param strategy: the used copy strategy
+        @type strategy:  str
+        @param copied:   number of copied bytes
+        @type copied:    int
+        @param duration: duration of copying in seconds
+        @type duration:  float
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        rate = 0
+        if duration > 0:
+            rate = copied / duration
+        msg = (_("Copied %(bytes)s from '%(from)s' to '%(to)s' " +
+                 "using %(strategy)s in %(secs).3f seconds (%(rate)s/s).")
+                % {'bytes': bytes2human(copied),
+                   'from': source,
+                   'to': target,
+                   'strategy': strategy,
+                   'secs': duration,
+                   'rate': bytes2human(rate)})
+        self.logger.info(msg)
+
+    #------------------------------------------------------------
+    def copy_data(self, fd_in, fd_out, count = None, digests = None):
+        '''
+        Copies count bytes (or until EOF) from the current position of
+        fd_in to the current position of fd_out.
+
+        A complete file is cloned by a reflink, if possible. Otherwise the
+        copy strategies are tried in the order of self.strategies, a
+        strategy which is not usable for these files hands over to the next
+        one at the position, where it has stopped. Of a sparse file only
+        the data extents are copied, the holes are never read and remain
+        holes in the target file.
+
+        If digests are requested, the data is allways copied in userspace,
+        because the other strategies copy inside the kernel without
+        passing the data, and the holes of sparse files are read as zeros.
+
+        It raises a LogRotateCopierError on errors.
+
+        @param fd_in:  file descriptor of the file to read from
+        @type fd_in:   int
+        @param fd_out: file descriptor of the file to write to
+        @type fd_out:  int
+        @param count:  number of bytes to copy, None means until EOF
+        @type count:   int or None
+        @param digests: digests of the copied data to compute
+                        on the fly or None
+        @type digests:  LogRotate.Digest.DigestSet or None
+
+        @return: the used copy strategies (joined by '+', if one
+                 has handed over to another) and the number
+                 of copied bytes (including holes)
+        @rtype:  tuple
+        '''
+
+        _ = self.t.lgettext
+
+        if digests is not None:
+            done = self._copy_userspace(fd_in, fd_out, count, 0, digests)
+            return ('userspace', done[1])
+
+        if (('reflink' in self.strategies) and
+                (not 'reflink' in self.disabled) and
+                self._reflink_possible(fd_in, fd_out, count)):
+            done = self._copy_reflink(fd_in, fd_out)
+            if done is not None:
+                return ('reflink', done[1])
+
+        if not is_sparse(fd_in):
+            return self._copy_range(fd_in, fd_out, count)
+
+        pos_in = os.lseek(fd_in, 0, os.SEEK_CUR)
+        pos_out = os.lseek(fd_out, 0, os.SEEK_CUR)
+        end = os.fstat(fd_in).st_size
+        if count is not None:
+            end = min(end, pos_in + count)
+        if end <= pos_in:
+            return ('sparse', 0)
+
+        used = []
+        for (data_start, data_end) in data_extents(fd_in, pos_in, end):
+            os.lseek(fd_in, data_start, os.SEEK_SET)
+            os.lseek(fd_out, pos_out + (data_start - pos_in), os.SEEK_SET)
+            (strategy, copied) = self._copy_range(
+                    fd_in, fd_out, data_end - data_start)
+            for s in strategy.split('+'):
+                if not s in used:
+                    used.append(s)
+
+        # extend the target to the full size, a trailing hole remains a hole
+        if os.fstat(fd_out).st_size < pos_out + (end - pos_in):
+            os.ftruncate(fd_out, pos_out + (end - pos_in))
+        os.lseek(fd_in, end, os.SEEK_SET)
+        os.lseek(fd_out, pos_out + (end - pos_in), os.SEEK_SET)
+
+        used.insert(0, 'sparse')
+        return ('+'.join(used), end - pos_in)
+
+    #------------------------------------------------------------
+    def _copy_range(self, fd_in, fd_out, count = None):
+        '''
+        Copies count bytes (or until EOF) with the copy strategies
+        of self.strategies (without a reflink).
+
+        It raises a LogRotateCopierError on errors.
+
+        @return: the used copy strategies and the number of copied bytes
+        @rtype:  tuple
+        '''
+
+        _ = self.t.lgettext
+
+        copied = 0
+        used = []
+
+        for strategy in self.strategies:
+
+            if strategy in self.disabled or strategy == 'reflink':
+                continue
+
+            if strategy == 'copy_file_range':
+                done = self._copy_syscall(fd_in, fd_out,
+                        self._copy_file_range, strategy, count, copied)
+            elif strategy == 'sendfile':
+                done = self._copy_syscall(fd_in, fd_out,
+                        self._sendfile, strategy, count, copied)
+            else:
+                done = self._copy_userspace(fd_in, fd_out, count, copied)
+
+            if done[1] > copied:
+                used.append(strategy)
+            copied = done[1]
+            if done[0]:
+                if not len(used):
+                    used.append(strategy)
+                return ('+'.join(used), copied)
+
+        msg = _("No usable copy strategy found.")
+        raise LogRotateCopierError(msg)
+
+    #------------------------------------------------------------
+    def _reflink_possible(self, fd_in, fd_out, count):
+        '''
+        A reflink clones always the complete file, so it can only be used
+        for a complete copy from the beginning of both files.
+        '''
+
+        if count is not None:
+            return False
+        if os.lseek(fd_in, 0, os.SEEK_CUR) != 0:
+            return False
+        if os.lseek(fd_out, 0, os.SEEK_CUR) != 0:
+            return False
+        return True
+
+    #------------------------------------------------------------
+    def _copy_reflink(self, fd_in, fd_out):
+        '''
+        Clones the complete file behind fd_in onto fd_out with the
+        FICLONE ioctl and sets both file positions to the end of file.
+
+        @return: (finished, copied bytes) or None, if not possible
+        @rtype:  tuple or None
+        '''
+
+        _ = self.t.lgettext
+
+        try:
+            fcntl.ioctl(fd_out, FICLONE, fd_in)
+        except IOError, e:
+            if self.verbose > 3:
+                msg = _("Reflink not possible: %s") % (e.strerror)
+                self.logger.debug(msg)
+            return None
+
+        size = os.fstat(fd_out).st_size
+        os.lseek(fd_in, size, os.SEEK_SET)
+        os.lseek(fd_out, size, os.SEEK_SET)
+        return (True, size)
+
+    #------------------------------------------------------------
+    def _copy_file_range(self, fd_in, fd_out, length):
+        '''
+        Wrapper for copy_file_range(2) on the current file positions.
+        '''
+        return libc.copy_file_range(fd_in, None, fd_out, None, length, 0)
+
+    #------------------------------------------------------------
+    def _sendfile(self, fd_in, fd_out, length):
+        '''
+        Wrapper for sendfile(2) on the current file positions.
+        '''
+        return libc.sendfile(fd_out, fd_in, None, length)
+
+    #------------------------------------------------------------
+    def _copy_syscall(self, fd_in, fd_out, func, strategy, count, copied):
+        '''
+        Copies in a loop with a zero-copy syscall (copy_file_range(2)
+        or sendfile(2)) without transferring the data through userspace.
+
+        @return: (finished, copied bytes) or None, if not possible
+        @rtype:  tuple or None
+        '''
+
+        _ = self.t.lgettext
+
+        chunk = max_chunk
+        if limited():
+            chunk = throttle_chunk
+
+        while True:
+            length = chunk
+            if count is not None:
+                length = min(length, count - copied)
+                if length <= 0:
+                    return (True, copied)
+            ret = func(fd_in, fd_out, length)
+            if ret < 0:
+                err = ctypes.get_errno()
+                if err == errno.EINTR:
+                    continue
+                if err in fallback_errnos:
+                    if err == errno.ENOSYS:
+                        self.disabled[strategy] = True
+                    if self.verbose > 3:
+                        msg = (_("Copy strategy '%(strategy)s' not " +
+                                 "possible: %(err)s")
+                                % {'strategy': strategy,
+                                   'err': os.strerror(err)})
+                        self.logger.debug(msg)
+                    return (False, copied)
+                msg = (_("Error on copying with %(strategy)s: %(err)s")
+                        % {'strategy': strategy, 'err': os.strerror(err)})
+                raise LogRotateCopierError(msg)
+            if ret == 0:
+                return (True, copied)
+            # read and written
+            consume(2 * ret)
+            copied += ret
+
+    #------------------------------------------------------------
+    def _copy_userspace(self, fd_in, fd_out, count, copied, digests = None):
+        '''
+        Copies through userspace with a large buffer, the last resort.
+        The digests of the copied data are computed on the fly, if given.
+
+        @return: (finished, copied bytes)
+        @rtype:  tuple
+        '''
+
+        _ = self.t.lgettext
+
+        try:
+            while True:
+                length = self.buffer_size
+                if count is not None:
+                    length = min(length, count - copied)
+                    if length <= 0:
+                        break
+                buf = os.read(fd_in, length)
+                if not buf:
+                    break
+                # read and written
+                consume(2 * len(buf))
+                if digests is not None:
+                    digests.update(buf)
+                while buf:
+                    written = os.write(fd_out, buf)
+                    copied += written
+                    buf = buf[written:]
+        except OSError, e:
+            msg = _("Error on copying in userspace: %s") % (e.strerror)
+            raise LogRotateCopierError(msg)
+
+        return (True, copied)
+
+#========================================================================
+
+if __name__ == "__main__":
+    pass
+
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: module for computing digests of logfiles on the fly
+          and for maintaining the per directory manifests
+'''
+
+# Standard modules
+import re
+import pprint
+import os
+import os.path
+import fcntl
+import glob
+import hashlib
+
+# Third party modules
+
+# Own modules
+from LogRotate.Throttle import throttled
+
+revision = '$Revision$'
+revision = re.sub( r'\$', '', revision )
+revision = re.sub( r'Revision: ', r'r', revision )
+revision = re.sub( r'\s*$', '', revision )
+
+__author__    = 'Frank Brehm'
+__copyright__ = '(C) 2011 by Frank Brehm, Berlin'
+__contact__    = 'frank@brehm-online.com'
+__version__    = '0.1.0 ' + revision
+__license__    = 'GPL3'
+
+#========================================================================
+# Module variables
+
+digest_modes = (
+    'input',
+    'output',
+    'both',
+)
+'''
+@var: valid modes of the option 'digest': digests of the uncompressed
+      data, of the written files or of both
+@type: tuple
+'''
+
+manifest_suffix = 'SUMS'
+'''
+@var: suffix of the manifests after the upper case name of the
+      algorithm, e.g. SHA256SUMS, in the format of sha256sum(1)
+@type: str
+'''
+
+input_suffix = '.orig'
+'''
+@var: additional suffix of the manifests with the digests of the
+      uncompressed data, e.g. SHA256SUMS.orig
+@type: str
+'''
+
+#========================================================================
+
+def valid_algorithm(algorithm):
+    '''
+    Checks, whether the given digest algorithm is supported by hashlib.
+
+    @param algorithm: name of the algorithm, e.g. 'sha256'
+    @type algorithm:  str
+
+    @rtype: bool
+    '''
+
+    try:
+        hashlib.new(algorithm)
+    except ValueError:
+        return False
+    return True
+
+#------------------------------------------------------------------------
+def manifest_name(directory, algorithm, uncompressed = False):
+    '''
+    Gives back the filename of the manifest of the given algorithm
+    in the given directory.
+
+    @param directory:    the directory of the archived logfiles
+    @type directory:     str
+    @param algorithm:    name of the algorithm, e.g. 'sha256'
+    @type algorithm:     str
+    @param uncompressed: the manifest of the digests of the
+                         uncompressed data
+    @type uncompressed:  bool
+
+    @return: filename of the manifest
+    @rtype:  str
+    '''
+
+    name = algorithm.upper() + manifest_suffix
+    if uncompressed:
+        name += input_suffix
+    return os.path.join(directory, name)
+
+#------------------------------------------------------------------------
+def manifests(directory):
+    '''
+    Gives back all existing manifests in the given directory.
+
+    @param directory: the directory to search in
+    @type directory:  str
+
+    @rtype: list
+    '''
+
+    result = glob.glob(os.path.join(directory, '*' + manifest_suffix))
+    result += glob.glob(os.path.join(directory,
+            '*' + manifest_suffix + input_suffix))
+    return sorted(result)
+
+#------------------------------------------------------------------------
+def update_manifest(filename, add = None, remove = None, rename = None,
+        extensions = None):
+    '''
+    Changes the entries of a manifest under an exclusive lock, so the
+    compression jobs of several worker processes may update the same
+    manifest. Every entry is a line '<hex digest>  <basename>'.
+
+    @param filename: the manifest to change, it is created, if entries
+                     are added to a not existing manifest
+    @type filename:  str
+    @param add:      entries to add or replace, keys are the basenames,
+                     values the hex digests
+    @type add:       dict or None
+    @param remove:   basenames, whose entries have to remove, and
+                     the entries of their uncompressed versions
+    @type remove:    list or None
+    @param rename:   entries to rename, keys are the old basenames,
+                     values the new ones
+    @type rename:    dict or None
+    @param extensions: the extensions of compressed files, a basename
+                       without one of them is the uncompressed version
+    @type extensions:  list or None
+
+    @return: None
+    '''
+
+    if not add and not os.path.exists(filename):
+        return
+
+    fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0644)
+    f = os.fdopen(fd, 'r+')
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+        entries = {}
+        for line in f:
+            match = re.search(r'^([0-9a-fA-F]+)\s+\*?(.+)$',
+                    line.rstrip('\n'))
+            if match:
+                entries[match.group(2)] = match.group(1)
+
+        if remove:
+            removed = {}
+            for name in remove:
+                removed[name] = True
+                for extension in (extensions or []):
+                    if name.endswith(extension) and name != extension:
+                        removed[name[:-len(extension)]] = True
+            for entry in entries.keys():
+                if entry in removed:
+                    del entries[entry]
+
+        if rename:
+            renamed = {}
+            for old_name in rename.keys():
+                if old_name in entries:
+                    renamed[rename[old_name]] = entries[old_name]
+                    del entries[old_name]
+            entries.update(renamed)
+
+        if add:
+            entries.update(add)
+
+        f.seek(0)
+        for name in sorted(entries.keys()):
+            f.write("%s  %s\n" % (entries[name], name))
+        f.truncate()
+        f.flush()
+    finally:
+        f.close()
+
+#========================================================================
+
+class DigestSet(object):
+    '''
+    Class for computing digests of several algorithms over the
+    same data on the fly.
+    '''
+
+    #-------------------------------------------------------
+    def __init__(self, algorithms):
+        '''
+        Constructor.
+
+        @param algorithms: names of the algorithms, e.g. ['sha256']
+        @type algorithms:  list
+
+        @return: None
+        '''
+
+        self.hashes = {}
+        '''
+        @ivar: the hash objects, keys are the names of the algorithms
+        @type: dict
+        '''
+        for algorithm in algorithms:
+            self.hashes[algorithm] = hashlib.new(algorithm)
+
+    #------------------------------------------------------------
+    def __str__(self):
+        '''
+        Typecasting function for translating object structure
+        into a string
+
+        @return: structure as string
+        @rtype:  str
+        '''
+
+        pp = pprint.PrettyPrinter(indent=4)
+        structure = self.as_dict()
+        return pp.pformat(structure)
+
+    #-------------------------------------------------------
+    def as_dict(self):
+        '''
+        Transforms the elements of the object into a dict
+
+        @return: structure as dict
+        @rtype:  dict
+        '''
+
+        res = {
+            'hashes': self.hexdigests(),
+        }
+
+        return res
+
+    #------------------------------------------------------------
+    def update(self, data):
+        '''
+        Feeds all hash objects with the given data.
+
+        @param data: the next part of the data
+        @type data:  str
+
+        @return: None
+        '''
+
+        for algorithm in self.hashes.keys():
+            self.hashes[algorithm].update(data)
+
+    #------------------------------------------------------------
+    def read_file(self, filename, buffer_size = (4 * 1024 * 1024)):
+        '''
+        Feeds all hash objects with the content of an existing file,
+        for the cases, where the data can't be hashed on the fly.
+
+        @param filename:    the file to read
+        @type filename:     str
+        @param buffer_size: size of the chunks to read
+        @type buffer_size:  int
+
+        @return: None
+        '''
+
+        f_in = throttled(open(filename, 'rb'))
+        try:
+            while True:
+                chunk = f_in.read(buffer_size)
+                if not chunk:
+                    break
+                self.update(chunk)
+        finally:
+            f_in.close()
+
+    #------------------------------------------------------------
+    def hexdigests(self):
+        '''
+        @return: the digests as hex strings, keys are the names
+                 of the algorithms
+        @rtype:  dict
+        '''
+
+        result = {}
+        for algorithm in self.hashes.keys():
+            result[algorithm] = self.hashes[algorithm].hexdigest()
+        return result
+
+#========================================================================
+
+class DigestWriter(object):
+    '''
+    Wrapper of a file object opened for writing, which computes the
+    digests of all written data, e.g. for gzip.GzipFile or tarfile.
+    '''
+
+    #-------------------------------------------------------
+    def __init__(self, fileobj, digests):
+        '''
+        Constructor.
+
+        @param fileobj: the file object to write into
+        @type fileobj:  file
+        @param digests: the digests to compute
+        @type digests:  DigestSet
+
+        @return: None
+        '''
+
+        self.fileobj = fileobj
+        self.digests = digests
+
+    #------------------------------------------------------------
+    def write(self, data):
+        self.digests.update(data)
+        return self.fileobj.write(data)
+
+    #------------------------------------------------------------
+    def flush(self):
+        return self.fileobj.flush()
+
+    #------------------------------------------------------------
+    def close(self):
+        return self.fileobj.close()
+
+#========================================================================
+
+if __name__ == "__main__":
+    pass
+
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
@@ -269,6 +269,37 @@ class LogrotateOptParser(object):
             help    = to_unicode_or_bust(msg),
         )
 
+        msg = _("Number of logfiles to compress in parallel " +
+                "(different to configuration)")
+        self.parser.add_option(
+            '--compress-jobs',
+            '-j',
+            type    = 'int',
+            dest    = "compressjobs",
+            metavar = 'N',
+            help    = to_unicode_or_bust(msg),
+        )
+
+        msg = _("Computes only the rotation plan with all actions and " +
+                "writes it as JSON into FILE " +
+                "without executing it.")
+        self.parser.add_option(
+            '--plan-out',
+            dest    = "planout",
+            metavar = 'FILE',
+            help    = to_unicode_or_bust(msg),
+        )
+
+        msg = _("Executes the rotation plan from FILE, " +
+                "which was written by --plan-out, instead of computing " +
+                "a new one.")
+        self.parser.add_option(
+            '--plan-in',
+            dest    = "planin",
+            metavar = 'FILE',
+            help    = to_unicode_or_bust(msg),
+        )
+
         ######
         # Option group for common options
 
@@ -328,6 +359,16 @@ class LogrotateOptParser(object):
             msg = _('Invalid usage of --force and --config-check.')
             raise LogrotateOptParserError(msg)
 
+        if (self.options.compressjobs is not None and
+                self.options.compressjobs < 1):
+            msg = (_('Invalid number of compression jobs %d given.')
+                    % (self.options.compressjobs))
+            raise LogrotateOptParserError(msg)
+
+        if self.options.planout and self.options.planin:
+            msg = _('Invalid usage of --plan-out and --plan-in.')
+            raise LogrotateOptParserError(msg)
+
         if self.args is None or len(self.args) < 1:
             msg = _('No configuration file given.')
             raise LogrotateOptParserError(msg)
@@ -28,11 +28,12 @@ import socket
 import subprocess
 import shutil
 import glob
+import tarfile
+import threading
+import Queue
 from datetime import datetime, timedelta
 import time
-import gzip
-import bz2
-import zipfile
+import heapq
 
 # Third party modules
 import pytz
@@ -44,6 +45,8 @@ except ImportError:
     sys.path.append(os.path.abspath(os.path.join(sys.path[0], '..')))
     import LogRotate.Common
 
+from LogRotate.Common import bytes2human
+
 from LogRotate.Config import LogrotateConfigurationError
 from LogRotate.Config import LogrotateConfigurationReader
 
@@ -54,6 +57,43 @@ from LogRotate.StatusFile import LogrotateStatusFile
 from LogRotate.Mailer import LogRotateMailerError
 from LogRotate.Mailer import LogRotateMailer
 
+from LogRotate.Copy import LogRotateCopierError
+from LogRotate.Copy import LogRotateCopier
+from LogRotate.Copy import data_size
+from LogRotate.Copy import drop_cache
+from LogRotate.Copy import staging_suffix
+
+from LogRotate.Plan import LogRotatePlanError
+from LogRotate.Plan import LogRotatePlan
+from LogRotate.Plan import locality_sorted
+from LogRotate.Plan import file_device
+from LogRotate.Plan import is_rotational
+
+from LogRotate.JobPool import LogRotateJobPool
+
+from LogRotate.Unlink import LogRotateDeleter
+
+from LogRotate.Compress import compressors
+from LogRotate.Compress import budget_levels
+from LogRotate.Compress import read_sample
+from LogRotate.Compress import probe_rate
+from LogRotate.Compress import sample_ratio
+from LogRotate.Compress import temp_target
+from LogRotate.Compress import is_temp_target
+from LogRotate.Compress import index_suffix
+from LogRotate.Compress import compress_seekable
+from LogRotate.Compress import write_index
+from LogRotate.Compress import bundle_formats
+from LogRotate.Compress import bundle_format
+from LogRotate.Compress import write_bundle
+
+from LogRotate.Digest import DigestSet
+from LogRotate.Digest import manifest_name
+from LogRotate.Digest import manifests
+from LogRotate.Digest import update_manifest
+
+from LogRotate.Throttle import set_bandwidth
+
 revision = '$Revision$'
 revision = re.sub( r'\$', '', revision )
 revision = re.sub( r'Revision: ', r'r', revision )
@@ -118,6 +158,7 @@ class LogrotateHandler(object):
                         state_file   = None,
                         pid_file     = None,
                         mail_cmd     = None,
+                        compress_jobs = None,
                         local_dir    = None,
                         version      = None,
     ):
@@ -141,6 +182,9 @@ class LogrotateHandler(object):
         @param mail_cmd:     command to send mail (instead of using
                              the Phyton email package)
         @type mail_cmd:      str or None
+        @param compress_jobs: number of logfiles to compress in parallel
+                             (different to configuration)
+        @type compress_jobs: int or None
         @param local_dir:    The directory, where the i18n-files (*.mo)
                              are located. If None, then system default
                              (/usr/share/locale) is used.
@@ -264,12 +308,27 @@ class LogrotateHandler(object):
         @type: list
         '''
 
+        self.plan = None
+        '''
+        @ivar: the rotation plan with all actions to perform, computed
+               by make_plan() or loaded by load_plan()
+        @type: LogRotatePlan or None
+        '''
+
         self.files_delete = {}
         '''
         @ivar: dictionary with all files, they have to delete
         @type: dict
         '''
 
+        self.files_keep = {}
+        '''
+        @ivar: all old logfiles remaining after the retention, which may
+               be purged because of the option 'minfreespace', values
+               are tuples (modification time, size, index of definition)
+        @type: dict
+        '''
+
         self.files_compress = {}
         '''
         @ivar: dictionary with all files, they have to compress
@@ -278,6 +337,170 @@ class LogrotateHandler(object):
         @type: dict
         '''
 
+        self.files_bundle = {}
+        '''
+        @ivar: all logfiles rotated in this run, which have to pack into
+               a bundle, keys are the index numbers of the list
+               self.config, values are lists of the rotated logfiles
+        @type: dict
+        '''
+
+        self.cross_device = {}
+        '''
+        @ivar: cache, whether the rotated logfiles of a directory have
+               to be migrated into another filesystem. Keys are tuples
+               of the logfile directory and the olddir, values are bools.
+        @type: dict
+        '''
+
+        self.migration_queue = None
+        '''
+        @ivar: queue with all pending migrations of rotated logfiles
+               into another filesystem
+        @type: Queue.Queue or None
+        '''
+
+        self.migration_thread = None
+        '''
+        @ivar: the background thread performing the migrations
+        @type: threading.Thread or None
+        '''
+
+        self.migrating = {}
+        '''
+        @ivar: targets of all migrations into other filesystems,
+               which are not finished yet
+        @type: dict
+        '''
+
+        self.migration_lock = threading.Lock()
+        '''
+        @ivar: lock for self.migrating, which is changed by the
+               background thread for migrations
+        @type: threading.Lock
+        '''
+
+        self.migration_jobs = {}
+        '''
+        @ivar: migrations waiting for their submitting to the compression
+               pool, if compressing is pipelined, keys are the targets,
+               values are tuples (source, cache policy)
+        @type: dict
+        '''
+
+        self.compress_pipeline = False
+        '''
+        @ivar: start compressing of the old logfiles of a logfile
+               in background directly after its rotation
+        @type: bool
+        '''
+
+        self.compress_jobs = compress_jobs
+        '''
+        @ivar: number of logfiles to compress in parallel (from commandline
+               or from configuration), if None, they are compressed one
+               after another (or one job per CPU, if pipelined)
+        @type: int or None
+        '''
+
+        self.oldfile_sizes = {}
+        '''
+        @ivar: the sizes of all old logfiles found by
+               _collect_old_logfiles(), keys are the filenames
+        @type: dict
+        '''
+
+        self.compress_pool = None
+        '''
+        @ivar: the pool of worker processes for compression
+        @type: LogRotateJobPool or None
+        '''
+
+        self.compress_fsync = 'file'
+        '''
+        @ivar: policy for syncing compressed files onto disk before
+               deleting the uncompressed files ('none', 'file' or 'full')
+        @type: str
+        '''
+
+        self.compress_nice = None
+        '''
+        @ivar: nice level of the compression workers
+        @type: int or None
+        '''
+
+        self.compress_ioprio = None
+        '''
+        @ivar: I/O scheduling class and priority of the compression
+               workers, e.g. ('idle', 0)
+        @type: tuple or None
+        '''
+
+        self.compress_affinity = None
+        '''
+        @ivar: the CPUs, the compression workers are bound to
+        @type: list of int or None
+        '''
+
+        self.delete_jobs = None
+        '''
+        @ivar: number of threads for deleting old logfiles,
+               if None, the default of LogRotate.Unlink is used
+        @type: int or None
+        '''
+
+        self.min_free_space = None
+        '''
+        @ivar: the free space, which should remain on every filesystem
+               with old logfiles, as dict with the key 'percent' or
+               'bytes', None means no purging
+        @type: dict or None
+        '''
+
+        self.gradual_delete = None
+        '''
+        @ivar: settings for shrinking big files gradually before
+               deleting them with the keys 'threshold', 'step'
+               and 'pause', None means never
+        @type: dict or None
+        '''
+
+        self.device_jobs = None
+        '''
+        @ivar: maximum number of parallel compression jobs per storage
+               device, if None, it's 1 for spinning disks and unlimited
+               for all other devices
+        @type: int or None
+        '''
+
+        self.device_limits = {}
+        '''
+        @ivar: cache of the maximum numbers of parallel compression jobs,
+               keys are the device numbers
+        @type: dict
+        '''
+
+        self.max_bandwidth = None
+        '''
+        @ivar: maximum I/O bandwidth of all stages in bytes per second
+        @type: int or None
+        '''
+
+        self.compress_deadlines = {}
+        '''
+        @ivar: points of time (epoch), until the compression of the
+               old logfiles of a logfile definition with a compressbudget
+               should be finished, keys are the indices of self.config
+        @type: dict
+        '''
+
+        self.compress_levels = {}
+        '''
+        @ivar: the compression levels chosen for all started
+               compressions, keys are the old logfiles
+        @type: dict
+        '''
+
         self.files2send = {}
         '''
         @ivar: dictionary with all all rotated logfiles to send via
@@ -348,6 +571,13 @@ class LogrotateHandler(object):
         if mail_cmd:
             self.mailer.sendmail = mail_cmd
 
+        # define a copy engine object for copy and copytruncate
+        self.copier = LogRotateCopier(
+            local_dir = self.local_dir,
+            verbose = self.verbose,
+            test_mode = self.test,
+        )
+
         # end of init properties
         msg = _("Logrotating initialised.")
         self.logger.debug(msg)
@@ -403,8 +633,27 @@ class LogrotateHandler(object):
         res = {
             'config':          self.config,
             'config_file':     self.config_file,
+            'compress_jobs':   self.compress_jobs,
+            'compress_pipeline': self.compress_pipeline,
+            'compress_pool':   None,
+            'compress_deadlines': self.compress_deadlines,
+            'compress_fsync':  self.compress_fsync,
+            'compress_nice':   self.compress_nice,
+            'compress_ioprio': self.compress_ioprio,
+            'compress_affinity': self.compress_affinity,
+            'max_bandwidth':   self.max_bandwidth,
+            'device_jobs':     self.device_jobs,
+            'delete_jobs':     self.delete_jobs,
+            'gradual_delete':  self.gradual_delete,
+            'min_free_space':  self.min_free_space,
+            'device_limits':   self.device_limits,
+            'compress_levels': self.compress_levels,
+            'copier':          self.copier.as_dict(),
+            'cross_device':    self.cross_device,
             'files_delete':    self.files_delete,
+            'files_keep':      self.files_keep,
             'files_compress':  self.files_compress,
+            'files_bundle':    self.files_bundle,
             'files2send':      self.files2send,
             'force':           self.force,
             'local_dir':       self.local_dir,
@@ -417,6 +666,7 @@ class LogrotateHandler(object):
             'state_file_name': self.state_file_name,
             'pid_file':        self.pid_file,
             'pidfile_created': self.pidfile_created,
+            'plan':            None,
             't':               self.t,
             'test':            self.test,
             'template':        self.template,
@@ -425,6 +675,10 @@ class LogrotateHandler(object):
         }
         if self.state_file:
             res['state_file'] = self.state_file.as_dict()
+        if self.plan:
+            res['plan'] = self.plan.as_dict()
+        if self.compress_pool:
+            res['compress_pool'] = self.compress_pool.as_dict()
 
         for script_name in self.scripts.keys():
             res['scripts'][script_name] = self.scripts[script_name].as_dict()
@@ -526,6 +780,48 @@ class LogrotateHandler(object):
         if 'smtppasswd' in config_reader.global_option:
             self.mailer.smtp_passwd = config_reader.global_option['smtppasswd']
 
+        if self.compress_jobs is None:
+            if 'compressjobs' in config_reader.global_option:
+                self.compress_jobs = \
+                        config_reader.global_option['compressjobs']
+
+        if 'compresspipeline' in config_reader.global_option:
+            self.compress_pipeline = \
+                    config_reader.global_option['compresspipeline']
+
+        if 'compressfsync' in config_reader.global_option:
+            self.compress_fsync = config_reader.global_option['compressfsync']
+
+        if 'compressnice' in config_reader.global_option:
+            self.compress_nice = config_reader.global_option['compressnice']
+        if 'compressioprio' in config_reader.global_option:
+            self.compress_ioprio = \
+                    config_reader.global_option['compressioprio']
+        if 'compressaffinity' in config_reader.global_option:
+            self.compress_affinity = \
+                    config_reader.global_option['compressaffinity']
+
+        if 'deletejobs' in config_reader.global_option:
+            self.delete_jobs = config_reader.global_option['deletejobs']
+
+        if 'minfreespace' in config_reader.global_option:
+            self.min_free_space = config_reader.global_option['minfreespace']
+
+        if 'gradualdelete' in config_reader.global_option:
+            self.gradual_delete = \
+                    config_reader.global_option['gradualdelete']
+
+        if 'devicejobs' in config_reader.global_option:
+            self.device_jobs = config_reader.global_option['devicejobs']
+
+        if config_reader.global_option.get('maxbandwidth'):
+            self.max_bandwidth = config_reader.global_option['maxbandwidth']
+            msg = (_("Limiting the I/O bandwidth to %s/s.")
+                    % (bytes2human(self.max_bandwidth)))
+            self.logger.info(msg)
+        # before forking of any worker
+        set_bandwidth(self.max_bandwidth)
+
         if self.state_file_name is None:
             if (('statusfile' in config_reader.global_option) and
                     (config_reader.global_option['statusfile'] is not None)):
@@ -681,6 +977,17 @@ class LogrotateHandler(object):
             self.logger.info(msg)
             return
 
+        if self.plan is None:
+            self.make_plan()
+
+        self._remove_compress_tempfiles()
+        self._recover_migrations()
+
+        if self.compress_pipeline:
+            msg = _("Compressing old logfiles in background during rotation.")
+            self.logger.debug(msg)
+            self._get_compress_pool()
+
         msg = _("Starting underlying rotation ...")
         self.logger.info(msg)
 
@@ -689,6 +996,8 @@ class LogrotateHandler(object):
             self._rotate_definition(cur_desc_index)
             cur_desc_index += 1
 
+        self._wait_migrations()
+
         if self.verbose > 1:
             line = 60 * '-'
             print line + "\n\n"
@@ -704,9 +1013,43 @@ class LogrotateHandler(object):
         return
 
     #------------------------------------------------------------
-    def _rotate_definition(self, cur_desc_index):
+    def make_plan(self):
+        '''
+        Computes the rotation plan with all moves, rotations, deletions,
+        compressions and mails of all logfile definitions without
+        changing anything and saves it in self.plan.
+
+        @return: the computed plan
+        @rtype:  LogRotatePlan
+        '''
+
+        _ = self.t.lgettext
+
+        msg = _("Computing rotation plan ...")
+        self.logger.debug(msg)
+
+        self.plan = LogRotatePlan(
+            config_file = self.config_file,
+            local_dir   = self.local_dir,
+            verbose     = self.verbose,
+        )
+
+        cur_desc_index = 0
+        for d in self.config:
+            self._plan_definition(cur_desc_index)
+            cur_desc_index += 1
+
+        if self.verbose > 2:
+            msg = _("Rotation plan:") + "\n" + str(self.plan)
+            self.logger.debug(msg)
+
+        return self.plan
+
+    #------------------------------------------------------------
+    def _plan_definition(self, cur_desc_index):
         '''
-        Rotation of a logfile definition from a configuration file.
+        Puts the rotations of all logfiles of a logfile definition
+        into the rotation plan, they should rotated.
 
         @param cur_desc_index: index of self.config for definition
                                of logfile from configuration file
@@ -719,13 +1062,9 @@ class LogrotateHandler(object):
 
         _ = self.t.lgettext
 
-        if self.verbose > 1:
-            line = 60 * '-'
-            print line + "\n\n"
-
         if self.verbose >= 4:
             pp = pprint.PrettyPrinter(indent=4)
-            msg = (_("Rotating of logfile definition:") +
+            msg = (_("Planning of logfile definition:") +
                    "\n" + pp.pformat(definition))
             self.logger.debug(msg)
 
@@ -734,8 +1073,6 @@ class LogrotateHandler(object):
 
         for logfile in definition['files']:
             if self.verbose > 1:
-                line = 30 * '-'
-                print (line + "\n")
                 msg = ( _("Performing logfile '%s' ...") % (logfile))
                 self.logger.debug(msg)
             should_rotate = self._should_rotate(logfile, cur_desc_index)
@@ -747,7 +1084,231 @@ class LogrotateHandler(object):
                 self.logger.debug(msg % (logfile))
             if not should_rotate:
                 continue
-            self._rotate_file(logfile, cur_desc_index)
+            self.plan.add_rotation(self._plan_file(logfile, cur_desc_index))
+
+        return
+
+    #------------------------------------------------------------
+    def _plan_file(self, logfile, cur_desc_index):
+        '''
+        Computes the rotation of a logfile with all moves of the cyclic
+        rotation and with the old logfiles, which will be to delete,
+        to compress and to send after this rotation.
+
+        The old logfiles are retrieved before the rotation and are
+        renamed in the same way the moves of the rotation will rename them.
+
+        @param logfile: the logfile to rotate
+        @type logfile:  str
+        @param cur_desc_index: index of self.config for definition
+                               of logfile from configuration file
+        @type cur_desc_index:  int
+
+        @return: the rotation of the logfile as an entry
+                 of the rotation plan
+        @rtype:  dict
+        '''
+
+        definition = self.config[cur_desc_index]
+
+        _ = self.t.lgettext
+
+        olddir = self._get_olddir(logfile, cur_desc_index)
+        target_dir = olddir
+        if olddir == ".":
+            target_dir = None
+
+        target = self._get_rotation_target(logfile, cur_desc_index, target_dir)
+        rotations = self._get_rotations(logfile, target, cur_desc_index)
+
+        extension = rotations['extension']
+        compress_extension = rotations['compress_extension']
+
+        method = 'move'
+        if definition['copyinplace']:
+            method = 'copyinplace'
+        elif definition['copytruncate']:
+            method = 'copytruncate'
+        elif definition['copy']:
+            method = 'copy'
+
+        # old logfiles, how they will exist after the rotation
+        oldfiles = self._collect_old_logfiles(
+                logfile, extension,
+                compress_extension, cur_desc_index
+        )
+        sizes = {}
+        for oldfile in oldfiles.keys():
+            sizes[oldfile] = self.oldfile_sizes.get(oldfile, 0)
+        for pair in rotations['move']:
+            file_from = pair['from']
+            file_to = pair['to']
+            if pair['compressed']:
+                file_from += compress_extension
+                file_to += compress_extension
+            if file_from in oldfiles:
+                oldfiles[file_to] = oldfiles[file_from]
+                del oldfiles[file_from]
+                sizes[file_to] = sizes[file_from]
+                del sizes[file_from]
+        # the rotated logfile keeps the modification time of the logfile
+        logfile_stat = os.stat(logfile)
+        oldfiles[rotations['rotate']['to']] = logfile_stat.st_mtime
+        # still uncompressed, so its size is an upper bound
+        sizes[rotations['rotate']['to']] = logfile_stat.st_size
+
+        files_delete = self._collect_files_delete(oldfiles, cur_desc_index,
+                sizes)
+        files_compress = self._collect_files_compress(
+                oldfiles,
+                compress_extension,
+                cur_desc_index,
+                files_delete
+        )
+        files_mail = []
+        if definition['mailaddress'] and not definition['mailfirst']:
+            files_mail = files_delete
+
+        # candidates for purging, except the currently rotated logfile
+        files_keep = {}
+        if self.min_free_space is not None:
+            for oldfile in oldfiles.keys():
+                if oldfile in files_delete:
+                    continue
+                if oldfile == rotations['rotate']['to']:
+                    continue
+                files_keep[oldfile] = [oldfiles[oldfile],
+                        sizes.get(oldfile, 0)]
+
+        entry = {
+            'logfile':    logfile,
+            'desc_index': cur_desc_index,
+            'olddir':     olddir,
+            'method':     method,
+            'rotations':  rotations,
+            'delete':     files_delete,
+            'compress':   files_compress,
+            'mail':       files_mail,
+            'keep':       files_keep,
+        }
+
+        return entry
+
+    #------------------------------------------------------------
+    def save_plan(self, filename):
+        '''
+        Writes the rotation plan (computed, if necessary) as JSON
+        into the given file.
+
+        Throughs an LogrotateHandlerError on error.
+
+        @param filename: the file to write into
+        @type filename:  str
+
+        @return: None
+        '''
+
+        if self.plan is None:
+            self.make_plan()
+
+        try:
+            self.plan.save(filename)
+        except LogRotatePlanError, e:
+            raise LogrotateHandlerError(str(e))
+
+    #------------------------------------------------------------
+    def load_plan(self, filename):
+        '''
+        Reads a rotation plan from the given file, which
+        will be executed by rotate() instead of computing a new one.
+        The plan must belong to the current configuration.
+
+        Throughs an LogrotateHandlerError on error.
+
+        @param filename: the file to read from
+        @type filename:  str
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        plan = LogRotatePlan(
+            local_dir = self.local_dir,
+            verbose   = self.verbose,
+        )
+        try:
+            plan.load(filename)
+        except LogRotatePlanError, e:
+            raise LogrotateHandlerError(str(e))
+
+        config_file = os.path.abspath(self.config_file)
+        if plan.config_file != config_file:
+            msg = (_("Rotation plan '%(plan)s' was computed from " +
+                     "configuration '%(other)s', not from '%(config)s'.")
+                    % {'plan': filename,
+                       'other': plan.config_file,
+                       'config': config_file})
+            raise LogrotateHandlerError(msg)
+
+        for entry in plan.rotations:
+            index = entry['desc_index']
+            if ((not isinstance(index, int)) or index < 0 or
+                    index >= len(self.config) or
+                    not entry['logfile'] in self.config[index]['files']):
+                msg = (_("Logfile '%(file)s' of rotation plan '%(plan)s' " +
+                         "doesn't match the configuration.")
+                        % {'file': entry['logfile'], 'plan': filename})
+                raise LogrotateHandlerError(msg)
+
+        msg = (_("Using rotation plan '%(plan)s' from %(date)s.")
+                % {'plan': filename, 'date': plan.created})
+        self.logger.info(msg)
+
+        self.plan = plan
+
+    #------------------------------------------------------------
+    def _rotate_definition(self, cur_desc_index):
+        '''
+        Rotation of all logfiles of a logfile definition from a
+        configuration file, how they are given by the rotation plan.
+
+        @param cur_desc_index: index of self.config for definition
+                               of logfile from configuration file
+        @type cur_desc_index:  int
+
+        @return: None
+        '''
+
+        definition = self.config[cur_desc_index]
+
+        _ = self.t.lgettext
+
+        if self.verbose > 1:
+            line = 60 * '-'
+            print line + "\n\n"
+
+        if self.verbose >= 4:
+            pp = pprint.PrettyPrinter(indent=4)
+            msg = (_("Rotating of logfile definition:") +
+                   "\n" + pp.pformat(definition))
+            self.logger.debug(msg)
+
+        # re-reading of status file
+        self.state_file.read()
+
+        for entry in self.plan.rotations:
+            if entry['desc_index'] != cur_desc_index:
+                continue
+            if self.verbose > 1:
+                line = 30 * '-'
+                print (line + "\n")
+                msg = ( _("Performing logfile '%s' ...") % (entry['logfile']))
+                self.logger.debug(msg)
+            self._rotate_file(entry)
+            if self.compress_pipeline and self.compress_pool is not None:
+                # start queued compressions, if workers became free
+                self.compress_pool.poll()
 
         if self.verbose > 1:
             print "\n"
@@ -755,22 +1316,21 @@ class LogrotateHandler(object):
         return
 
     #------------------------------------------------------------
-    def _rotate_file(self, logfile, cur_desc_index):
+    def _rotate_file(self, entry):
         '''
         Rotates a logfile with all with all necessary actions before
         and after rotation.
 
         Throughs an LogrotateHandlerError on error.
 
-        @param logfile: the logfile to rotate
-        @type logfile:  str
-        @param cur_desc_index: index of self.config for definition
-                               of logfile from configuration file
-        @type cur_desc_index:  int
+        @param entry: the rotation of the logfile from the rotation plan
+        @type entry:  dict
 
         @return: None
         '''
 
+        logfile = entry['logfile']
+        cur_desc_index = entry['desc_index']
         definition = self.config[cur_desc_index]
 
         _ = self.t.lgettext
@@ -815,11 +1375,11 @@ class LogrotateHandler(object):
                     return
                 self.scripts[prescript].done_prerun = True
 
-        olddir = self._create_olddir(logfile, cur_desc_index)
+        olddir = self._create_olddir(logfile, cur_desc_index, entry['olddir'])
         if olddir is None:
             return
 
-        if not self._do_rotate_file(logfile, cur_desc_index, olddir):
+        if not self._do_rotate_file(entry):
             return
 
         # Looking for postrotate script in a similar way like for the prerotate
@@ -867,31 +1427,25 @@ class LogrotateHandler(object):
                 self.scripts[lastscript].done_lastrun = True
 
     #------------------------------------------------------------
-    def _do_rotate_file(self, logfile, cur_desc_index, olddir = None):
+    def _do_rotate_file(self, entry):
         '''
-        The underlaying unconditionally rotation of a logfile.
+        The underlaying unconditionally rotation of a logfile, how it is
+        given by the rotation plan.
 
-        After the successful rotation 
+        After the successful rotation the old logfiles of the plan entry
+        are taken over for deletion, compression and sending.
 
-        @param logfile: the logfile to rotate
-        @type logfile:  str
-        @param cur_desc_index: index of self.config for definition
-                               of logfile from configuration file
-        @type cur_desc_index:  int
-        @param olddir: the directory of the rotated logfile
-                       if "." or None, store the rotated logfile
-                       in their original directory
-        @type olddir: str or None
+        @param entry: the rotation of the logfile from the rotation plan
+        @type entry:  dict
 
         @return: successful or not
         @rtype:  bool
         '''
 
+        logfile = entry['logfile']
+        cur_desc_index = entry['desc_index']
         definition = self.config[cur_desc_index]
 
-        if (olddir is not None) and (olddir == "."):
-            olddir = None
-
         _ = self.t.lgettext
 
         uid = os.geteuid()
@@ -900,33 +1454,66 @@ class LogrotateHandler(object):
         msg = _("Do rotate logfile '%s' ...") % (logfile)
         self.logger.debug(msg)
 
-        target = self._get_rotation_target(logfile, cur_desc_index, olddir)
-        rotations = self._get_rotations(logfile, target, cur_desc_index)
+        rotations = entry['rotations']
 
-        extension = rotations['extension']
         compress_extension = rotations['compress_extension']
 
+        # Check, whether the plan is still valid
+        sources = [rotations['rotate']['from']]
+        for pair in rotations['move']:
+            file_from = pair['from']
+            if pair['compressed']:
+                file_from += compress_extension
+            sources.append(file_from)
+        for file_from in sources:
+            if not os.path.exists(file_from):
+                msg = (_("File '%(file)s' of the rotation plan doesn't " +
+                         "exists, skip rotation of '%(logfile)s'.")
+                        % {'file': file_from, 'logfile': logfile})
+                self.logger.error(msg)
+                return False
+
         # First move all cyclic stuff
+        renames = {}
         for pair in rotations['move']:
             file_from = pair['from']
             file_to = pair['to']
             if pair['compressed']:
                 file_from += compress_extension
                 file_to += compress_extension
-            msg = (_("Moving file '%(from)s' => '%(to)s'.")
-                    % {'from': file_from, 'to': file_to })
-            self.logger.info(msg)
-            if not self.test:
-                try:
-                    shutil.move(file_from, file_to)
-                except OSError:
-                    msg = (_("Error on moving '%(from)s' => '%(to)s': " +
-                             "%(err)s")
-                            % {'from': file_from,
-                               'to': file_to,
-                               'err': e.strerror})
-                    self.logger.error(msg)
-                    return False
+            moves = [(file_from, file_to)]
+            if os.path.exists(file_from + index_suffix):
+                # the sidecar index of a seekable compressed file
+                moves.append((file_from + index_suffix,
+                        file_to + index_suffix))
+            for (file_from, file_to) in moves:
+                msg = (_("Moving file '%(from)s' => '%(to)s'.")
+                        % {'from': file_from, 'to': file_to })
+                self.logger.info(msg)
+                if not self.test:
+                    try:
+                        shutil.move(file_from, file_to)
+                    except OSError, e:
+                        msg = (_("Error on moving '%(from)s' => " +
+                                 "'%(to)s': %(err)s")
+                                % {'from': file_from,
+                                   'to': file_to,
+                                   'err': e.strerror})
+                        self.logger.error(msg)
+                        return False
+            # the entries of the manifests are moved in the same order
+            directory = os.path.dirname(file_to)
+            if not directory in renames:
+                renames[directory] = []
+            renames[directory].append({
+                os.path.basename(moves[0][0]): os.path.basename(moves[0][1]),
+                os.path.basename(pair['from']): os.path.basename(pair['to']),
+            })
+        for directory in renames.keys():
+            if not manifests(directory):
+                continue
+            for rename in renames[directory]:
+                self._update_manifests(directory, rename = rename)
 
         # Now the underlaying rotation
         file_from = rotations['rotate']['from']
@@ -936,24 +1523,59 @@ class LogrotateHandler(object):
         if definition['mailaddress'] and definition['mailfirst']:
             self.mailer.send_file(file_from, definition['mailaddress'])
 
-        # separate between copy(truncate) and move (and create)
-        if definition['copytruncate'] or definition['copy']:
+        # separate between copy(truncate), in place and move (and create)
+        if definition['copyinplace']:
+            # Copying logfile to target and freeing the copied data
+            method = definition['copyinplace']
+            msg = (_("Rotating file '%(from)s' => '%(to)s' in place " +
+                     "(%(method)s).")
+                    % {'from': file_from, 'to': file_to, 'method': method})
+            self.logger.info(msg)
+            if not self.test:
+                try:
+                    self.copier.copy_inplace(file_from, file_to, method)
+                except LogRotateCopierError, e:
+                    self.logger.error(str(e))
+                    return False
+
+        elif definition['copytruncate'] or definition['copy']:
             # Copying logfile to target
             msg = (_("Copying file '%(from)s' => '%(to)s'.")
                     % {'from': file_from, 'to': file_to })
             self.logger.info(msg)
-            if not self.test:
+            digests = None
+            if definition['digest'] is not None:
+                digests = DigestSet(definition['digest']['algorithms'])
+            delta = definition['copytruncatedelta']
+            if definition['copytruncate'] and delta is not None:
+                # copying with delta catch-up and truncating in one step
+                msg = (_("Truncating file '%(file)s' after the remaining " +
+                         "delta is below %(delta)d bytes.")
+                        % {'file': file_from, 'delta': delta})
+                self.logger.info(msg)
+                if not self.test:
+                    try:
+                        self.copier.copy_truncate(file_from, file_to, delta,
+                                digests, definition['cachepolicy'])
+                    except LogRotateCopierError, e:
+                        self.logger.error(str(e))
+                        return False
+            elif not self.test:
                 try:
-                    shutil.copy2(file_from, file_to)
-                except OSError:
-                    msg = (_("Error on copying '%(from)s' => '%(to)s': " +
-                             "%(err)s")
-                            % {'from': file_from,
-                               'to': file_to,
-                               'err': e.strerror})
-                    self.logger.error(msg)
+                    self.copier.copy(file_from, file_to, digests,
+                            definition['cachepolicy'])
+                except LogRotateCopierError, e:
+                    self.logger.error(str(e))
                     return False
-            if definition['copytruncate']: 
+            if digests is not None:
+                # the copy is the uncompressed data and the archived file
+                mode = definition['digest']['mode']
+                if mode != 'input':
+                    self._record_digests(file_to, digests)
+                if mode != 'output':
+                    self._record_digests(file_to, digests,
+                            uncompressed = True)
+            if definition['copytruncate'] and delta is None:
                 msg = _("Truncating file '%s'.") % (file_from)
                 self.logger.info(msg)
                 if not self.test:
@@ -977,10 +1599,32 @@ class LogrotateHandler(object):
             # get old permissions of logfile
             statinfo = os.stat(file_from)
 
-            if not self.test:
+            if self._is_cross_device(file_from, file_to):
+                # rename on the source filesystem to release the writer
+                # quickly and migrate it later into olddir
+                staging = os.path.join(os.path.dirname(file_from),
+                        '.' + os.path.basename(file_to) + staging_suffix)
+                msg = (_("Renaming file '%(from)s' => '%(to)s' for " +
+                         "migration into another filesystem.")
+                        % {'from': file_from, 'to': staging})
+                self.logger.info(msg)
+                if not self.test:
+                    try:
+                        os.rename(file_from, staging)
+                    except OSError, e:
+                        msg = (_("Error on moving '%(from)s' => '%(to)s': " +
+                                 "%(err)s")
+                                % {'from': file_from,
+                                   'to': staging,
+                                   'err': e.strerror})
+                        self.logger.error(msg)
+                        return False
+                self._migrate_file(staging, file_to,
+                        definition['cachepolicy'])
+            elif not self.test:
                 try:
                     shutil.move(file_from, file_to)
-                except OSError:
+                except OSError, e:
                     msg = (_("Error on moving '%(from)s' => '%(to)s': " +
                              "%(err)s")
                             % {'from': file_from,
@@ -988,7 +1632,7 @@ class LogrotateHandler(object):
                                'err': e.strerror})
                     self.logger.error(msg)
                     return False
-    
+
             if definition['create']['enabled']:
 
                 # Recreate logfile
@@ -1063,31 +1707,35 @@ class LogrotateHandler(object):
                                            'err': e.strerror})
                                 self.logger.warning(msg)
 
-        oldfiles = self._collect_old_logfiles(
-                logfile, extension,
-                compress_extension, cur_desc_index
-        )
-
-        # get files to delete and save them back in self.files_delete
-        files_delete = self._collect_files_delete(oldfiles, cur_desc_index)
-        if len(files_delete):
-            for oldfile in files_delete:
-                self.files_delete[oldfile] = True
-                if definition['mailaddress'] and not definition['mailfirst']:
-                    self.files2send[oldfile] = (
-                            definition['mailaddress'],
-                            logfile
-                    )
-
-        # get files to compress save them back in self.files_compress
-        files_compress = self._collect_files_compress(
-                oldfiles,
-                compress_extension,
-                cur_desc_index
-        )
-        if len(files_compress):
-            for oldfile in files_compress:
-                self.files_compress[oldfile] = cur_desc_index
+        # take over the files to delete, to send and to compress
+        for oldfile in entry['delete']:
+            self.files_delete[oldfile] = True
+        keep = entry.get('keep', {})
+        for oldfile in keep.keys():
+            self.files_keep[oldfile] = (keep[oldfile][0], keep[oldfile][1],
+                    cur_desc_index)
+        for oldfile in entry['mail']:
+            self.files2send[oldfile] = (
+                    definition['mailaddress'],
+                    logfile
+            )
+        if definition['bundle'] is not None:
+            # the rotated logfile is packed into the bundle
+            # of its definition instead of compressing it
+            if not cur_desc_index in self.files_bundle:
+                self.files_bundle[cur_desc_index] = []
+            self.files_bundle[cur_desc_index].append(file_to)
+        for oldfile in entry['compress']:
+            if definition['bundle'] is not None and oldfile == file_to:
+                continue
+            self.files_compress[oldfile] = cur_desc_index
+            if self.compress_pipeline and not oldfile in self.files_keep:
+                # files still to migrate are migrated by the same job,
+                # candidates for purging are compressed not until
+                # the purge, so it never races with their compression
+                self._submit_compress(oldfile)
+        if self.compress_pipeline:
+            self._submit_migrations()
 
         # write back date of rotation into state file
         self.state_file.set_rotation_date(logfile)
@@ -1095,11 +1743,298 @@ class LogrotateHandler(object):
 
         return True
 
+    #------------------------------------------------------------
+    def _is_cross_device(self, file_from, file_to):
+        '''
+        Checks, whether the rotated logfile has to go onto another
+        filesystem, so it can't be renamed. The result is cached for
+        every pair of directories.
+
+        @param file_from: the logfile to move
+        @type file_from:  str
+        @param file_to:   the name of the rotated logfile
+        @type file_to:    str
+
+        @return: file_from and file_to are on different filesystems
+        @rtype:  bool
+        '''
+
+        _ = self.t.lgettext
+
+        dir_from = os.path.dirname(file_from)
+        dir_to = os.path.dirname(file_to)
+        key = (dir_from, dir_to)
+        if key in self.cross_device:
+            return self.cross_device[key]
+
+        result = False
+        try:
+            if os.stat(dir_from).st_dev != os.stat(dir_to).st_dev:
+                result = True
+        except OSError:
+            result = False
+
+        if result:
+            msg = (_("Directories '%(from)s' and '%(to)s' are on different " +
+                     "filesystems, rotated logfiles will be migrated.")
+                    % {'from': dir_from, 'to': dir_to})
+            self.logger.info(msg)
+        self.cross_device[key] = result
+        return result
+
+    #------------------------------------------------------------
+    def _migrate_file(self, source, target, cache_policy = 'keep'):
+        '''
+        Enqueues the migration of a rotated logfile into another
+        filesystem. The migrations are performed asynchronously one after
+        another by a background thread, so the rotation with the
+        postrotate scripts must not wait for them.
+
+        If compressing is pipelined with the rotation, the migrations are
+        jobs of the compression pool instead, because forking its workers
+        while a thread holds a lock (e.g. of logging) would deadlock them.
+
+        @param source: the renamed logfile on its original filesystem
+        @type source:  str
+        @param target: the name of the rotated logfile in olddir
+        @type target:  str
+        @param cache_policy: the usage of the page cache
+        @type cache_policy:  str
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        msg = (_("Migrating file '%(from)s' => '%(to)s' in background.")
+                % {'from': source, 'to': target})
+        self.logger.info(msg)
+
+        if self.test:
+            return
+
+        self.migration_lock.acquire()
+        try:
+            self.migrating[target] = True
+        finally:
+            self.migration_lock.release()
+
+        if self.compress_pipeline:
+            self.migration_jobs[target] = (source, cache_policy)
+            return
+
+        if self.migration_thread is None:
+            self.migration_queue = Queue.Queue()
+            self.migration_thread = threading.Thread(
+                    target = self._migration_worker,
+                    name = 'migration')
+            self.migration_thread.setDaemon(True)
+            self.migration_thread.start()
+
+        self.migration_queue.put((source, target, cache_policy))
+
+    #------------------------------------------------------------
+    def _migration_worker(self):
+        '''
+        Main function of the background thread for migrations. It uses
+        an own copier, so the state of self.copier is changed only
+        by the main thread.
+        '''
+
+        copier = LogRotateCopier(
+            local_dir = self.local_dir,
+            verbose = self.verbose,
+            test_mode = self.test,
+        )
+
+        while True:
+            job = self.migration_queue.get()
+            if job is None:
+                break
+            (source, target, cache_policy) = job
+            try:
+                copier.migrate(source, target, cache_policy)
+            except LogRotateCopierError, e:
+                self.logger.error(str(e))
+            self.migration_lock.acquire()
+            try:
+                del self.migrating[target]
+            finally:
+                self.migration_lock.release()
+
+    #------------------------------------------------------------
+    def _is_migrating(self, filename):
+        '''
+        @return: the given rotated logfile is still to migrate
+                 into another filesystem
+        @rtype:  bool
+        '''
+
+        self.migration_lock.acquire()
+        try:
+            return filename in self.migrating
+        finally:
+            self.migration_lock.release()
+
+    #------------------------------------------------------------
+    def _submit_migrations(self):
+        '''
+        Submits all migrations, which are not submitted together with
+        the compression of their targets, as jobs to the compression pool.
+
+        @return: None
+        '''
+
+        pool = self._get_compress_pool()
+        for target in self.migration_jobs.keys():
+            (source, cache_policy) = self.migration_jobs[target]
+            del self.migration_jobs[target]
+            pool.submit(target, self._migrate_job, source, target,
+                    cache_policy, group = file_device(target))
+
+    #------------------------------------------------------------
+    def _migrate_job(self, source, target, cache_policy,
+            cur_desc_index = None):
+        '''
+        Job of the compression pool, which migrates a rotated logfile into
+        another filesystem and compresses it afterwards, if requested.
+
+        @param source: the renamed logfile on its original filesystem
+        @type source:  str
+        @param target: the name of the rotated logfile in olddir
+        @type target:  str
+        @param cache_policy: the usage of the page cache
+        @type cache_policy:  str
+        @param cur_desc_index: index of self.config for the definition
+                               of the logfile to compress the target
+                               with or None for no compressing
+        @type cur_desc_index:  int or None
+
+        @return: success or not
+        @rtype:  bool
+        '''
+
+        try:
+            self.copier.migrate(source, target, cache_policy)
+        except LogRotateCopierError, e:
+            self.logger.error(str(e))
+            return False
+
+        if cur_desc_index is None:
+            return True
+        level = self._budget_level(target, cur_desc_index)
+        return self._compress_file(target, cur_desc_index, level)
+
+    #------------------------------------------------------------
+    def _recover_migrations(self):
+        '''
+        Completes the migrations into other filesystems, which were
+        interrupted by a crash of an earlier run, so no renamed logfile
+        remains hidden in the directory of its logfile. If the olddir of
+        an orphaned file isn't known anymore, it gets its rotated name
+        back in its directory.
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        # the directories of all logfiles with the olddirs of
+        # the basenames of their logfiles
+        olddirs = {}
+        cur_desc_index = 0
+        for definition in self.config:
+            for logfile in definition['files']:
+                directory = os.path.dirname(logfile)
+                if not directory in olddirs:
+                    olddirs[directory] = {}
+                if definition['olddir']['dirname']:
+                    olddirs[directory][os.path.basename(logfile)] = \
+                            self._get_olddir(logfile, cur_desc_index)
+            cur_desc_index += 1
+
+        pattern = r'^\.(.+)' + re.escape(staging_suffix) + r'$'
+        for directory in locality_sorted(olddirs.keys()):
+            try:
+                entries = os.listdir(directory)
+            except OSError:
+                continue
+            for entry in entries:
+                match = re.search(pattern, entry)
+                if not match:
+                    continue
+                staging = os.path.join(directory, entry)
+                name = match.group(1)
+                target = None
+                # the longest matching basename of a logfile
+                for basename in sorted(olddirs[directory].keys(),
+                        key = len, reverse = True):
+                    if name.startswith(basename):
+                        target = os.path.join(
+                                olddirs[directory][basename], name)
+                        break
+
+                if target is None:
+                    target = os.path.join(directory, name)
+                    msg = (_("Renaming orphaned file '%(from)s' of an " +
+                             "interrupted migration back to '%(to)s'.")
+                            % {'from': staging, 'to': target})
+                    self.logger.warning(msg)
+                    if self.test or os.path.exists(target):
+                        continue
+                    try:
+                        os.rename(staging, target)
+                    except OSError, e:
+                        msg = (_("Error on moving '%(from)s' => " +
+                                 "'%(to)s': %(err)s")
+                                % {'from': staging, 'to': target,
+                                   'err': e.strerror})
+                        self.logger.error(msg)
+                    continue
+
+                msg = (_("Resuming interrupted migration '%(from)s' => " +
+                         "'%(to)s'.") % {'from': staging, 'to': target})
+                self.logger.warning(msg)
+                try:
+                    self.copier.migrate(staging, target)
+                except LogRotateCopierError, e:
+                    self.logger.error(str(e))
+
+    #------------------------------------------------------------
+    def _wait_migrations(self):
+        '''
+        Waits, until all enqueued migrations are finished.
+        '''
+
+        _ = self.t.lgettext
+
+        if self.compress_pipeline and self.compress_pool is not None:
+            self._submit_migrations()
+            targets = self.migrating.keys()
+            if targets:
+                msg = _("Waiting for pending migrations into other " +
+                        "filesystems ...")
+                self.logger.debug(msg)
+                self.compress_pool.wait(targets)
+                self.migrating = {}
+
+        if self.migration_thread is None:
+            return
+
+        msg = _("Waiting for pending migrations into other filesystems ...")
+        self.logger.debug(msg)
+
+        self.migration_queue.put(None)
+        self.migration_thread.join()
+        self.migration_thread = None
+        self.migration_queue = None
+
     #------------------------------------------------------------
     def _collect_files_compress(self,
                                 oldfiles,
                                 compress_extension,
-                                cur_desc_index):
+                                cur_desc_index,
+                                files_delete):
         '''
         Collects a list with all old logfiles, they have to compress.
 
@@ -1112,6 +2047,8 @@ class LogrotateHandler(object):
         @param cur_desc_index: index of self.config for definition
                                of logfile from configuration file
         @type cur_desc_index:  int
+        @param files_delete: all old logfiles, they will be deleted
+        @type files_delete:  list
 
         @return: all old (and compressed) logfiles to delete
         @rtype:  list
@@ -1155,7 +2092,7 @@ class LogrotateHandler(object):
                     self.logger.debug(msg)
                 continue
 
-            if oldfile in self.files_delete:
+            if oldfile in files_delete:
                 if self.verbose > 2:
                     msg = (_("File '%s' will be deleted, " +
                              "compression unnecessary.") % (oldfile))
@@ -1184,7 +2121,7 @@ class LogrotateHandler(object):
         return result
 
     #------------------------------------------------------------
-    def _collect_files_delete(self, oldfiles, cur_desc_index):
+    def _collect_files_delete(self, oldfiles, cur_desc_index, sizes = None):
         '''
         Collects a list with all old (and compressed) logfiles,
         they have to delete.
@@ -1195,6 +2132,9 @@ class LogrotateHandler(object):
         @param cur_desc_index: index of self.config for definition
                                of logfile from configuration file
         @type cur_desc_index:  int
+        @param sizes: the sizes of the old logfiles for the option
+                      'maxtotalsize', keys are the same as of oldfiles
+        @type sizes:  dict or None
 
         @return: all old (and compressed) logfiles to delete
         @rtype:  list
@@ -1267,6 +2207,30 @@ class LogrotateHandler(object):
                         self.logger.debug(msg)
                     result.append(oldfile)
 
+        # Now checking for the total size of the remaining files
+        maxtotalsize = definition['maxtotalsize']
+        if maxtotalsize is not None and sizes is not None:
+            remaining = [x for x in oldfiles.keys() if not x in result]
+            total = 0
+            for oldfile in remaining:
+                total += sizes.get(oldfile, 0)
+            if self.verbose >= 4:
+                msg = (_("Total size of the old logfiles: %(total)d " +
+                         "bytes, maximum: %(max)d bytes")
+                        % {'total': total, 'max': maxtotalsize})
+                self.logger.debug(msg)
+            # the newest one is kept in every case
+            remaining.sort(key = lambda x: oldfiles[x])
+            for oldfile in remaining[:-1]:
+                if total <= maxtotalsize:
+                    break
+                if self.verbose >= 3:
+                    msg = (_("Deleting '%s' because of too much size.")
+                            % (oldfile))
+                    self.logger.debug(msg)
+                result.append(oldfile)
+                total -= sizes.get(oldfile, 0)
+
         if self.verbose > 3:
             if len(result):
                 pp = pprint.PrettyPrinter(indent=4)
@@ -1440,8 +2404,13 @@ class LogrotateHandler(object):
                 oldfile = os.path.abspath(oldfile)
                 if oldfile == logfile:
                     continue
+                if (oldfile.endswith(index_suffix) and
+                        os.path.exists(oldfile[:-len(index_suffix)])):
+                    # sidecar index of a seekable compressed file
+                    continue
                 statinfo = os.stat(oldfile)
                 result[oldfile] = statinfo.st_mtime
+                self.oldfile_sizes[oldfile] = statinfo.st_size
 
         if self.verbose > 3:
             pp = pprint.PrettyPrinter(indent=4)
@@ -1628,9 +2597,9 @@ class LogrotateHandler(object):
         return target
 
     #------------------------------------------------------------
-    def _create_olddir(self, logfile, cur_desc_index):
+    def _get_olddir(self, logfile, cur_desc_index):
         '''
-        Creating the olddir, if necessary.
+        Retrieves the name of the olddir of the given logfile.
 
         @param logfile: the logfile to rotate
         @type logfile:  str
@@ -1638,20 +2607,15 @@ class LogrotateHandler(object):
                                of logfile from configuration file
         @type cur_desc_index:  int
 
-        @return: Name of the retrieved olddir, ".", if storing
-                 the rotated logfiles in their original directory or
-                 None in case of some minor errors (olddir couldn't
-                 created a.s.o.)
-        @rtype:  str or None
+        @return: Name of the olddir or ".", if storing the rotated
+                 logfiles in their original directory
+        @rtype:  str
         '''
 
         definition = self.config[cur_desc_index]
 
         _ = self.t.lgettext
 
-        uid = os.geteuid()
-        gid = os.getegid()
-
         o = definition['olddir']
         if not o['dirname']:
             if self.verbose > 1:
@@ -1660,16 +2624,6 @@ class LogrotateHandler(object):
             return "."
         olddir = o['dirname']
 
-        mode = o['mode']
-        if mode is None:
-            mode = int('0755', 8)
-        owner = o['owner']
-        if not owner:
-            owner = uid
-        group = o['group']
-        if not group:
-            group = gid
-
         basename = os.path.basename(logfile)
         dirname  = os.path.dirname(logfile)
 
@@ -1714,6 +2668,43 @@ class LogrotateHandler(object):
             msg = _("Olddir name is now '%s'.") % (olddir)
             self.logger.debug(msg)
 
+        return os.path.realpath(olddir)
+
+    #------------------------------------------------------------
+    def _create_olddir(self, logfile, cur_desc_index, olddir = None):
+        '''
+        Creating the olddir, if necessary.
+
+        @param logfile: the logfile to rotate
+        @type logfile:  str
+        @param cur_desc_index: index of self.config for definition
+                               of logfile from configuration file
+        @type cur_desc_index:  int
+        @param olddir: the name of the olddir from the rotation plan,
+                       if None, it will be retrieved by _get_olddir()
+        @type olddir:  str or None
+
+        @return: Name of the retrieved olddir, ".", if storing
+                 the rotated logfiles in their original directory or
+                 None in case of some minor errors (olddir couldn't
+                 created a.s.o.)
+        @rtype:  str or None
+        '''
+
+        definition = self.config[cur_desc_index]
+
+        _ = self.t.lgettext
+
+        uid = os.geteuid()
+        gid = os.getegid()
+
+        if olddir is None:
+            olddir = self._get_olddir(logfile, cur_desc_index)
+        if olddir == ".":
+            return olddir
+
+        o = definition['olddir']
+
         # Check for Existence and Consistence
         if os.path.exists(olddir):
             if os.path.isdir(olddir):
@@ -1919,6 +2910,9 @@ class LogrotateHandler(object):
             return False
 
         filesize = os.path.getsize(logfile)
+        if definition['copyinplace']:
+            # without the leading hole of the last rotation in place
+            filesize = data_size(logfile)
         if self.verbose > 2:
             msg = (_("Filesize of '%(file)s': %(size)d.")
                     % {'file': logfile, 'size': filesize})
@@ -1985,107 +2979,966 @@ class LogrotateHandler(object):
         msg = _("Deletion of all superfluid logfiles ...")
         self.logger.debug(msg)
 
+        if self.min_free_space is not None:
+            purged = self._collect_files_purge()
+            if purged:
+                msg = (_("Purging %d old logfiles because of too less " +
+                         "free space ...") % (len(purged)))
+                self.logger.info(msg)
+                self._delete_files(purged)
+                for logfile in purged:
+                    if logfile in self.files_compress:
+                        del self.files_compress[logfile]
+                    if logfile in self.files2send:
+                        del self.files2send[logfile]
+
         if not len(self.files_delete.keys()):
             msg = _("No logfiles to delete found.")
             self.logger.info(msg)
+            return
 
-        for logfile in sorted(self.files_delete.keys(), key=str.lower):
-            msg = _("Deleting file '%s' ...") % (logfile)
-            self.logger.info(msg)
-            if not self.test:
-                try:
-                    os.remove(logfile)
-                except OSError, e:
-                    msg = (_("Error on removing file '%(file)s': %(err)s")
-                            % {'file': logfile, 'err': e.strerror})
-                    self.logger.error(msg)
-
-        return
+        self._delete_files(self.files_delete.keys())
 
     #------------------------------------------------------------
-    def compress(self):
+    def _delete_files(self, logfiles):
         '''
-        Compressing all logfiles in self.files_compress
+        Deletes the given logfiles and their sidecar indexes and removes
+        them from the manifests.
+
+        @param logfiles: the logfiles to delete
+        @type logfiles:  list
 
         @return: None
         '''
 
-        _ = self.t.lgettext
+        files = []
+        for logfile in logfiles:
+            files.append(logfile)
+            if os.path.exists(logfile + index_suffix):
+                files.append(logfile + index_suffix)
+
+        gradual = {}
+        if self.gradual_delete:
+            gradual = {
+                'truncate_threshold': self.gradual_delete['threshold'],
+                'truncate_step':      self.gradual_delete['step'],
+                'truncate_pause':     self.gradual_delete['pause'],
+            }
+
+        deleter = LogRotateDeleter(
+                max_jobs  = self.delete_jobs,
+                test_mode = self.test,
+                local_dir = self.local_dir,
+                verbose   = self.verbose,
+                **gradual
+        )
+        deleted = deleter.delete(locality_sorted(files))
+        deleter.report()
 
-        msg = _("Compression of all uncompressed logfiles ...")
-        self.logger.debug(msg)
+        for directory in deleted.keys():
+            self._update_manifests(directory, remove = deleted[directory])
 
-        if not len(self.files_compress.keys()):
+        return
+
+    #------------------------------------------------------------
+    def _collect_files_purge(self):
+        '''
+        Collects the old logfiles to delete, because their filesystems
+        have less free space than given by the option 'minfreespace'.
+        The logfiles of all definitions on a filesystem are purged in the
+        order of the option 'purgepriority' of their definitions (lowest
+        first) and of their age (oldest first), until the space freed
+        together with the regular deletions reaches the watermark.
+
+        @return: the logfiles to purge
+        @rtype:  list
+        '''
+
+        _ = self.t.lgettext
+
+        # the candidates per device as heaps
+        queues = {}
+        directories = {}
+        for oldfile in self.files_keep.keys():
+            if oldfile in self.files_delete:
+                continue
+            (mtime, size, cur_desc_index) = self.files_keep[oldfile]
+            directory = os.path.dirname(oldfile)
+            if not directory in directories:
+                directories[directory] = file_device(oldfile)
+            device = directories[directory]
+            if device is None:
+                continue
+            priority = self.config[cur_desc_index]['purgepriority']
+            if not device in queues:
+                queues[device] = []
+            queues[device].append((priority, mtime, oldfile, size))
+
+        # the space freed by the regular deletions
+        pending = {}
+        for logfile in self.files_delete.keys():
+            directory = os.path.dirname(logfile)
+            if not directory in directories:
+                directories[directory] = file_device(logfile)
+            device = directories[directory]
+            if not device in queues:
+                continue
+            try:
+                pending[device] = (pending.get(device, 0) +
+                        os.lstat(logfile).st_size)
+            except OSError, e:
+                continue
+
+        result = []
+        for directory in directories.keys():
+            device = directories[directory]
+            if not device in queues:
+                continue
+            queue = queues[device]
+            # one directory per filesystem is enough for statvfs()
+            del queues[device]
+
+            try:
+                fs_stat = os.statvfs(directory)
+            except OSError, e:
+                msg = (_("Error on retrieving the free space of " +
+                         "'%(dir)s': %(err)s")
+                        % {'dir': directory, 'err': e.strerror})
+                self.logger.warning(msg)
+                continue
+            free = fs_stat.f_bavail * fs_stat.f_frsize
+            if 'percent' in self.min_free_space:
+                watermark = (fs_stat.f_blocks * fs_stat.f_frsize *
+                        self.min_free_space['percent'] / 100)
+            else:
+                watermark = self.min_free_space['bytes']
+            missing = watermark - free - pending.get(device, 0)
+
+            if self.verbose > 2:
+                msg = (_("Free space on the filesystem of '%(dir)s': " +
+                         "%(free)s, watermark: %(watermark)s.")
+                        % {'dir': directory, 'free': bytes2human(free),
+                           'watermark': bytes2human(watermark)})
+                self.logger.debug(msg)
+            if missing <= 0:
+                continue
+
+            msg = (_("Filesystem of '%(dir)s' has only %(free)s free " +
+                     "space, purging %(missing)s of old logfiles.")
+                    % {'dir': directory, 'free': bytes2human(free),
+                       'missing': bytes2human(missing)})
+            self.logger.warning(msg)
+
+            heapq.heapify(queue)
+            while queue and missing > 0:
+                (priority, mtime, oldfile, size) = heapq.heappop(queue)
+                if self.verbose >= 3:
+                    msg = (_("Deleting '%s' because of too less " +
+                             "free space.") % (oldfile))
+                    self.logger.debug(msg)
+                result.append(oldfile)
+                missing -= size
+
+            if missing > 0:
+                msg = (_("Not enough old logfiles on the filesystem of " +
+                         "'%(dir)s' to purge, %(missing)s are missing.")
+                        % {'dir': directory,
+                           'missing': bytes2human(missing)})
+                self.logger.warning(msg)
+
+        return result
+
+    #------------------------------------------------------------
+    def _record_digests(self, filename, digests, uncompressed = False,
+            remove = None):
+        '''
+        Writes the digests of the given archived file into the manifests
+        of its directory, one manifest per algorithm.
+
+        @param filename:     the archived file
+        @type filename:      str
+        @param digests:      the computed digests of the file
+        @type digests:       DigestSet
+        @param uncompressed: the digests are those of the uncompressed
+                             data, they are written into the manifests
+                             with the suffix '.orig'
+        @type uncompressed:  bool
+        @param remove:       basenames of files, whose entries have to
+                             remove from the manifests, e.g. the
+                             uncompressed file after compressing
+        @type remove:        list or None
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        directory = os.path.dirname(filename)
+        name = os.path.basename(filename)
+        hexdigests = digests.hexdigests()
+
+        for algorithm in sorted(hexdigests.keys()):
+            manifest = manifest_name(directory, algorithm, uncompressed)
+            if self.verbose > 2:
+                msg = (_("Adding %(algorithm)s digest of '%(file)s' " +
+                         "to manifest '%(manifest)s'.")
+                        % {'algorithm': algorithm, 'file': filename,
+                           'manifest': manifest})
+                self.logger.debug(msg)
+            if self.test:
+                continue
+            try:
+                update_manifest(manifest,
+                        add = {name: hexdigests[algorithm]}, remove = remove,
+                        extensions = self._compress_extensions())
+            except (IOError, OSError), e:
+                msg = (_("Error on updating manifest '%(file)s': %(err)s")
+                        % {'file': manifest, 'err': str(e)})
+                self.logger.error(msg)
+
+    #------------------------------------------------------------
+    def _compress_extensions(self):
+        '''
+        @return: the extensions of all internal compressors and of all
+                 logfile definitions with a leading dot
+        @rtype:  list
+        '''
+
+        extensions = {}
+        for compressor in compressors.values():
+            extensions[compressor['extension']] = True
+        for definition in self.config:
+            extension = definition['compressext']
+            if not extension:
+                continue
+            if not extension.startswith('.'):
+                extension = '.' + extension
+            extensions[extension] = True
+
+        return sorted(extensions.keys())
+
+    #------------------------------------------------------------
+    def _update_manifests(self, directory, remove = None, rename = None):
+        '''
+        Removes or renames entries in all existing manifests
+        of the given directory.
+
+        @param directory: the directory of the manifests
+        @type directory:  str
+        @param remove:    basenames of deleted files
+        @type remove:     list or None
+        @param rename:    renamed files, keys are the old basenames,
+                          values the new ones
+        @type rename:     dict or None
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        if self.test:
+            return
+
+        for manifest in manifests(directory):
+            try:
+                update_manifest(manifest, remove = remove, rename = rename,
+                        extensions = self._compress_extensions())
+            except (IOError, OSError), e:
+                msg = (_("Error on updating manifest '%(file)s': %(err)s")
+                        % {'file': manifest, 'err': str(e)})
+                self.logger.error(msg)
+
+    #------------------------------------------------------------
+    def _remove_compress_tempfiles(self):
+        '''
+        Removes orphaned temporary files of interrupted compressions
+        from the directories of all logfiles and their olddirs.
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        directories = {}
+        cur_desc_index = 0
+        for definition in self.config:
+            for logfile in definition['files']:
+                directories[os.path.dirname(logfile)] = True
+                if definition['olddir']['dirname']:
+                    olddir = self._get_olddir(logfile, cur_desc_index)
+                    directories[olddir] = True
+            cur_desc_index += 1
+
+        for directory in locality_sorted(directories.keys()):
+            try:
+                entries = os.listdir(directory)
+            except OSError:
+                continue
+            for entry in entries:
+                if not is_temp_target(entry):
+                    continue
+                tempfile = os.path.join(directory, entry)
+                msg = (_("Removing orphaned temporary file '%s' of an " +
+                         "interrupted compression.") % (tempfile))
+                self.logger.warning(msg)
+                if self.test:
+                    continue
+                try:
+                    os.remove(tempfile)
+                except OSError, e:
+                    msg = (_("Error removing temporary file '%(file)s': " +
+                             "%(err)s") % {'file': tempfile, 'err': str(e)})
+                    self.logger.error(msg)
+
+    #------------------------------------------------------------
+    def _get_compress_pool(self, max_jobs = None):
+        '''
+        Gives back the pool of worker processes for compression
+        and creates it, if necessary. The workers get the nice level,
+        the I/O priority and the CPU affinity of the configuration.
+
+        @param max_jobs: number of parallel jobs of a new pool, if None,
+                         self.compress_jobs or the number of CPUs of
+                         self.compress_affinity is used
+        @type max_jobs:  int or None
+
+        @return: the pool for compression jobs
+        @rtype:  LogRotateJobPool
+        '''
+
+        if self.compress_pool is None:
+            if max_jobs is None:
+                max_jobs = self.compress_jobs
+            if max_jobs is None and self.compress_affinity:
+                max_jobs = len(self.compress_affinity)
+            self.compress_pool = LogRotateJobPool(
+                max_jobs  = max_jobs,
+                local_dir = self.local_dir,
+                verbose   = self.verbose,
+                nice      = self.compress_nice,
+                ioprio    = self.compress_ioprio,
+                affinity  = self.compress_affinity,
+                group_limit = self._device_limit,
+            )
+        return self.compress_pool
+
+    #------------------------------------------------------------
+    def _parallel_jobs(self):
+        '''
+        Gives back the number of worker processes, a parallel internal
+        compressor may use for a single file. If several logfiles are
+        compressed in parallel, every file is compressed in one process,
+        else the CPUs of the option 'compressaffinity' are used,
+        because the workers inherit this affinity.
+
+        @return: the number of worker processes or None for the number
+                 of all CPUs
+        @rtype:  int or None
+        '''
+
+        if self.compress_pool is not None and \
+                self.compress_pool.max_jobs > 1:
+            return 1
+        if self.compress_affinity:
+            return len(self.compress_affinity)
+        return None
+
+    #------------------------------------------------------------
+    def _device_limit(self, device):
+        '''
+        Gives back the maximum number of parallel compression jobs on
+        the given storage device: the value of the option 'devicejobs',
+        or automatically one job for a spinning disk, where parallel
+        writes would thrash, and no limit for all other devices.
+
+        @param device: the device number
+        @type device:  int
+
+        @return: the maximum number of parallel jobs or None for no limit
+        @rtype:  int or None
+        '''
+
+        _ = self.t.lgettext
+
+        if device in self.device_limits:
+            return self.device_limits[device]
+
+        limit = self.device_jobs
+        rotational = None
+        if limit is None:
+            rotational = is_rotational(device)
+            if rotational:
+                limit = 1
+        self.device_limits[device] = limit
+
+        if self.verbose > 1:
+            msg = (_("Maximum number of parallel compression jobs on " +
+                     "device %(major)d:%(minor)d (rotational: %(rot)s): " +
+                     "%(limit)s.")
+                    % {'major': os.major(device), 'minor': os.minor(device),
+                       'rot': rotational, 'limit': limit})
+            self.logger.debug(msg)
+
+        return limit
+
+    #------------------------------------------------------------
+    def _submit_compress(self, logfile):
+        '''
+        Starts the compression of the given old logfile as a background
+        job in the compression pool, if not allready done.
+
+        @param logfile: the old logfile to compress
+        @type logfile:  str
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        pool = self._get_compress_pool()
+        if logfile in pool.submitted:
+            return
+
+        if self.verbose > 1:
+            msg = _("Enqueuing compression of '%s'.") % (logfile)
+            self.logger.debug(msg)
+
+        cur_desc_index = self.files_compress[logfile]
+        if logfile in self.migration_jobs:
+            # migrating and compressing one after another in one job
+            (source, cache_policy) = self.migration_jobs[logfile]
+            del self.migration_jobs[logfile]
+            pool.submit(logfile, self._migrate_job, source, logfile,
+                    cache_policy, cur_desc_index,
+                    group = file_device(logfile))
+            return
+
+        # the budget starts with the first submitted job
+        self._budget_deadline(cur_desc_index)
+        pool.submit(logfile, self._compress_job, logfile, cur_desc_index,
+                group = file_device(logfile))
+
+    #------------------------------------------------------------
+    def _compress_job(self, logfile, cur_desc_index):
+        '''
+        Job of the compression pool, which compresses the given old
+        logfile. The compression level is chosen not until the job
+        starts, so the elapsed time of the budget and the jobs still
+        queued are taken into account.
+
+        @param logfile: the old logfile to compress
+        @type logfile:  str
+        @param cur_desc_index: index of self.config for definition
+                               of logfile from configuration file
+        @type cur_desc_index:  int
+
+        @return: success or not
+        @rtype:  bool
+        '''
+
+        level = self._budget_level(logfile, cur_desc_index)
+        return self._compress_file(logfile, cur_desc_index, level)
+
+    #------------------------------------------------------------
+    def _budget_deadline(self, cur_desc_index):
+        '''
+        Gives back the deadline of the compressbudget of the given
+        logfile definition and starts the budget, if necessary.
+
+        @param cur_desc_index: index of self.config for the definition
+        @type cur_desc_index:  int
+
+        @return: the deadline as timestamp or None without a budget
+        @rtype:  float or None
+        '''
+
+        budget = self.config[cur_desc_index].get('compressbudget')
+        if not budget:
+            return None
+        if not cur_desc_index in self.compress_deadlines:
+            self.compress_deadlines[cur_desc_index] = time.time() + budget
+        return self.compress_deadlines[cur_desc_index]
+
+    #------------------------------------------------------------
+    def _compress_started(self, logfile):
+        '''
+        @return: the compression of the given old logfile was started
+                 allready, in the compression pool a submitted job
+                 is started, if it isn't queued anymore
+        @rtype:  bool
+        '''
+
+        pool = self.compress_pool
+        if pool is not None and logfile in pool.submitted:
+            return not logfile in [x[0] for x in pool.pending]
+        return logfile in self.compress_levels
+
+    #------------------------------------------------------------
+    def _budget_level(self, logfile, cur_desc_index):
+        '''
+        Chooses the compression level for the given old logfile, if its
+        logfile definition has a compressbudget. The throughput of the
+        levels is measured by compressing the beginning of the file in
+        memory, and the best level is taken, which is fast enough to
+        compress all remaining old logfiles of this definition with the
+        available workers until the deadline. In the compression pool
+        it is called by the job itself, when it starts.
+
+        @param logfile: the old logfile to compress
+        @type logfile:  str
+        @param cur_desc_index: index of self.config for definition
+                               of logfile from configuration file
+        @type cur_desc_index:  int
+
+        @return: the compression level to use or None, if the level
+                 of the definition should be used
+        @rtype:  int or None
+        '''
+
+        _ = self.t.lgettext
+
+        definition = self.config[cur_desc_index]
+        budget = definition.get('compressbudget')
+        command = definition['compresscmd']
+        level = definition['compresslevel']
+        self.compress_levels[logfile] = level
+
+        if not budget:
+            return level
+        if not command in compressors or not compressors[command]['probe']:
+            if self.verbose > 2:
+                msg = (_("Compressor '%s' has no compression levels, " +
+                         "ignoring compressbudget.") % (command))
+                self.logger.debug(msg)
+            return level
+        if not os.path.exists(logfile):
+            return level
+
+        remaining_time = self._budget_deadline(cur_desc_index) - time.time()
+
+        # all old logfiles of this definition not started yet
+        remaining_bytes = os.path.getsize(logfile)
+        for oldfile in self.files_compress.keys():
+            if (self.files_compress[oldfile] != cur_desc_index or
+                    oldfile == logfile or
+                    self._compress_started(oldfile) or
+                    not os.path.exists(oldfile)):
+                continue
+            remaining_bytes += os.path.getsize(oldfile)
+
+        workers = 1
+        if self.compress_pool is not None:
+            workers = self.compress_pool.max_jobs
+
+        levels = list(budget_levels)
+        if level is not None:
+            levels = [x for x in levels if x < level]
+            levels.insert(0, level)
+
+        if remaining_time <= 0:
+            chosen = levels[-1]
+            msg = (_("Compression budget of %(budget)d seconds exceeded, " +
+                     "compressing '%(file)s' with level %(level)d.")
+                    % {'budget': budget, 'file': logfile, 'level': chosen})
+            self.logger.warning(msg)
+            self.compress_levels[logfile] = chosen
+            return chosen
+
+        required = remaining_bytes / float(workers) / remaining_time
+        sample = read_sample(logfile)
+        chosen = levels[-1]
+        rate = 0
+        for cur_level in levels:
+            (rate, size) = probe_rate(command, sample, cur_level)
+            if self.verbose > 3:
+                msg = (_("Level %(level)d of '%(cmd)s': %(rate)s/s.")
+                        % {'level': cur_level, 'cmd': command,
+                           'rate': bytes2human(rate)})
+                self.logger.debug(msg)
+            if rate >= required:
+                chosen = cur_level
+                break
+
+        msg = (_("Compressing '%(file)s' with level %(level)d " +
+                 "(%(rate)s/s measured, %(req)s/s required for " +
+                 "%(bytes)s in %(secs).1f seconds).")
+                % {'file': logfile, 'level': chosen,
+                   'rate': bytes2human(rate),
+                   'req': bytes2human(required),
+                   'bytes': bytes2human(remaining_bytes),
+                   'secs': remaining_time})
+        self.logger.info(msg)
+
+        self.compress_levels[logfile] = chosen
+        return chosen
+
+    #------------------------------------------------------------
+    def compress(self):
+        '''
+        Compressing all logfiles in self.files_compress
+
+        If more than one compression job is allowed or the compression
+        was pipelined with the rotation, the logfiles are compressed in
+        background by the compression pool, the largest files first for
+        a good utilisation of the workers, and it waits for finishing
+        of all compression jobs.
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        msg = _("Compression of all uncompressed logfiles ...")
+        self.logger.debug(msg)
+
+        for cur_desc_index in sorted(self.files_bundle.keys()):
+            self._bundle_files(cur_desc_index)
+
+        if not len(self.files_compress.keys()):
             msg = _("No logfiles to compress found.")
             self.logger.info(msg)
+            # no new pool only for waiting, a pool of the pipeline
+            # has to be released below
+            if self.compress_pool is None:
+                return
 
-        for logfile in sorted(self.files_compress.keys(), key=str.lower):
+        if self.compress_jobs is not None and self.compress_jobs > 1:
+            self._get_compress_pool()
+        elif (self.compress_nice is not None or
+                self.compress_ioprio is not None or
+                self.compress_affinity is not None):
+            # one after another, but in a worker with a lower priority
+            self._get_compress_pool(1)
+
+        if self.compress_pool is None:
+            for logfile in locality_sorted(self.files_compress.keys()):
+                cur_desc_index = self.files_compress[logfile]
+                level = self._budget_level(logfile, cur_desc_index)
+                self._compress_file(logfile, cur_desc_index, level)
+            return
 
-            cur_desc_index = self.files_compress[logfile]
-            definition = self.config[cur_desc_index]
-            command = definition['compresscmd']
-            compress_extension = definition['compressext']
-            compress_opts = definition['compressoptions']
+        sizes = {}
+        for logfile in self.files_compress.keys():
+            sizes[logfile] = 0
+            if os.path.exists(logfile):
+                sizes[logfile] = os.path.getsize(logfile)
 
-            match = re.search(r'^\.', compress_extension)
-            if not match:
-                compress_extension = "." + compress_extension
-            target = logfile + compress_extension
+        for logfile in sorted(sizes.keys(), key = lambda x: sizes[x],
+                reverse = True):
+            self._submit_compress(logfile)
 
-            # Check existence source logfile
-            if not os.path.exists(logfile):
-                msg = (_("Source file '%s' for compression doesn't exists.")
-                        % (logfile))
-                raise LogrotateHandlerError(msg)
-                return
+        if not self.compress_pool.wait():
+            msg = (_("Compression of %d logfiles failed.")
+                    % (len(self.compress_pool.failed)))
+            self.logger.error(msg)
 
-            # Check existence target (compressed file)
-            if os.path.exists(target):
-                if os.path.samefile(logfile, target):
-                    msg = (_("Source file '%(source)s' and target file " +
-                             "'%(target)s' are the same file.")
-                            % {'source': logfile, 'target': target})
-                    raise LogrotateHandlerError(msg)
-                    return
-                msg = (_("Target file '%s' for compression allready exists.")
-                        % (target))
-                self.logger.warning(msg)
+        # the pool refers back to the handler by its group limit,
+        # so the destructor removing the PID file would never be called
+        self.compress_pool = None
 
-            # Check for filesize Zero => not compressed
-            filesize = os.path.getsize(logfile)
-            if filesize <= 0:
-                msg = (_("File '%s' has a size of 0, skip compressing.")
-                        % (logfile))
+        return
+
+    #------------------------------------------------------------
+    def _bundle_files(self, cur_desc_index):
+        '''
+        Packs all logfiles of the given definition rotated in this run
+        into one compressed tar archive in the directory of the first
+        rotated logfile, removes the packed logfiles and deletes old
+        bundles according to the options 'rotate' and 'maxage'.
+
+        The name of the bundle is '<name>-<YYYYmmddHHMMSS>.tar.gz', where
+        name is the value of the option 'bundle' or the name of the first
+        logfile of the definition, because every logfile belongs to only
+        one definition, so the bundles of different definitions in the
+        same directory don't rotate away each other.
+
+        @param cur_desc_index: index of self.config for definition
+                               of logfiles from configuration file
+        @type cur_desc_index:  int
+
+        @return: success or not
+        @rtype:  bool
+        '''
+
+        _ = self.t.lgettext
+
+        definition = self.config[cur_desc_index]
+        files = self.files_bundle[cur_desc_index]
+        if not files:
+            return True
+
+        # files still migrating into their olddir
+        for logfile in files:
+            if self._is_migrating(logfile):
+                self._wait_migrations()
+                break
+
+        bundle_dir = os.path.dirname(files[0])
+        name = definition['bundle']
+        if not name:
+            name = os.path.basename(sorted(definition['files'])[0])
+        compression = bundle_format(definition['compresscmd'])
+        extension = bundle_formats[compression]
+        stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        target = os.path.join(bundle_dir, name + '-' + stamp + extension)
+        i = 0
+        while os.path.exists(target):
+            i += 1
+            target = os.path.join(bundle_dir,
+                    name + '-' + stamp + '.' + str(i) + extension)
+
+        msg = (_("Packing %(count)d rotated logfiles into bundle " +
+                 "'%(target)s' ...") % {'count': len(files), 'target': target})
+        self.logger.info(msg)
+
+        if not self.test:
+            tempfile = temp_target(target)
+            existing = []
+            for logfile in locality_sorted(files):
+                if os.path.exists(logfile):
+                    existing.append(logfile)
+            digests = None
+            if (definition['digest'] is not None and
+                    definition['digest']['mode'] != 'input'):
+                digests = DigestSet(definition['digest']['algorithms'])
+            try:
+                write_bundle(tempfile, existing, bundle_dir, compression,
+                        digests)
+            except (IOError, OSError, tarfile.TarError), e:
+                msg = (_("Error on writing bundle '%(target)s': %(err)s")
+                        % {'target': target, 'err': str(e)})
+                self.logger.error(msg)
+                self._remove_tempfile(tempfile)
+                return False
+            cache_policy = definition['cachepolicy']
+            try:
+                if (self.compress_fsync != 'none' or
+                        cache_policy == 'dontneed'):
+                    fd = os.open(tempfile, os.O_RDONLY)
+                    try:
+                        if self.compress_fsync != 'none':
+                            os.fsync(fd)
+                        if cache_policy == 'dontneed':
+                            drop_cache(fd,
+                                    written = (self.compress_fsync == 'none'))
+                    finally:
+                        os.close(fd)
+                os.rename(tempfile, target)
+            except OSError, e:
+                msg = (_("Error on renaming '%(from)s' to '%(to)s': %(err)s")
+                        % {'from': tempfile, 'to': target, 'err': str(e)})
+                self.logger.error(msg)
+                self._remove_tempfile(tempfile)
+                return False
+            for logfile in existing:
+                if self.verbose > 1:
+                    msg = _("Deleting bundled file '%s' ...") % (logfile)
+                    self.logger.debug(msg)
+                try:
+                    os.remove(logfile)
+                except OSError, e:
+                    msg = (_("Error on removing file '%(file)s': %(err)s")
+                            % {'file': logfile, 'err': e.strerror})
+                    self.logger.error(msg)
+            if digests is not None:
+                self._record_digests(target, digests)
+            self._update_manifests(bundle_dir,
+                    remove = [os.path.basename(x) for x in existing])
+
+        # retention per bundle
+        pattern = os.path.join(bundle_dir, name + '-[0-9]*' + extension)
+        bundles = {}
+        sizes = {}
+        for bundle in glob.glob(pattern):
+            statinfo = os.stat(bundle)
+            bundles[bundle] = statinfo.st_mtime
+            sizes[bundle] = statinfo.st_size
+        if not self.test:
+            bundles[target] = time.time()
+            sizes[target] = os.path.getsize(target)
+        deleted = []
+        for bundle in self._collect_files_delete(bundles, cur_desc_index,
+                sizes):
+            msg = _("Deleting old bundle '%s' ...") % (bundle)
+            self.logger.info(msg)
+            if not self.test:
+                try:
+                    os.remove(bundle)
+                except OSError, e:
+                    msg = (_("Error on removing file '%(file)s': %(err)s")
+                            % {'file': bundle, 'err': e.strerror})
+                    self.logger.error(msg)
+                    continue
+                deleted.append(os.path.basename(bundle))
+        if deleted:
+            self._update_manifests(bundle_dir, remove = deleted)
+
+        return True
+
+    #------------------------------------------------------------
+    def _compress_file(self, logfile, cur_desc_index, level = None):
+        '''
+        Compressing of the given old logfile with the compress command
+        of the appropriate logfile definition.
+
+        It raises a LogrotateHandlerError on uncoverable errors.
+
+        @param logfile: the old logfile to compress
+        @type logfile:  str
+        @param cur_desc_index: index of self.config for definition
+                               of logfile from configuration file
+        @type cur_desc_index:  int
+        @param level: compression level for internal compressors,
+                      if None, the level of the definition is used
+        @type level:  int or None
+
+        @return: success or not
+        @rtype:  bool
+        '''
+
+        _ = self.t.lgettext
+
+        definition = self.config[cur_desc_index]
+        command = definition['compresscmd']
+        compress_extension = definition['compressext']
+        compress_opts = definition['compressoptions']
+        if level is None:
+            level = definition['compresslevel']
+
+        match = re.search(r'^\.', compress_extension)
+        if not match:
+            compress_extension = "." + compress_extension
+        target = logfile + compress_extension
+
+        # Check existence source logfile
+        if not os.path.exists(logfile):
+            msg = (_("Source file '%s' for compression doesn't exists.")
+                    % (logfile))
+            if self.test:
+                # not really rotated in test mode
                 self.logger.info(msg)
-                continue
+                return True
+            raise LogrotateHandlerError(msg)
+
+        # Check existence target (compressed file)
+        if os.path.exists(target):
+            if os.path.samefile(logfile, target):
+                msg = (_("Source file '%(source)s' and target file " +
+                         "'%(target)s' are the same file.")
+                        % {'source': logfile, 'target': target})
+                raise LogrotateHandlerError(msg)
+            msg = (_("Target file '%s' for compression allready exists.")
+                    % (target))
+            self.logger.warning(msg)
 
-            # Execute compressing ...
-            msg = (_("Compressing file '%(file)s' to '%(target)s' " +
-                     "with '%(cmd)s' ...")
-                    % {'file': logfile, 'target': target, 'cmd': command})
+        # Check for filesize Zero => not compressed
+        filesize = os.path.getsize(logfile)
+        if filesize <= 0:
+            msg = (_("File '%s' has a size of 0, skip compressing.")
+                    % (logfile))
             self.logger.info(msg)
+            return True
 
-            if command == 'internal_gzip':
-                self._compress_internal_gzip(logfile, target)
-            elif command == 'internal_bzip2':
-                self._compress_internal_bzip2(logfile, target)
-            elif command == 'internal_zip':
-                self._compress_internal_zip(logfile, target)
-            else:
-                self._compress_external(
+        # Check for incompressible content like base64 or compressed data
+        incompressible = definition['incompressible']
+        if incompressible is not None:
+            ratio = sample_ratio(logfile)
+            if self.verbose > 2:
+                msg = (_("Estimated compression ratio of '%(file)s': " +
+                         "%(ratio).3f.") % {'file': logfile, 'ratio': ratio})
+                self.logger.debug(msg)
+            if ratio is not None and ratio >= incompressible['ratio']:
+                action = incompressible['action']
+                if action == 'store' and not command in compressors:
+                    # external commands have no well known cheapest level
+                    action = 'skip'
+                if action == 'skip':
+                    msg = (_("File '%(file)s' is incompressible " +
+                             "(estimated ratio %(ratio).3f), " +
+                             "skip compressing.")
+                            % {'file': logfile, 'ratio': ratio})
+                    self.logger.info(msg)
+                    return True
+                level = compressors[command]['store_level']
+                msg = (_("File '%(file)s' is incompressible " +
+                         "(estimated ratio %(ratio).3f), " +
+                         "storing it with level %(level)d.")
+                        % {'file': logfile, 'ratio': ratio, 'level': level})
+                self.logger.info(msg)
+
+        # Execute compressing ...
+        msg = (_("Compressing file '%(file)s' to '%(target)s' " +
+                 "with '%(cmd)s' ...")
+                % {'file': logfile, 'target': target, 'cmd': command})
+        self.logger.info(msg)
+
+        # Digests of the uncompressed and the compressed data
+        input_digests = None
+        output_digests = None
+        digest = definition['digest']
+        if digest is not None and not self.test:
+            if digest['mode'] != 'output':
+                input_digests = DigestSet(digest['algorithms'])
+            if digest['mode'] != 'input':
+                output_digests = DigestSet(digest['algorithms'])
+
+        if command in compressors:
+            result = self._compress_internal(
+                    logfile,
+                    target,
+                    command,
+                    level,
+                    compress_opts,
+                    definition['compressindex'],
+                    input_digests,
+                    output_digests,
+                    definition['cachepolicy'],
+            )
+        else:
+            if input_digests is not None or output_digests is not None:
+                if self.verbose > 1:
+                    msg = (_("Command '%s' can't compute digests on the " +
+                             "fly, reading the files once more.")
+                            % (command))
+                    self.logger.debug(msg)
+            try:
+                if input_digests is not None:
+                    input_digests.read_file(logfile,
+                            self.copier.buffer_size)
+                result = self._compress_external(
                         logfile,
                         target,
                         command,
-                        compress_opts
+                        compress_opts,
+                        definition['cachepolicy'],
                 )
+                if result and output_digests is not None:
+                    output_digests.read_file(target,
+                            self.copier.buffer_size)
+            except IOError, e:
+                msg = (_("Error on computing digests of '%(file)s': " +
+                         "%(err)s") % {'file': logfile, 'err': str(e)})
+                self.logger.error(msg)
+                return False
 
-        return
+        if result:
+            if output_digests is not None:
+                self._record_digests(target, output_digests,
+                        remove = [os.path.basename(logfile)])
+            if input_digests is not None:
+                self._record_digests(logfile, input_digests,
+                        uncompressed = True)
+
+        return result
 
     #------------------------------------------------------------
-    def _compress_external(self, source, target, command, options):
+    def _compress_external(self, source, target, command, options,
+            cache_policy = 'keep'):
         '''
         Compression of the given source file to the target file
-        with an external command.
+        with an external command. The command allways writes into
+        a temporary file, which is renamed to the target afterwards,
+        so an interrupted compression never leaves a partial target.
 
         It raises a LogrotateHandlerError on uncoverable errors.
 
@@ -2098,8 +3951,15 @@ class LogrotateHandler(object):
         @param options: additional options to the compress command
                         possible placeholders inside the options:
                             - {}: placeholder for sourcefile
-                            - []: placeholder for targetfile
+                            - []: placeholder for targetfile, without
+                                  it the command is called with '-c'
+                                  and its standard output is written
+                                  into the target
         @type options:  str
+        @param cache_policy: the usage of the page cache, with 'dontneed'
+                             the compressed file is dropped from the page
+                             cache, the command itself reads the source
+        @type cache_policy:  str
 
         @return: success or not
         @rtype:  bool
@@ -2116,15 +3976,20 @@ class LogrotateHandler(object):
         if options is None:
             options = ''
 
-        # substituting [] in compressoptions with qouted target file name
+        # substituting [] in compressoptions with qouted name of
+        # a temporary file, which is renamed to the target afterwards,
+        # else the command writes to stdout into the temporary file
+        tempfile = temp_target(target)
+        to_stdout = True
         match = re.search(r'\[\]', options)
         if match:
+            to_stdout = False
             if self.verbose > 3:
                 msg = (_("Substituting '%(what)s' in compressoptions " +
                          "with '%(by)s'.")
-                        % {'what': '[]', 'by': target})
+                        % {'what': '[]', 'by': tempfile})
                 self.logger.debug(msg)
-            options = re.sub(r'\[\]', '"' + target + '"', options)
+            options = re.sub(r'\[\]', '"' + tempfile + '"', options)
 
         # substituting or trailing command with quoted source file name
         match = re.search(r'\{\}', options)
@@ -2138,6 +4003,9 @@ class LogrotateHandler(object):
         else:
             options += ' "' + source + '"'
 
+        if to_stdout:
+            options = '-c ' + options.strip() + ' > "' + tempfile + '"'
+
         if self.verbose > 2:
             msg = _("Compress options: '%s'.") % (options)
             self.logger.debug(msg)
@@ -2147,39 +4015,21 @@ class LogrotateHandler(object):
         src_statinfo = os.stat(source)
 
         if not self._execute_command(cmd):
+            self._remove_tempfile(tempfile)
             return False
 
-        if not self.test:
-            if not os.path.exists(target):
-                msg = (_("Target '%s' of compression doesn't exists " +
-                         "after executing compression command.") % (target))
-                self.logger.error(msg)
-                return False
-
+        if not self.test and not os.path.exists(tempfile):
+            msg = (_("Target '%s' of compression doesn't exists " +
+                     "after executing compression command.")
+                    % (tempfile))
+            self.logger.error(msg)
+            return False
         if os.path.exists(source):
+            return self._finish_compression(source, tempfile, target,
+                    cache_policy = cache_policy)
+        return self._finish_compression(source, tempfile, target,
+                statinfo = src_statinfo, cache_policy = cache_policy)
 
-            self._copy_file_metadata(source=source, target=target)
-
-            # And last, but not least, delete uncompressed file
-            if self.verbose > 1:
-                msg = _("Deleting uncompressed file '%s' ...") % (source)
-                self.logger.debug(msg)
-
-            if not self.test:
-                try:
-                    os.remove(source)
-                except OSError, e:
-                    msg = (_("Error removing uncompressed file " +
-                             "'%(file)s': %(msg)")
-                            % {'file': source, 'msg': str(e) })
-                    self.logger.error(msg)
-                    return False
-
-        else:
-
-            self._copy_file_metadata(target=target, statinfo=src_statinfo)
-
-        return True
     #------------------------------------------------------------
     def _copy_file_metadata(self, target, source=None, statinfo=None):
         '''
@@ -2318,17 +4168,42 @@ class LogrotateHandler(object):
         return True
 
     #------------------------------------------------------------
-    def _compress_internal_zip(self, source, target):
+    def _compress_internal(self, source, target, command,
+            level = None, options = None, index_block_size = None,
+            input_digests = None, output_digests = None,
+            cache_policy = 'keep'):
         '''
         Compression of the given source file to the target file
-        with the Python module zipfile.
+        with an internal compressor from the compressor registry
+        of LogRotate.Compress.
 
         It raises a LogrotateHandlerError on some errors.
 
-        @param source: the source file to compress
-        @type source:  str
-        @param target: the filename of the compressed file.
-        @type target:  str
+        @param source:  the source file to compress
+        @type source:   str
+        @param target:  the filename of the compressed file.
+        @type target:   str
+        @param command: the name of the internal compressor,
+                        e.g. 'internal_gzip'
+        @type command:  str
+        @param level:   compression level (1 - 9), if None, the default
+                        level of the compressor is used
+        @type level:    int or None
+        @param options: the compressoptions of the logfile definition
+        @type options:  str or None
+        @param index_block_size: if given, the target is written as
+                                 independent blocks of this size with
+                                 a sidecar index
+        @type index_block_size:  int or None
+        @param input_digests:    digests of the uncompressed data
+                                 to compute
+        @type input_digests:     DigestSet or None
+        @param output_digests:   digests of the compressed file
+                                 to compute
+        @type output_digests:    DigestSet or None
+        @param cache_policy:     the usage of the page cache for reading
+                                 the source and writing the target
+        @type cache_policy:      str
 
         @return: success or not
         @rtype:  bool
@@ -2336,66 +4211,128 @@ class LogrotateHandler(object):
 
         _ = self.t.lgettext
 
+        compressor = compressors[command]
+
+        if index_block_size and compressor['block'] is None:
+            msg = (_("Compressor '%s' can't write seekable files, " +
+                     "writing it without an index.") % (command))
+            self.logger.warning(msg)
+            index_block_size = None
+
         if self.verbose > 1:
             msg = (_("Compressing source '%(source)s' to target " +
                      "'%(target)s' with module '%(module)s'.")
                     % { 'source': source,
                         'target': target,
-                        'module': 'zipfile'
+                        'module': compressor['module']
                       })
             self.logger.debug(msg)
 
-        if not self.test:
+        if not compressor['available']:
+            msg = (_("Python module '%(module)s' for compressor " +
+                     "'%(cmd)s' is not available.")
+                    % {'module': compressor['module'], 'cmd': command})
+            self.logger.error(msg)
+            return False
+
+        # compressors without digests on the fly, e.g. zip
+        on_the_fly = bool(compressor['digests'] or index_block_size)
+        if not on_the_fly and (input_digests is not None or
+                output_digests is not None):
+            if self.verbose > 1:
+                msg = (_("Compressor '%s' can't compute digests on the " +
+                         "fly, reading the files once more.") % (command))
+                self.logger.debug(msg)
+
+        kwargs = {}
+        if compressor['parallel']:
+            kwargs['jobs'] = self._parallel_jobs()
 
-            # open target for writing
-            f_out = None
+        tempfile = temp_target(target)
+        index_file = target + index_suffix
+        index_tempfile = temp_target(index_file)
+        if not self.test:
             try:
-                f_out = zipfile.ZipFile(
-                            file=target,
-                            mode='w',
-                            compression=zipfile.ZIP_DEFLATED
-                )
-            except IOError, e:
-                msg = (_("Error on open file '%(file)s' on writing: %(err)s")
-                        % {'file': target, 'err': str(e)})
+                if index_block_size:
+                    index = compress_seekable(source, tempfile, command,
+                            level, index_block_size, input_digests,
+                            output_digests, cache_policy, **kwargs)
+                    write_index(index_tempfile, index, command)
+                    if self.verbose > 1:
+                        msg = (_("Wrote index of %(blocks)d blocks " +
+                                 "into '%(file)s'.")
+                                % {'blocks': len(index), 'file': index_file})
+                        self.logger.debug(msg)
+                elif on_the_fly:
+                    compressor['function'](source, tempfile, level,
+                            self.copier.buffer_size, options,
+                            input_digests, output_digests, cache_policy,
+                            **kwargs)
+                else:
+                    if input_digests is not None:
+                        input_digests.read_file(source,
+                                self.copier.buffer_size)
+                    compressor['function'](source, tempfile, level,
+                            self.copier.buffer_size, options,
+                            cache_policy = cache_policy, **kwargs)
+                    if output_digests is not None:
+                        output_digests.read_file(tempfile,
+                                self.copier.buffer_size)
+            except (IOError, OSError), e:
+                msg = (_("Error on compressing file '%(file)s' to " +
+                         "'%(target)s': %(err)s")
+                        % {'file': source, 'target': target, 'err': str(e)})
                 self.logger.error(msg)
+                self._remove_tempfile(tempfile)
+                self._remove_tempfile(index_tempfile)
                 return False
 
-            basename = os.path.basename(source)
-            f_out.write(source, basename)
-            f_out.close()
+        if not index_block_size:
+            return self._finish_compression(source, tempfile, target,
+                    cache_policy = cache_policy)
 
-        self._copy_file_metadata(source=source, target=target)
-
-        # And last, but not least, delete uncompressed file
-        if self.verbose > 1:
-            msg = _("Deleting uncompressed file '%s' ...") % (source)
-            self.logger.debug(msg)
+        self._copy_file_metadata(source=source, target=index_tempfile)
+        if not self._finish_compression(source, tempfile, target,
+                cache_policy = cache_policy):
+            self._remove_tempfile(index_tempfile)
+            return False
 
         if not self.test:
             try:
-                os.remove(source)
+                os.rename(index_tempfile, index_file)
             except OSError, e:
-                msg = (_("Error removing uncompressed file '%(file)s': %(msg)")
-                        % {'file': source, 'msg': str(e) })
+                msg = (_("Error on renaming '%(from)s' to '%(to)s': %(err)s")
+                        % {'from': index_tempfile, 'to': index_file,
+                           'err': str(e)})
                 self.logger.error(msg)
+                self._remove_tempfile(index_tempfile)
                 return False
 
         return True
 
     #------------------------------------------------------------
-    def _compress_internal_gzip(self, source, target):
+    def _finish_compression(self, source, tempfile, target, statinfo = None,
+            cache_policy = 'keep'):
         '''
-        Compression of the given source file to the target file
-        with the Python module gzip.
-        As compression level is allways used 9 (highest compression).
-
-        It raises a LogrotateHandlerError on some errors.
-
-        @param source: the source file to compress
-        @type source:  str
-        @param target: the filename of the compressed file.
-        @type target:  str
+        Finishes a compression into a temporary file: copies the metadata
+        of the source onto the temporary file, syncs it onto disk according
+        to self.compress_fsync, renames it to the target and deletes the
+        uncompressed source only after that. So an interrupted compression
+        never leaves a partial compressed file.
+
+        @param source:   the uncompressed file
+        @type source:    str
+        @param tempfile: the temporary file containing the compressed data
+        @type tempfile:  str
+        @param target:   the final name of the compressed file
+        @type target:    str
+        @param statinfo: stat object of the source, if the source was
+                         allready removed by an external command
+        @type statinfo:  stat-object or None
+        @param cache_policy: the usage of the page cache, with 'dontneed'
+                             the synced temporary file is dropped from
+                             the page cache
+        @type cache_policy:  str
 
         @return: success or not
         @rtype:  bool
@@ -2403,44 +4340,45 @@ class LogrotateHandler(object):
 
         _ = self.t.lgettext
 
+        if statinfo is None:
+            self._copy_file_metadata(source=source, target=tempfile)
+        else:
+            self._copy_file_metadata(target=tempfile, statinfo=statinfo)
+
         if self.verbose > 1:
-            msg = (_("Compressing source '%(source)s' to target " +
-                     "'%(target)s' with module '%(module)s'.")
-                    % { 'source': source,
-                        'target': target,
-                        'module': 'gzip'
-                      })
+            msg = (_("Renaming '%(from)s' to '%(to)s' ...")
+                    % {'from': tempfile, 'to': target})
             self.logger.debug(msg)
 
         if not self.test:
-            # open source for reading
-            f_in = None
-            try:
-                f_in = open(source, 'rb')
-            except IOError, e:
-                msg = (_("Error on open file '%(file)s' on reading: %(err)s")
-                        % {'file': source, 'err': str(e)})
-                self.logger.error(msg)
-                return False
-
-            # open target for writing
-            f_out = None
             try:
-                f_out = gzip.open(target, 'wb')
-            except IOError, e:
-                msg = (_("Error on open file '%(file)s' on writing: %(err)s")
-                        % {'file': target, 'err': str(e)})
+                if (self.compress_fsync != 'none' or
+                        cache_policy == 'dontneed'):
+                    fd = os.open(tempfile, os.O_RDONLY)
+                    try:
+                        if self.compress_fsync != 'none':
+                            os.fsync(fd)
+                        if cache_policy == 'dontneed':
+                            drop_cache(fd,
+                                    written = (self.compress_fsync == 'none'))
+                    finally:
+                        os.close(fd)
+                os.rename(tempfile, target)
+                if self.compress_fsync == 'full':
+                    fd = os.open(os.path.dirname(target) or '.', os.O_RDONLY)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+            except OSError, e:
+                msg = (_("Error on renaming '%(from)s' to '%(to)s': %(err)s")
+                        % {'from': tempfile, 'to': target, 'err': str(e)})
                 self.logger.error(msg)
-                f_in.close()
+                self._remove_tempfile(tempfile)
                 return False
 
-            # compress and write target
-            f_out.writelines(f_in)
-            # close both files
-            f_out.close()
-            f_in.close()
-
-        self._copy_file_metadata(source=source, target=target)
+        if statinfo is not None and not os.path.exists(source):
+            return True
 
         # And last, but not least, delete uncompressed file
         if self.verbose > 1:
@@ -2451,88 +4389,34 @@ class LogrotateHandler(object):
             try:
                 os.remove(source)
             except OSError, e:
-                msg = (_("Error removing uncompressed file '%(file)s': %(msg)")
-                        % {'file': source, 'msg': str(e) })
+                msg = (_("Error removing uncompressed file '%(file)s': " +
+                         "%(msg)s") % {'file': source, 'msg': str(e) })
                 self.logger.error(msg)
                 return False
 
         return True
 
     #------------------------------------------------------------
-    def _compress_internal_bzip2(self, source, target):
+    def _remove_tempfile(self, tempfile):
         '''
-        Compression of the given source file to the target file
-        with the Python module bz2.
-        As compression level is allways used 9 (highest compression).
+        Removes the temporary file of a failed compression, if existing.
 
-        It raises a LogrotateHandlerError on some errors.
+        @param tempfile: the temporary file to remove
+        @type tempfile:  str
 
-        @param source: the source file to compress
-        @type source:  str
-        @param target: the filename of the compressed file.
-        @type target:  str
-
-        @return: success or not
-        @rtype:  bool
+        @return: None
         '''
 
         _ = self.t.lgettext
 
-        if self.verbose > 1:
-            msg = (_("Compressing source '%(source)s' to target " +
-                     "'%(target)s' with module '%(module)s'.")
-                    % { 'source': source,
-                        'target': target,
-                        'module': 'bz2'
-                      })
-            self.logger.debug(msg)
-
-        if not self.test:
-            # open source for reading
-            f_in = None
-            try:
-                f_in = open(source, 'rb')
-            except IOError, e:
-                msg = (_("Error on open file '%(file)s' on reading: %(err)s")
-                        % {'file': source, 'err': str(e)})
-                self.logger.error(msg)
-                return False
-
-            # open target for writing
-            f_out = None
-            try:
-                f_out = bz2.BZ2File(target, 'w')
-            except IOError, e:
-                msg = (_("Error on open file '%(file)s' on writing: %(err)s")
-                        % {'file': target, 'err': str(e)})
-                self.logger.error(msg)
-                f_in.close()
-                return False
-
-            # compress and write target
-            f_out.writelines(f_in)
-            # close both files
-            f_out.close()
-            f_in.close()
-
-        self._copy_file_metadata(source=source, target=target)
-
-        # And last, but not least, delete uncompressed file
-        if self.verbose > 1:
-            msg = _("Deleting uncompressed file '%s' ...") % (source)
-            self.logger.debug(msg)
-
-        if not self.test:
-            try:
-                os.remove(source)
-            except OSError, e:
-                msg = (_("Error removing uncompressed file '%(file)s': %(msg)")
-                        % {'file': source, 'msg': str(e) })
-                self.logger.error(msg)
-                return False
-
-        return True
-
+        if self.test or not os.path.exists(tempfile):
+            return
+        try:
+            os.remove(tempfile)
+        except OSError, e:
+            msg = (_("Error removing temporary file '%(file)s': %(err)s")
+                    % {'file': tempfile, 'err': str(e)})
+            self.logger.error(msg)
 
     #------------------------------------------------------------
     def send_logfiles(self):
@@ -0,0 +1,597 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: module for a bounded pool of worker processes, which
+          performs jobs like compressions in the background
+'''
+
+# Standard modules
+import re
+import sys
+import logging
+import pprint
+import gettext
+import time
+import os
+from collections import deque
+import errno
+import platform
+import multiprocessing
+
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None
+
+# Third party modules
+
+# Own modules
+
+revision = '$Revision$'
+revision = re.sub( r'\$', '', revision )
+revision = re.sub( r'Revision: ', r'r', revision )
+revision = re.sub( r'\s*$', '', revision )
+
+__author__    = 'Frank Brehm'
+__copyright__ = '(C) 2011 by Frank Brehm, Berlin'
+__contact__    = 'frank@brehm-online.com'
+__version__    = '0.1.0 ' + revision
+__license__    = 'GPL3'
+
+#========================================================================
+# Module variables
+
+poll_interval = 0.05
+'''
+@var: interval in seconds for looking after finished jobs
+@type: float
+'''
+
+ioprio_classes = {
+    'none':        0,
+    'realtime':    1,
+    'best-effort': 2,
+    'idle':        3,
+}
+'''
+@var: the I/O scheduling classes of ioprio_set(2) like in ionice(1)
+@type: dict
+'''
+
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+
+ioprio_syscalls = {
+    'x86_64':  251,
+    'i386':    289,
+    'i686':    289,
+    'aarch64': 30,
+    'armv7l':  314,
+    'ppc64':   273,
+    'ppc64le': 273,
+    's390x':   282,
+}
+'''
+@var: numbers of the syscall ioprio_set(2), which has no wrapper
+      in the C library, keys are the machine types
+@type: dict
+'''
+
+libc = None
+'''
+@var: the C library for sched_setaffinity(2) and ioprio_set(2)
+'''
+if ctypes is not None:
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno = True)
+    except OSError:
+        libc = None
+
+#========================================================================
+
+def default_jobs():
+    '''
+    Gives back the default number of parallel jobs, that is the
+    number of CPUs.
+
+    @rtype: int
+    '''
+
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+#------------------------------------------------------------------------
+def set_nice(level):
+    '''
+    Sets the nice level of the current process to the given
+    absolute value. It raises an OSError on errors.
+
+    @param level: the new nice level (-20 - 19)
+    @type level:  int
+
+    @return: None
+    '''
+
+    os.nice(level - os.nice(0))
+
+#------------------------------------------------------------------------
+def set_ioprio(ioprio_class, level = 0):
+    '''
+    Sets the I/O scheduling class and priority of the current process
+    with ioprio_set(2). It raises an OSError on errors.
+
+    @param ioprio_class: the scheduling class, a key of ioprio_classes
+    @type ioprio_class:  str
+    @param level:        the priority inside the class (0 - 7)
+    @type level:         int
+
+    @return: None
+    '''
+
+    number = ioprio_syscalls.get(platform.machine())
+    if libc is None or number is None:
+        raise OSError(errno.ENOSYS, os.strerror(errno.ENOSYS))
+
+    ioprio = (ioprio_classes[ioprio_class] << IOPRIO_CLASS_SHIFT) | level
+    ret = libc.syscall(ctypes.c_long(number),
+            ctypes.c_int(IOPRIO_WHO_PROCESS), ctypes.c_int(0),
+            ctypes.c_int(ioprio))
+    if ret != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+
+#------------------------------------------------------------------------
+def set_affinity(cpus):
+    '''
+    Binds the current process to the given CPUs with
+    sched_setaffinity(2). It raises an OSError on errors.
+
+    @param cpus: the numbers of the allowed CPUs
+    @type cpus:  list of int
+
+    @return: None
+    '''
+
+    if libc is None or not hasattr(libc, 'sched_setaffinity'):
+        raise OSError(errno.ENOSYS, os.strerror(errno.ENOSYS))
+
+    bits = ctypes.sizeof(ctypes.c_ulong) * 8
+    # at least the size of cpu_set_t of the C library (1024 CPUs)
+    words = max(1024, max(cpus) + 1 + bits - 1) // bits
+    mask = (ctypes.c_ulong * words)()
+    for cpu in cpus:
+        mask[cpu // bits] |= (1 << (cpu % bits))
+
+    ret = libc.sched_setaffinity(0, ctypes.sizeof(mask), ctypes.byref(mask))
+    if ret != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+
+#------------------------------------------------------------------------
+def apply_priority(nice = None, ioprio = None, affinity = None):
+    '''
+    Lowers the priority of the current process, e.g. of a worker,
+    by the given settings. All of them are inherited by the processes
+    started afterwards like external compress commands. Errors are
+    logged as warnings, the process goes on with its old settings.
+
+    @param nice:     the nice level or None
+    @type nice:      int or None
+    @param ioprio:   the I/O scheduling class and the priority inside
+                     the class or None
+    @type ioprio:    tuple of (str, int) or None
+    @param affinity: the numbers of the allowed CPUs or None
+    @type affinity:  list of int or None
+
+    @return: None
+    '''
+
+    t = gettext.translation('pylogrotate', None, fallback = True)
+    _ = t.lgettext
+    logger = logging.getLogger('pylogrotate.jobs')
+
+    settings = (
+        ('nice', set_nice, nice),
+        ('ioprio', set_ioprio, ioprio),
+        ('affinity', set_affinity, affinity),
+    )
+    for (name, function, value) in settings:
+        if value is None:
+            continue
+        args = (value, )
+        if name == 'ioprio':
+            args = value
+        try:
+            function(*args)
+        except OSError, e:
+            msg = (_("Could not set %(what)s of process %(pid)d " +
+                     "to %(value)r: %(err)s")
+                    % {'what': name, 'pid': os.getpid(), 'value': value,
+                       'err': e.strerror})
+            logger.warning(msg)
+
+#------------------------------------------------------------------------
+def _run_job(function, args, priority = None):
+    '''
+    Main function of a worker process. The process exits with
+    return value 1, if the function returns False or raises
+    an exception.
+    '''
+
+    if priority:
+        apply_priority(**priority)
+
+    try:
+        result = function(*args)
+    except Exception, e:
+        logging.getLogger('pylogrotate.jobs').error(str(e))
+        sys.exit(1)
+    if result is False:
+        sys.exit(1)
+    sys.exit(0)
+
+#========================================================================
+
+class LogRotateJobPoolError(Exception):
+    '''
+    Base class for exceptions in this module.
+    '''
+
+#========================================================================
+
+class LogRotateJobPool(object):
+    '''
+    Class for a bounded pool of worker processes. Every job is
+    performed in a forked process, not more than max_jobs of them
+    are running at the same time. Because of forking, the functions
+    and their arguments must not be pickled.
+
+    Jobs may belong to a group, e.g. the storage device of the files,
+    and the number of running jobs of a group may be limited further.
+    Submitted jobs wait in the order of submitting, until there is room
+    for them, but a job of a group at its limit doesn't hold up the jobs
+    of other groups.
+
+    @author: Frank Brehm
+    @contact: frank@brehm-online.com
+    '''
+
+    #-------------------------------------------------------
+    def __init__( self, max_jobs  = None,
+                        local_dir = None,
+                        verbose   = 0,
+                        nice      = None,
+                        ioprio    = None,
+                        affinity  = None,
+                        group_limit = None,
+    ):
+        '''
+        Constructor.
+
+        @param max_jobs:  maximum number of parallel running jobs,
+                          if None, the number of CPUs is used
+        @type max_jobs:   int or None
+        @param local_dir: The directory, where the i18n-files (*.mo)
+                          are located. If None, then system default
+                          (/usr/share/locale) is used.
+        @type local_dir:  str or None
+        @param verbose:   verbosity (debug) level
+        @type verbose:    int
+        @param nice:      nice level of the worker processes or None
+        @type nice:       int or None
+        @param ioprio:    I/O scheduling class and priority of the worker
+                          processes or None (see apply_priority())
+        @type ioprio:     tuple or None
+        @param affinity:  the CPUs, the worker processes are bound to,
+                          or None
+        @type affinity:   list of int or None
+        @param group_limit: function giving back the maximum number of
+                            running jobs of the given group or None for
+                            no limit, if None, groups aren't limited
+        @type group_limit:  callable or None
+
+        @return: None
+        '''
+
+        self.t = gettext.translation(
+            'pylogrotate',
+            local_dir,
+            fallback = True
+        )
+        '''
+        @ivar: a gettext translation object
+        @type: gettext.translation
+        '''
+
+        _ = self.t.lgettext
+
+        self.verbose = verbose
+        '''
+        @ivar: verbosity level (0 - 9)
+        @type: int
+        '''
+
+        self.logger = logging.getLogger('pylogrotate.jobs')
+        '''
+        @ivar: logger object
+        @type: logging.getLogger
+        '''
+
+        self.max_jobs = max_jobs
+        '''
+        @ivar: maximum number of parallel running jobs
+        @type: int
+        '''
+        if self.max_jobs is None:
+            self.max_jobs = default_jobs()
+        if self.max_jobs < 1:
+            msg = _("Invalid number of parallel jobs %d given.") % (max_jobs)
+            raise LogRotateJobPoolError(msg)
+
+        self.priority = {
+            'nice':     nice,
+            'ioprio':   ioprio,
+            'affinity': affinity,
+        }
+        '''
+        @ivar: settings of the priority of the worker processes,
+               given to apply_priority()
+        @type: dict
+        '''
+
+        self.group_limit = group_limit
+        '''
+        @ivar: function giving back the maximum number of running
+               jobs of a group
+        @type: callable or None
+        '''
+
+        self.running = {}
+        '''
+        @ivar: all currently running jobs, keys are the job names,
+               values are the multiprocessing.Process objects
+        @type: dict
+        '''
+
+        self.pending = deque()
+        '''
+        @ivar: all submitted, but not started jobs as tuples of
+               (name, function, args, group)
+        @type: deque
+        '''
+
+        self.groups = {}
+        '''
+        @ivar: the groups of all running jobs, keys are the job names
+        @type: dict
+        '''
+
+        self.submitted = {}
+        '''
+        @ivar: names of all jobs ever submitted
+        @type: dict
+        '''
+
+        self.failed = []
+        '''
+        @ivar: names of all failed jobs
+        @type: list
+        '''
+
+    #------------------------------------------------------------
+    def __str__(self):
+        '''
+        Typecasting function for translating object structure
+        into a string
+
+        @return: structure as string
+        @rtype:  str
+        '''
+
+        pp = pprint.PrettyPrinter(indent=4)
+        structure = self.as_dict()
+        return pp.pformat(structure)
+
+    #-------------------------------------------------------
+    def as_dict(self):
+        '''
+        Transforms the elements of the object into a dict
+
+        @return: structure as dict
+        @rtype:  dict
+        '''
+
+        res = {
+            'failed':    self.failed,
+            'logger':    self.logger,
+            'max_jobs':  self.max_jobs,
+            'pending':   [x[0] for x in self.pending],
+            'priority':  self.priority,
+            'running':   self.running.keys(),
+            'submitted': self.submitted.keys(),
+            't':         self.t,
+            'verbose':   self.verbose,
+        }
+
+        return res
+
+    #------------------------------------------------------------
+    def submit(self, name, function, *args, **kwargs):
+        '''
+        Enqueues the given function with its arguments as a new job
+        and starts it in a worker process, if there is room for it.
+        It never waits for running jobs, a queued job is started by
+        a later call of submit(), poll() or wait().
+
+        @param name:     the unique name of the job, e.g. a filename
+        @type name:      str
+        @param function: the function to call in the worker process,
+                         the job fails, if it returns False
+        @type function:  callable
+        @param group:    the group of the job as keyword argument,
+                         e.g. the device of the file, or None
+        @type group:     object
+
+        @return: None
+        '''
+
+        group = kwargs.get('group')
+
+        self.pending.append((name, function, args, group))
+        self.submitted[name] = True
+        self._reap()
+
+    #------------------------------------------------------------
+    def poll(self):
+        '''
+        Looks after finished jobs and starts queued jobs, if there
+        is room for them now, without waiting.
+
+        @return: number of finished jobs
+        @rtype:  int
+        '''
+
+        return self._reap()
+
+    #------------------------------------------------------------
+    def _group_full(self, group):
+        '''
+        @return: the given group has reached its limit of running jobs
+        @rtype:  bool
+        '''
+
+        if group is None or self.group_limit is None:
+            return False
+        limit = self.group_limit(group)
+        if limit is None:
+            return False
+        running = 0
+        for name in self.running.keys():
+            if self.groups.get(name) == group:
+                running += 1
+        return running >= limit
+
+    #------------------------------------------------------------
+    def _dispatch(self):
+        '''
+        Starts pending jobs in the order of submitting, as long as there
+        is room for them in the pool and in their groups.
+
+        @return: number of started jobs
+        @rtype:  int
+        '''
+
+        _ = self.t.lgettext
+
+        started = 0
+        waiting = deque()
+        while self.pending and len(self.running) < self.max_jobs:
+            job = self.pending.popleft()
+            (name, function, args, group) = job
+            if self._group_full(group):
+                waiting.append(job)
+                continue
+
+            if self.verbose > 2:
+                msg = _("Starting job '%s' ...") % (name)
+                self.logger.debug(msg)
+
+            proc = multiprocessing.Process(
+                    target = _run_job,
+                    args = (function, args, self.priority),
+                    name = name,
+            )
+            proc.start()
+            self.running[name] = proc
+            self.groups[name] = group
+            started += 1
+
+        waiting.extend(self.pending)
+        self.pending = waiting
+        return started
+
+    #------------------------------------------------------------
+    def _reap(self, block = False):
+        '''
+        Looks after finished jobs and removes them from self.running.
+
+        @param block: wait, until at least one job has finished
+        @type block:  bool
+
+        @return: number of finished jobs
+        @rtype:  int
+        '''
+
+        _ = self.t.lgettext
+
+        while True:
+            finished = 0
+            for name in self.running.keys():
+                proc = self.running[name]
+                if proc.is_alive():
+                    continue
+                proc.join()
+                del self.running[name]
+                del self.groups[name]
+                finished += 1
+                if proc.exitcode != 0:
+                    self.failed.append(name)
+                    msg = (_("Job '%(job)s' failed with exit code %(code)s.")
+                            % {'job': name, 'code': proc.exitcode})
+                    self.logger.error(msg)
+                elif self.verbose > 2:
+                    msg = _("Job '%s' finished.") % (name)
+                    self.logger.debug(msg)
+            self._dispatch()
+            if finished or not block or not self.running:
+                return finished
+            time.sleep(poll_interval)
+
+    #------------------------------------------------------------
+    def wait(self, names = None):
+        '''
+        Waits, until all running jobs or the given jobs are finished.
+
+        @param names: the names of the jobs to wait for, if None,
+                      it waits for all jobs
+        @type names:  list or None
+
+        @return: all jobs were successful
+        @rtype:  bool
+        '''
+
+        if names is None:
+            while self.running or self.pending:
+                self._reap(block = True)
+            return not self.failed
+
+        while True:
+            busy = [x for x in names if x in self.running]
+            busy += [x[0] for x in self.pending if x[0] in names]
+            if not busy:
+                break
+            self._reap(block = True)
+
+        return not self.failed
+
+#========================================================================
+
+if __name__ == "__main__":
+    pass
+
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
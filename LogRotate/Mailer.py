@@ -53,6 +53,8 @@ except ImportError:
 
 from LogRotate.Common import email_valid
 
+from LogRotate.Throttle import throttled
+
 revision = '$Revision$'
 revision = re.sub( r'\$', '', revision )
 revision = re.sub( r'Revision: ', r'r', revision )
@@ -673,7 +675,7 @@ class LogRotateMailer(object):
             ctype = mime_type
 
         maintype, subtype = ctype.split('/', 1)
-        fp = open(filename, 'rb')
+        fp = throttled(open(filename, 'rb'))
         mail_part = MIMEBase(maintype, subtype)
         mail_part.set_payload(fp.read())
         fp.close()
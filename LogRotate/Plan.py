@@ -0,0 +1,403 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: module for a rotation plan, which describes all actions
+          of a logrotate run and which can be saved and loaded as JSON
+'''
+
+# Standard modules
+import re
+import logging
+import pprint
+import gettext
+import os
+import os.path
+from datetime import datetime
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+# Third party modules
+
+# Own modules
+
+revision = '$Revision$'
+revision = re.sub( r'\$', '', revision )
+revision = re.sub( r'Revision: ', r'r', revision )
+revision = re.sub( r'\s*$', '', revision )
+
+__author__    = 'Frank Brehm'
+__copyright__ = '(C) 2011 by Frank Brehm, Berlin'
+__contact__    = 'frank@brehm-online.com'
+__version__    = '0.1.0 ' + revision
+__license__    = 'GPL3'
+
+#========================================================================
+# Module variables
+
+plan_format = 1
+'''
+@var: version of the format of a saved rotation plan
+@type: int
+'''
+
+#========================================================================
+
+def _to_str(value):
+    '''
+    Converts recursive all unicode objects, how they are returned
+    by json.load(), back into UTF-8 encoded str objects.
+    '''
+
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    if isinstance(value, list):
+        return [_to_str(x) for x in value]
+    if isinstance(value, dict):
+        res = {}
+        for key in value.keys():
+            res[_to_str(key)] = _to_str(value[key])
+        return res
+    return value
+
+#------------------------------------------------------------------------
+def locality_sorted(filenames):
+    '''
+    Sorts the given files for I/O locality, that means grouped by the
+    device of their directory, then by their directory and at last by
+    their name, so all operations on the same filesystem and the same
+    directory follow one after another.
+
+    @param filenames: the files to sort
+    @type filenames:  list
+
+    @return: the sorted files
+    @rtype:  list
+    '''
+
+    devices = {}
+
+    def _key(filename):
+        dirname = os.path.dirname(filename)
+        if not dirname in devices:
+            try:
+                devices[dirname] = os.stat(dirname).st_dev
+            except OSError:
+                devices[dirname] = -1
+        return (devices[dirname], dirname,
+                os.path.basename(filename).lower())
+
+    return sorted(filenames, key = _key)
+
+#------------------------------------------------------------------------
+def file_device(filename):
+    '''
+    Gives back the device of the directory of the given file, which is
+    the same for the file, its rotated and its compressed versions.
+
+    @param filename: the file to inspect
+    @type filename:  str
+
+    @return: the device number or None, if the directory doesn't exist
+    @rtype:  int or None
+    '''
+
+    try:
+        return os.stat(os.path.dirname(os.path.abspath(filename))).st_dev
+    except OSError:
+        return None
+
+#------------------------------------------------------------------------
+def is_rotational(device):
+    '''
+    Checks with the sysfs of Linux, whether the block device behind
+    the given device number is a spinning disk. For a partition the
+    queue of its disk is inspected.
+
+    @param device: the device number, e.g. st_dev of a stat object
+    @type device:  int
+
+    @return: rotational or not, None, if it is not a block device
+             (e.g. tmpfs, NFS or a subvolume of btrfs) or unknown
+    @rtype:  bool or None
+    '''
+
+    base = os.path.join(os.sep, 'sys', 'dev', 'block',
+            '%d:%d' % (os.major(device), os.minor(device)))
+    for path in (os.path.join(base, 'queue', 'rotational'),
+            os.path.join(base, '..', 'queue', 'rotational')):
+        try:
+            fh = open(path, 'r')
+            try:
+                value = fh.read().strip()
+            finally:
+                fh.close()
+        except IOError:
+            continue
+        return value == '1'
+    return None
+
+#========================================================================
+
+class LogRotatePlanError(Exception):
+    '''
+    Base class for exceptions in this module.
+    '''
+
+#========================================================================
+
+class LogRotatePlan(object):
+    '''
+    Class for a rotation plan. It contains for every logfile to rotate
+    a dict with all moves, the rotation itself and the old logfiles
+    to delete, to compress and to send after the rotation::
+
+        {
+            'logfile':    '/var/log/messages',
+            'desc_index': 0,
+            'olddir':     '.',
+            'method':     'move',
+            'rotations':  <result of LogrotateHandler._get_rotations()>,
+            'delete':     [ <old logfile>, ... ],
+            'compress':   [ <old logfile>, ... ],
+            'mail':       [ <old logfile>, ... ],
+            'keep':       { <old logfile>: [ <mtime>, <size> ], ... },
+        }
+
+    The optional 'keep' contains the old logfiles remaining after
+    the retention, which may be purged because of 'minfreespace'.
+
+    @author: Frank Brehm
+    @contact: frank@brehm-online.com
+    '''
+
+    #-------------------------------------------------------
+    def __init__( self, config_file = None,
+                        local_dir   = None,
+                        verbose     = 0,
+    ):
+        '''
+        Constructor.
+
+        @param config_file: the configuration file, the plan was
+                            computed from
+        @type config_file:  str or None
+        @param local_dir:   The directory, where the i18n-files (*.mo)
+                            are located. If None, then system default
+                            (/usr/share/locale) is used.
+        @type local_dir:    str or None
+        @param verbose:     verbosity (debug) level
+        @type verbose:      int
+
+        @return: None
+        '''
+
+        self.t = gettext.translation(
+            'pylogrotate',
+            local_dir,
+            fallback = True
+        )
+        '''
+        @ivar: a gettext translation object
+        @type: gettext.translation
+        '''
+
+        self.verbose = verbose
+        '''
+        @ivar: verbosity level (0 - 9)
+        @type: int
+        '''
+
+        self.logger = logging.getLogger('pylogrotate.plan')
+        '''
+        @ivar: logger object
+        @type: logging.getLogger
+        '''
+
+        self.config_file = None
+        '''
+        @ivar: the configuration file, the plan was computed from
+        @type: str or None
+        '''
+        if config_file is not None:
+            self.config_file = os.path.abspath(config_file)
+
+        self.created = datetime.now().isoformat(' ')
+        '''
+        @ivar: timestamp of computing the plan
+        @type: str
+        '''
+
+        self.rotations = []
+        '''
+        @ivar: all logfiles to rotate in the order of their rotation,
+               each of them as a dict described above
+        @type: list
+        '''
+
+    #------------------------------------------------------------
+    def __str__(self):
+        '''
+        Typecasting function for translating object structure
+        into a string
+
+        @return: structure as string
+        @rtype:  str
+        '''
+
+        pp = pprint.PrettyPrinter(indent=4)
+        structure = self.as_dict()
+        return pp.pformat(structure)
+
+    #-------------------------------------------------------
+    def as_dict(self):
+        '''
+        Transforms the elements of the object into a dict
+
+        @return: structure as dict
+        @rtype:  dict
+        '''
+
+        res = {
+            'config_file': self.config_file,
+            'created':     self.created,
+            'logger':      self.logger,
+            'rotations':   self.rotations,
+            't':           self.t,
+            'verbose':     self.verbose,
+        }
+
+        return res
+
+    #------------------------------------------------------------
+    def add_rotation(self, entry):
+        '''
+        Appends the rotation of a logfile to the plan.
+
+        @param entry: the rotation of a logfile as a dict
+                      like described in the class documentation
+        @type entry:  dict
+
+        @return: None
+        '''
+
+        self.rotations.append(entry)
+
+    #------------------------------------------------------------
+    def save(self, filename):
+        '''
+        Writes the plan as JSON into the given file.
+
+        It raises a LogRotatePlanError on errors.
+
+        @param filename: the file to write into
+        @type filename:  str
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        data = {
+            'format':      plan_format,
+            'config_file': self.config_file,
+            'created':     self.created,
+            'rotations':   self.rotations,
+        }
+
+        msg = _("Writing rotation plan into '%s' ...") % (filename)
+        self.logger.info(msg)
+
+        try:
+            fh = open(filename, 'w')
+            try:
+                json.dump(data, fh, indent = 4, sort_keys = True)
+                fh.write("\n")
+            finally:
+                fh.close()
+        except IOError, e:
+            msg = (_("Error on writing rotation plan '%(file)s': %(err)s")
+                    % {'file': filename, 'err': str(e)})
+            raise LogRotatePlanError(msg)
+
+    #------------------------------------------------------------
+    def load(self, filename):
+        '''
+        Reads a plan in JSON format from the given file. All existing
+        rotations are replaced.
+
+        It raises a LogRotatePlanError on errors.
+
+        @param filename: the file to read from
+        @type filename:  str
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        msg = _("Reading rotation plan from '%s' ...") % (filename)
+        self.logger.debug(msg)
+
+        try:
+            fh = open(filename, 'r')
+            try:
+                data = json.load(fh)
+            finally:
+                fh.close()
+        except IOError, e:
+            msg = (_("Error on reading rotation plan '%(file)s': %(err)s")
+                    % {'file': filename, 'err': str(e)})
+            raise LogRotatePlanError(msg)
+        except ValueError, e:
+            msg = (_("Invalid rotation plan '%(file)s': %(err)s")
+                    % {'file': filename, 'err': str(e)})
+            raise LogRotatePlanError(msg)
+
+        data = _to_str(data)
+        if (not isinstance(data, dict) or
+                data.get('format') != plan_format or
+                not isinstance(data.get('rotations'), list)):
+            msg = (_("Invalid rotation plan '%(file)s': %(err)s")
+                    % {'file': filename,
+                       'err': _("unsupported format")})
+            raise LogRotatePlanError(msg)
+
+        keys = ('logfile', 'desc_index', 'olddir', 'rotations',
+                'delete', 'compress', 'mail')
+        for entry in data['rotations']:
+            for key in keys:
+                if not key in entry:
+                    msg = (_("Invalid rotation plan '%(file)s': %(err)s")
+                            % {'file': filename,
+                               'err': (_("missing key '%s'") % (key))})
+                    raise LogRotatePlanError(msg)
+
+        self.config_file = data.get('config_file')
+        self.created = data.get('created')
+        self.rotations = data['rotations']
+
+        if self.verbose > 3:
+            msg = _("Loaded rotation plan:") + "\n" + str(self)
+            self.logger.debug(msg)
+
+#========================================================================
+
+if __name__ == "__main__":
+    pass
+
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
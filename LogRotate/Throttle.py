@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: module for a token bucket limiting the I/O bandwidth
+          of all processes of a logrotate run
+'''
+
+# Standard modules
+import re
+import pprint
+import time
+import multiprocessing
+
+# Third party modules
+
+# Own modules
+
+revision = '$Revision$'
+revision = re.sub( r'\$', '', revision )
+revision = re.sub( r'Revision: ', r'r', revision )
+revision = re.sub( r'\s*$', '', revision )
+
+__author__    = 'Frank Brehm'
+__copyright__ = '(C) 2011 by Frank Brehm, Berlin'
+__contact__    = 'frank@brehm-online.com'
+__version__    = '0.1.0 ' + revision
+__license__    = 'GPL3'
+
+#========================================================================
+# Module variables
+
+burst_seconds = 0.25
+'''
+@var: the size of the bucket as the amount of seconds of the bandwidth,
+      which may be consumed at once after an idle time
+@type: float
+'''
+
+throttle_chunk = (1024 * 1024)
+'''
+@var: maximum amount of bytes, which should be transferred with a single
+      syscall, if the bandwidth is limited (instead of max_chunk of
+      LogRotate.Copy)
+@type: int
+'''
+
+bucket = None
+'''
+@var: the token bucket of the current logrotate run, set by
+      set_bandwidth(), None means no limit
+@type: LogRotateTokenBucket or None
+'''
+
+#========================================================================
+
+def set_bandwidth(rate):
+    '''
+    Sets the maximum I/O bandwidth of the current logrotate run. It must
+    be called before starting any worker process, because the state of
+    the token bucket lives in shared memory inherited by forking.
+
+    @param rate: the maximum bandwidth in bytes per second,
+                 None or 0 means no limit
+    @type rate:  int or None
+
+    @return: None
+    '''
+
+    global bucket
+    if rate:
+        bucket = LogRotateTokenBucket(rate)
+    else:
+        bucket = None
+
+#------------------------------------------------------------------------
+def limited():
+    '''
+    @return: the bandwidth of the current run is limited
+    @rtype:  bool
+    '''
+
+    return bucket is not None
+
+#------------------------------------------------------------------------
+def consume(count):
+    '''
+    Draws the given amount of read or written bytes from the token bucket
+    of the current run and waits, if the bandwidth is exhausted.
+    Without a limit it returns immediately.
+
+    @param count: number of bytes
+    @type count:  int
+
+    @return: None
+    '''
+
+    if bucket is not None and count > 0:
+        bucket.consume(count)
+
+#------------------------------------------------------------------------
+def throttled(fileobj):
+    '''
+    Wraps the given file object by a ThrottledFile, if the bandwidth
+    is limited.
+
+    @param fileobj: the file object to wrap
+    @type fileobj:  file
+
+    @return: the wrapped or the original file object
+    @rtype:  ThrottledFile or file
+    '''
+
+    if bucket is None:
+        return fileobj
+    return ThrottledFile(fileobj)
+
+#========================================================================
+
+class LogRotateTokenBucket(object):
+    '''
+    Class for a token bucket shared by all processes forked after its
+    creation. Every process draws the amount of its read and written
+    bytes from it. A process may take more tokens than available, it
+    has to wait afterwards, until the debt is paid off by the rate, so
+    the average bandwidth never exceeds the rate, independent of the
+    size of the single requests.
+
+    @author: Frank Brehm
+    @contact: frank@brehm-online.com
+    '''
+
+    #-------------------------------------------------------
+    def __init__(self, rate, burst = None):
+        '''
+        Constructor.
+
+        @param rate:  the maximum bandwidth in bytes per second
+        @type rate:   int
+        @param burst: the size of the bucket in bytes, if None,
+                      burst_seconds of the rate are used
+        @type burst:  int or None
+
+        @return: None
+        '''
+
+        self.rate = float(rate)
+        '''
+        @ivar: the maximum bandwidth in bytes per second
+        @type: float
+        '''
+
+        self.burst = burst
+        '''
+        @ivar: the size of the bucket in bytes
+        @type: float
+        '''
+        if self.burst is None:
+            self.burst = self.rate * burst_seconds
+        self.burst = float(self.burst)
+
+        self.state = multiprocessing.RawArray('d', [self.burst, time.time()])
+        '''
+        @ivar: the available tokens and the time of the last refill
+               in shared memory
+        @type: multiprocessing.RawArray
+        '''
+
+        self.lock = multiprocessing.Lock()
+        '''
+        @ivar: lock for changing the state
+        @type: multiprocessing.Lock
+        '''
+
+    #------------------------------------------------------------
+    def __str__(self):
+        '''
+        Typecasting function for translating object structure
+        into a string
+
+        @return: structure as string
+        @rtype:  str
+        '''
+
+        pp = pprint.PrettyPrinter(indent=4)
+        structure = self.as_dict()
+        return pp.pformat(structure)
+
+    #-------------------------------------------------------
+    def as_dict(self):
+        '''
+        Transforms the elements of the object into a dict
+
+        @return: structure as dict
+        @rtype:  dict
+        '''
+
+        res = {
+            'burst':  self.burst,
+            'rate':   self.rate,
+            'tokens': self.state[0],
+        }
+
+        return res
+
+    #------------------------------------------------------------
+    def consume(self, count):
+        '''
+        Draws the given amount of bytes from the bucket and sleeps,
+        until the bucket isn't in debt anymore.
+
+        @param count: number of bytes
+        @type count:  int
+
+        @return: the time slept in seconds
+        @rtype:  float
+        '''
+
+        self.lock.acquire()
+        try:
+            now = time.time()
+            tokens = self.state[0]
+            elapsed = now - self.state[1]
+            if elapsed > 0:
+                tokens = min(self.burst, tokens + elapsed * self.rate)
+            tokens -= count
+            self.state[0] = tokens
+            self.state[1] = now
+        finally:
+            self.lock.release()
+
+        if tokens >= 0:
+            return 0.0
+        wait = -tokens / self.rate
+        time.sleep(wait)
+        return wait
+
+#========================================================================
+
+class ThrottledFile(object):
+    '''
+    Wrapper of a file object, which draws all read and written bytes
+    from the token bucket of the current run, e.g. for gzip.GzipFile
+    or tarfile.
+    '''
+
+    #-------------------------------------------------------
+    def __init__(self, fileobj):
+        '''
+        Constructor.
+
+        @param fileobj: the file object to wrap
+        @type fileobj:  file
+
+        @return: None
+        '''
+
+        self.fileobj = fileobj
+
+    #------------------------------------------------------------
+    def read(self, size = -1):
+        data = self.fileobj.read(size)
+        consume(len(data))
+        return data
+
+    #------------------------------------------------------------
+    def readline(self, size = -1):
+        data = self.fileobj.readline(size)
+        consume(len(data))
+        return data
+
+    #------------------------------------------------------------
+    def write(self, data):
+        consume(len(data))
+        return self.fileobj.write(data)
+
+    #------------------------------------------------------------
+    def flush(self):
+        return self.fileobj.flush()
+
+    #------------------------------------------------------------
+    def fileno(self):
+        return self.fileobj.fileno()
+
+    #------------------------------------------------------------
+    def close(self):
+        return self.fileobj.close()
+
+#========================================================================
+
+if __name__ == "__main__":
+    pass
+
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
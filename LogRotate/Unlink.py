@@ -0,0 +1,618 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: module for deleting many logfiles in batches per directory
+          with a small pool of threads
+'''
+
+# Standard modules
+import re
+import logging
+import pprint
+import gettext
+import time
+import os
+import os.path
+import stat
+import threading
+import Queue
+
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None
+
+# Third party modules
+
+# Own modules
+from LogRotate.Common import bytes2human
+
+from LogRotate.Throttle import consume
+
+revision = '$Revision$'
+revision = re.sub( r'\$', '', revision )
+revision = re.sub( r'Revision: ', r'r', revision )
+revision = re.sub( r'\s*$', '', revision )
+
+__author__    = 'Frank Brehm'
+__copyright__ = '(C) 2011 by Frank Brehm, Berlin'
+__contact__    = 'frank@brehm-online.com'
+__version__    = '0.1.0 ' + revision
+__license__    = 'GPL3'
+
+#========================================================================
+# Module variables
+
+default_delete_jobs = 4
+'''
+@var: default number of threads for deleting files, most of the time
+      they are waiting for the metadata operations of the filesystem
+      (especially on NFS), so they don't need a CPU each
+@type: int
+'''
+
+queue_size = 256
+'''
+@var: maximum number of queued files per thread, this limits the
+      number of open directories as well
+@type: int
+'''
+
+truncate_step = (1024 * 1024 * 1024)
+'''
+@var: default amount of bytes, by which a big file is shrunk at once
+      before deleting it
+@type: int
+'''
+
+truncate_pause = 0.1
+'''
+@var: default time in seconds to wait between shrinking steps
+@type: float
+'''
+
+libc = None
+'''
+@var: the C library for unlinkat(2)
+'''
+if ctypes is not None:
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno = True)
+        libc.unlinkat.restype = ctypes.c_int
+        libc.unlinkat.argtypes = [
+                ctypes.c_int, ctypes.c_char_p, ctypes.c_int ]
+    except (OSError, AttributeError):
+        libc = None
+
+#========================================================================
+
+def open_dir(directory):
+    '''
+    Opens the given directory for unlinking its entries with unlink_at().
+
+    @param directory: the directory to open
+    @type directory:  str
+
+    @return: the file descriptor of the directory or None, if unlinkat(2)
+             isn't available
+    @rtype:  int or None
+    '''
+
+    if libc is None:
+        return None
+    flags = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0)
+    return os.open(directory, flags)
+
+#------------------------------------------------------------------------
+def unlink_at(dir_fd, directory, name):
+    '''
+    Removes the given entry relative to the already opened directory,
+    so the path needn't be resolved again for every file.
+
+    @param dir_fd:    file descriptor of the directory from open_dir(),
+                      if None, the file is removed by its full path
+    @type dir_fd:     int or None
+    @param directory: path of the directory
+    @type directory:  str
+    @param name:      the basename of the file to remove
+    @type name:       str
+
+    @return: None
+    '''
+
+    if dir_fd is None:
+        os.remove(os.path.join(directory, name))
+        return
+
+    if libc.unlinkat(dir_fd, name, 0) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), os.path.join(directory, name))
+
+#------------------------------------------------------------------------
+def shrink_file(filename, step = truncate_step, pause = truncate_pause):
+    '''
+    Shrinks the given file by truncating it step by step from its end,
+    so the filesystem frees its extents in small portions instead of
+    all at once on unlinking, which stalls all other I/O on the volume
+    for seconds with a file of many gigabytes. Every freed step is drawn
+    from the token bucket of LogRotate.Throttle.
+
+    @param filename: the file to shrink
+    @type filename:  str
+    @param step:     the amount of bytes to free at once
+    @type step:      int
+    @param pause:    the time in seconds to wait after every step
+    @type pause:     float
+
+    @return: number of performed steps
+    @rtype:  int
+    '''
+
+    steps = 0
+    fd = os.open(filename, os.O_WRONLY | getattr(os, 'O_NOFOLLOW', 0))
+    try:
+        size = os.fstat(fd).st_size
+        while size > step:
+            size -= step
+            os.ftruncate(fd, size)
+            consume(step)
+            steps += 1
+            if pause > 0:
+                time.sleep(pause)
+    finally:
+        os.close(fd)
+
+    return steps
+
+#========================================================================
+
+class LogRotateUnlinkError(Exception):
+    '''
+    Base class for exceptions in this module.
+    '''
+
+#========================================================================
+
+class LogRotateDeleter(object):
+    '''
+    Class for deleting a lot of files. The files are grouped by their
+    directories, every directory is opened only once and its entries
+    are unlinked relative to the directory from a small pool of threads,
+    because on network filesystems a single unlink is dominated by
+    the latency of the server.
+
+    @author: Frank Brehm
+    @contact: frank@brehm-online.com
+    '''
+
+    #-------------------------------------------------------
+    def __init__( self, max_jobs  = None,
+                        test_mode = False,
+                        local_dir = None,
+                        verbose   = 0,
+                        truncate_threshold = None,
+                        truncate_step      = truncate_step,
+                        truncate_pause     = truncate_pause,
+    ):
+        '''
+        Constructor.
+
+        @param max_jobs:  number of threads deleting in parallel,
+                          if None, default_delete_jobs is used
+        @type max_jobs:   int or None
+        @param test_mode: test mode - no write actions are made
+        @type test_mode:  bool
+        @param local_dir: The directory, where the i18n-files (*.mo)
+                          are located. If None, then system default
+                          (/usr/share/locale) is used.
+        @type local_dir:  str or None
+        @param verbose:   verbosity (debug) level
+        @type verbose:    int
+        @param truncate_threshold: files bigger than this are shrunk
+                                   gradually before unlinking,
+                                   None means never
+        @type truncate_threshold:  int or None
+        @param truncate_step:      the amount of bytes to free at once
+                                   by shrinking
+        @type truncate_step:       int
+        @param truncate_pause:     the time in seconds to wait after
+                                   every shrinking step
+        @type truncate_pause:      float
+
+        @return: None
+        '''
+
+        self.t = gettext.translation(
+            'pylogrotate',
+            local_dir,
+            fallback = True
+        )
+        '''
+        @ivar: a gettext translation object
+        @type: gettext.translation
+        '''
+
+        _ = self.t.lgettext
+
+        self.verbose = verbose
+        '''
+        @ivar: verbosity level (0 - 9)
+        @type: int
+        '''
+
+        self.test = test_mode
+        '''
+        @ivar: test mode - no write actions are made
+        @type: bool
+        '''
+
+        self.logger = logging.getLogger('pylogrotate.delete')
+        '''
+        @ivar: logger object
+        @type: logging.getLogger
+        '''
+
+        self.max_jobs = max_jobs
+        '''
+        @ivar: number of threads deleting in parallel
+        @type: int
+        '''
+        if self.max_jobs is None:
+            self.max_jobs = default_delete_jobs
+        if self.max_jobs < 1:
+            msg = _("Invalid number of parallel jobs %d given.") % (max_jobs)
+            raise LogRotateUnlinkError(msg)
+
+        self.truncate_threshold = truncate_threshold
+        '''
+        @ivar: files bigger than this are shrunk gradually before
+               unlinking, None means never
+        @type: int or None
+        '''
+
+        self.truncate_step = truncate_step
+        '''
+        @ivar: the amount of bytes to free at once by shrinking
+        @type: int
+        '''
+
+        self.truncate_pause = truncate_pause
+        '''
+        @ivar: the time in seconds to wait after every shrinking step
+        @type: float
+        '''
+
+        self.lock = threading.Lock()
+        '''
+        @ivar: lock for the results and the counters of open directories
+        @type: threading.Lock
+        '''
+
+        self.deleted = {}
+        '''
+        @ivar: basenames of all deleted files, keys are the directories
+        @type: dict
+        '''
+
+        self.files = 0
+        '''
+        @ivar: number of deleted files
+        @type: int
+        '''
+
+        self.bytes = 0
+        '''
+        @ivar: sum of the sizes of all deleted files
+        @type: long
+        '''
+
+        self.errors = 0
+        '''
+        @ivar: number of files, which couldn't be deleted
+        @type: int
+        '''
+
+        self.duration = 0.0
+        '''
+        @ivar: time in seconds of the last call of delete()
+        @type: float
+        '''
+
+    #------------------------------------------------------------
+    def __str__(self):
+        '''
+        Typecasting function for translating object structure
+        into a string
+
+        @return: structure as string
+        @rtype:  str
+        '''
+
+        pp = pprint.PrettyPrinter(indent=4)
+        structure = self.as_dict()
+        return pp.pformat(structure)
+
+    #-------------------------------------------------------
+    def as_dict(self):
+        '''
+        Transforms the elements of the object into a dict
+
+        @return: structure as dict
+        @rtype:  dict
+        '''
+
+        res = {
+            'bytes':     self.bytes,
+            'deleted':   self.deleted,
+            'duration':  self.duration,
+            'errors':    self.errors,
+            'files':     self.files,
+            'logger':    self.logger,
+            'max_jobs':  self.max_jobs,
+            'test_mode': self.test,
+            'truncate_threshold': self.truncate_threshold,
+            'truncate_step':      self.truncate_step,
+            'truncate_pause':     self.truncate_pause,
+            'verbose':   self.verbose,
+        }
+
+        return res
+
+    #------------------------------------------------------------
+    def delete(self, files):
+        '''
+        Deletes the given files. The order of the files is kept for
+        the directories, so a list sorted by locality is processed
+        directory by directory.
+
+        @param files: the files to delete
+        @type files:  list
+
+        @return: basenames of all deleted files, keys are the directories
+        @rtype:  dict
+        '''
+
+        _ = self.t.lgettext
+
+        batches = {}
+        order = []
+        for filename in files:
+            directory = os.path.dirname(filename)
+            if not directory in batches:
+                batches[directory] = []
+                order.append(directory)
+            batches[directory].append(os.path.basename(filename))
+
+        start = time.time()
+
+        tasks = Queue.Queue(self.max_jobs * queue_size)
+        threads = []
+        for i in range(min(self.max_jobs, len(files))):
+            thread = threading.Thread(target = self._worker,
+                    args = (tasks, ), name = 'delete-%d' % (i))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        for directory in order:
+            names = batches[directory]
+            dir_fd = None
+            if not self.test:
+                try:
+                    dir_fd = open_dir(directory)
+                except OSError, e:
+                    if self.verbose > 1:
+                        msg = (_("Could not open directory '%(dir)s': " +
+                                 "%(err)s") % {'dir': directory,
+                                               'err': e.strerror})
+                        self.logger.debug(msg)
+            # [file descriptor, number of not finished entries]
+            batch = [dir_fd, len(names)]
+            if self.verbose > 2:
+                msg = (_("Deleting %(count)d files in '%(dir)s' ...")
+                        % {'count': len(names), 'dir': directory})
+                self.logger.debug(msg)
+            for name in names:
+                tasks.put((batch, directory, name))
+
+        for thread in threads:
+            tasks.put(None)
+        for thread in threads:
+            thread.join()
+
+        self.duration = time.time() - start
+        return self.deleted
+
+    #------------------------------------------------------------
+    def _worker(self, tasks):
+        '''
+        Thread function, which deletes the queued files until it gets
+        None from the queue.
+
+        @param tasks: the queue of the tuples (batch, directory, name)
+        @type tasks:  Queue.Queue
+
+        @return: None
+        '''
+
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            (batch, directory, name) = task
+            try:
+                self._delete_file(batch[0], directory, name)
+            finally:
+                self.lock.acquire()
+                try:
+                    batch[1] -= 1
+                    if batch[1] == 0 and batch[0] is not None:
+                        os.close(batch[0])
+                        batch[0] = None
+                finally:
+                    self.lock.release()
+
+    #------------------------------------------------------------
+    def _delete_file(self, dir_fd, directory, name):
+        '''
+        Deletes a single file and counts it.
+
+        @param dir_fd:    file descriptor of the directory or None
+        @type dir_fd:     int or None
+        @param directory: the directory of the file
+        @type directory:  str
+        @param name:      the basename of the file
+        @type name:       str
+
+        @return: success of deleting
+        @rtype:  bool
+        '''
+
+        _ = self.t.lgettext
+
+        filename = os.path.join(directory, name)
+        msg = _("Deleting file '%s' ...") % (filename)
+        self.logger.info(msg)
+
+        size = 0
+        try:
+            if self.test:
+                # the file may be created only by the rotation
+                if os.path.lexists(filename):
+                    size = os.lstat(filename).st_size
+            else:
+                file_stat = os.lstat(filename)
+                size = file_stat.st_size
+                if self._must_shrink(file_stat):
+                    self._shrink(filename, size)
+                unlink_at(dir_fd, directory, name)
+        except OSError, e:
+            msg = (_("Error on removing file '%(file)s': %(err)s")
+                    % {'file': filename, 'err': e.strerror})
+            self.logger.error(msg)
+            self.lock.acquire()
+            self.errors += 1
+            self.lock.release()
+            return False
+
+        self.lock.acquire()
+        try:
+            if not directory in self.deleted:
+                self.deleted[directory] = []
+            self.deleted[directory].append(name)
+            self.files += 1
+            self.bytes += size
+        finally:
+            self.lock.release()
+
+        return True
+
+    #------------------------------------------------------------
+    def _must_shrink(self, file_stat):
+        '''
+        Checks, whether a file has to be shrunk before unlinking. Files
+        with more than one hardlink are never touched, because their
+        content is still in use.
+
+        @param file_stat: the stat object of the file
+        @type file_stat:  posix.stat_result
+
+        @rtype: bool
+        '''
+
+        if self.truncate_threshold is None:
+            return False
+        if not stat.S_ISREG(file_stat.st_mode):
+            return False
+        if file_stat.st_nlink > 1:
+            return False
+        return file_stat.st_size > self.truncate_threshold
+
+    #------------------------------------------------------------
+    def _shrink(self, filename, size):
+        '''
+        Shrinks a big file gradually, errors are only logged, because
+        the file is unlinked afterwards in every case.
+
+        @param filename: the file to shrink
+        @type filename:  str
+        @param size:     the size of the file
+        @type size:      int
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        if self.verbose > 1:
+            msg = (_("Shrinking file '%(file)s' (%(size)s) gradually " +
+                     "by %(step)s ...")
+                    % {'file': filename, 'size': bytes2human(size),
+                       'step': bytes2human(self.truncate_step)})
+            self.logger.debug(msg)
+
+        start = time.time()
+        try:
+            steps = shrink_file(filename, self.truncate_step,
+                    self.truncate_pause)
+        except OSError, e:
+            msg = (_("Error on shrinking file '%(file)s': %(err)s")
+                    % {'file': filename, 'err': e.strerror})
+            self.logger.warning(msg)
+            return
+
+        if self.verbose > 2:
+            msg = (_("File '%(file)s' shrunk in %(steps)d steps " +
+                     "in %(time).2f s.")
+                    % {'file': filename, 'steps': steps,
+                       'time': time.time() - start})
+            self.logger.debug(msg)
+
+    #------------------------------------------------------------
+    def report(self):
+        '''
+        Logs the number of deleted files and bytes and the rate
+        of the last call of delete().
+
+        @return: None
+        '''
+
+        _ = self.t.lgettext
+
+        if not self.files and not self.errors:
+            return
+
+        duration = self.duration
+        if duration <= 0:
+            duration = 0.001
+
+        msg = (_("Deleted %(files)d files (%(size)s) in %(time).2f s: " +
+                 "%(fps).1f files/s, %(bps)s/s.")
+                % {'files': self.files, 'size': bytes2human(self.bytes),
+                   'time': self.duration, 'fps': self.files / duration,
+                   'bps': bytes2human(self.bytes / duration)})
+        self.logger.info(msg)
+
+        if self.errors:
+            msg = _("%d files could not be deleted.") % (self.errors)
+            self.logger.error(msg)
+
+#========================================================================
+
+if __name__ == "__main__":
+    pass
+
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: benchmark of the copy strategies of LogRotate.Copy
+
+Compares all copy strategies of the copy engine on tmpfs and on a
+loopback filesystem, e.g.::
+
+    # as root, to get a loopback filesystem with reflink support:
+    bench/copy_strategies.py --size 2GiB --loopback mkfs.btrfs
+
+    # without root, only on the given directories:
+    bench/copy_strategies.py --size 512MiB /dev/shm /var/tmp
+'''
+
+# Standard modules
+import os
+import os.path
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+from optparse import OptionParser
+
+# Own modules
+sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(sys.argv[0]), '..')))
+
+from LogRotate.Common import human2bytes, bytes2human
+from LogRotate.Copy import LogRotateCopier, LogRotateCopierError
+from LogRotate.Copy import copy_strategies
+
+#------------------------------------------------------------------------
+def create_testfile(filename, size):
+    '''
+    Creates a testfile with logfile like content of the given size.
+    '''
+
+    line = ('Oct 18 21:14:48 host app[4711]: some log message ' +
+            'with a little bit of variable content %08d\n')
+    block = ''.join([line % (i) for i in range(4096)])
+    f = open(filename, 'wb')
+    written = 0
+    while written < size:
+        chunk = block[:(size - written)]
+        f.write(chunk)
+        written += len(chunk)
+    f.close()
+
+#------------------------------------------------------------------------
+def bench_dir(directory, size, rounds):
+    '''
+    Runs all copy strategies (each on its own) and shutil.copy2()
+    in the given directory and prints the results.
+    '''
+
+    workdir = tempfile.mkdtemp(prefix = 'copybench.', dir = directory)
+    try:
+        source = os.path.join(workdir, 'source.log')
+        target = os.path.join(workdir, 'target.log')
+        create_testfile(source, size)
+
+        candidates = [(s, [s]) for s in copy_strategies]
+        candidates.append(('auto', None))
+        candidates.append(('shutil.copy2', 'shutil'))
+
+        print "%s (%s):" % (directory, bytes2human(size))
+        for (name, strategies) in candidates:
+            best = None
+            used = name
+            reason = 'not available'
+            for i in range(rounds):
+                if os.path.exists(target):
+                    os.remove(target)
+                subprocess.call(['sync'])
+                start = time.time()
+                if strategies == 'shutil':
+                    shutil.copy2(source, target)
+                else:
+                    copier = LogRotateCopier(strategies = strategies)
+                    try:
+                        used = copier.copy(source, target)
+                    except LogRotateCopierError, e:
+                        reason = 'not available: %s' % (str(e))
+                        used = None
+                        break
+                duration = time.time() - start
+                if best is None or duration < best:
+                    best = duration
+            if used is None or best is None:
+                print "    %-16s %s" % (name, reason)
+                continue
+            rate = 0
+            if best > 0:
+                rate = size / best
+            print ("    %-16s %8.3f s  %12s/s  (%s)"
+                    % (name, best, bytes2human(rate), used))
+        print ""
+    finally:
+        shutil.rmtree(workdir)
+
+#------------------------------------------------------------------------
+def setup_loopback(mkfs, size):
+    '''
+    Creates a loopback filesystem with the given mkfs command and
+    mounts it. Needs root permissions.
+
+    @return: (image file, mount point)
+    '''
+
+    image = tempfile.mktemp(prefix = 'copybench.', suffix = '.img')
+    mountpoint = tempfile.mkdtemp(prefix = 'copybench.mnt.')
+    f = open(image, 'wb')
+    f.truncate((size * 3) + (512 * 1024 * 1024))
+    f.close()
+    subprocess.check_call([mkfs, image], stdout = open(os.devnull, 'w'))
+    subprocess.check_call(['mount', '-o', 'loop', image, mountpoint])
+    return (image, mountpoint)
+
+#------------------------------------------------------------------------
+def main():
+
+    parser = OptionParser(usage = "%prog [options] [DIR ...]")
+    parser.add_option('--size', dest = 'size', default = '1GiB',
+            help = 'size of the test file (default: %default)')
+    parser.add_option('--rounds', dest = 'rounds', type = 'int', default = 3,
+            help = 'number of rounds per strategy, the best one counts')
+    parser.add_option('--loopback', dest = 'mkfs', metavar = 'MKFS',
+            help = 'create and mount a loopback filesystem with this ' +
+                   'mkfs command (e.g. mkfs.btrfs, mkfs.xfs, mkfs.ext4)')
+    (options, args) = parser.parse_args()
+
+    size = human2bytes(options.size, si_conform = False)
+
+    directories = list(args)
+    if not directories:
+        directories.append('/dev/shm')
+
+    loop = None
+    if options.mkfs:
+        loop = setup_loopback(options.mkfs, size)
+        directories.append(loop[1])
+
+    try:
+        for directory in directories:
+            bench_dir(directory, size, options.rounds)
+    finally:
+        if loop:
+            subprocess.call(['umount', loop[1]])
+            os.rmdir(loop[1])
+            os.remove(loop[0])
+
+#========================================================================
+
+if __name__ == "__main__":
+    main()
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
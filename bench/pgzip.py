@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: benchmark of the block-parallel gzip compressor
+
+Compares the compressors internal_gzip and internal_pgzip with different
+numbers of jobs and the external pigz (if found) on one big file, e.g.::
+
+    bench/pgzip.py --size 1GiB --jobs 1,2,4,8 /var/tmp
+'''
+
+# Standard modules
+import os
+import os.path
+import sys
+import time
+import gzip
+import shutil
+import tempfile
+import subprocess
+from optparse import OptionParser
+
+# Own modules
+sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(sys.argv[0]), '..')))
+
+from LogRotate.Common import human2bytes, bytes2human
+from LogRotate.Copy import iter_chunks
+from LogRotate.Compress import pgzip_file
+
+#------------------------------------------------------------------------
+def create_testfile(filename, size):
+    '''
+    Creates a testfile with logfile like content of the given size.
+    '''
+
+    line = ('Oct 18 21:14:48 host app[4711]: some log message ' +
+            'with a little bit of variable content %08d\n')
+    f = open(filename, 'wb')
+    written = 0
+    i = 0
+    while written < size:
+        block = ''.join([line % (j) for j in range(i, i + 4096)])
+        i += 4096
+        chunk = block[:(size - written)]
+        f.write(chunk)
+        written += len(chunk)
+    f.close()
+
+#------------------------------------------------------------------------
+def find_command(name):
+    '''
+    Searches the given command in $PATH.
+
+    @return: the absolute path of the command or None
+    '''
+
+    for search_dir in os.environ.get('PATH', '').split(os.pathsep):
+        cmd = os.path.join(search_dir, name)
+        if os.path.isfile(cmd) and os.access(cmd, os.X_OK):
+            return cmd
+    return None
+
+#------------------------------------------------------------------------
+def run_gzip(source, target):
+    f_in = open(source, 'rb')
+    f_out = gzip.open(target, 'wb')
+    for chunk in iter_chunks(f_in.fileno(), 4 * 1024 * 1024):
+        f_out.write(chunk)
+    f_out.close()
+    f_in.close()
+
+#------------------------------------------------------------------------
+def run_pgzip(source, target, jobs):
+    f_out = open(target, 'wb')
+    pgzip_file(source, f_out, jobs = jobs)
+    f_out.close()
+
+#------------------------------------------------------------------------
+def run_pigz(pigz, source, target, jobs):
+    f_out = open(target, 'wb')
+    subprocess.check_call([pigz, '-9', '-c', '-p', str(jobs), source],
+            stdout = f_out)
+    f_out.close()
+
+#------------------------------------------------------------------------
+def check_target(source, target):
+    '''
+    Checks with zcat, whether the target decompresses to the source.
+    '''
+
+    f_in = open(source, 'rb')
+    proc = subprocess.Popen(['zcat', target], stdout = subprocess.PIPE)
+    ok = True
+    while True:
+        expected = f_in.read(1024 * 1024)
+        got = proc.stdout.read(len(expected) or 1)
+        if expected != got:
+            ok = False
+            break
+        if not expected:
+            break
+    proc.stdout.close()
+    proc.wait()
+    f_in.close()
+    return ok and proc.returncode == 0
+
+#------------------------------------------------------------------------
+def main():
+
+    parser = OptionParser(usage = "%prog [options] [DIR]")
+    parser.add_option('--size', dest = 'size', default = '512MiB',
+            help = 'size of the test file (default: %default)')
+    parser.add_option('--jobs', dest = 'jobs', default = None,
+            help = 'comma separated list of job numbers ' +
+                   '(default: 1, 2, 4 ... up to the number of CPUs)')
+    (options, args) = parser.parse_args()
+
+    size = human2bytes(options.size, si_conform = False)
+
+    directory = '/var/tmp'
+    if args:
+        directory = args[0]
+
+    if options.jobs:
+        job_list = [int(x) for x in options.jobs.split(',')]
+    else:
+        import multiprocessing
+        cpus = multiprocessing.cpu_count()
+        job_list = []
+        jobs = 1
+        while jobs < cpus:
+            job_list.append(jobs)
+            jobs *= 2
+        job_list.append(cpus)
+
+    pigz = find_command('pigz')
+
+    candidates = [('internal_gzip', run_gzip, ())]
+    for jobs in job_list:
+        candidates.append(('internal_pgzip -j%d' % (jobs),
+                run_pgzip, (jobs, )))
+    if pigz:
+        for jobs in job_list:
+            candidates.append(('pigz -p%d' % (jobs),
+                    lambda s, t, j: run_pigz(pigz, s, t, j), (jobs, )))
+
+    workdir = tempfile.mkdtemp(prefix = 'pgzipbench.', dir = directory)
+    try:
+        source = os.path.join(workdir, 'source.log')
+        target = os.path.join(workdir, 'source.log.gz')
+        create_testfile(source, size)
+
+        print "%s (%s):" % (directory, bytes2human(size))
+        if not pigz:
+            print "    pigz not found, skipped."
+        for (name, function, args) in candidates:
+            start = time.time()
+            function(source, target, *args)
+            duration = time.time() - start
+            rate = 0
+            if duration > 0:
+                rate = size / duration
+            ratio = float(os.path.getsize(target)) / size * 100
+            state = 'ok'
+            if not check_target(source, target):
+                state = 'CORRUPT'
+            print ("    %-20s %8.3f s  %12s/s  %5.1f %%  %s"
+                    % (name, duration, bytes2human(rate), ratio, state))
+            os.remove(target)
+    finally:
+        shutil.rmtree(workdir)
+
+#========================================================================
+
+if __name__ == "__main__":
+    main()
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
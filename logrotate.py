@@ -127,6 +127,7 @@ def main():
             state_file   = opt_parser.options.statefile,
             pid_file     = opt_parser.options.pidfile,
             mail_cmd     = opt_parser.options.mailcmd,
+            compress_jobs = opt_parser.options.compressjobs,
             local_dir    = local_dir,
             version      = __version__,
         )
@@ -140,6 +141,17 @@ def main():
     if opt_parser.options.configcheck:
         sys.exit(0)
 
+    try:
+        if opt_parser.options.planout:
+            lr_handler.save_plan(opt_parser.options.planout)
+            lr_handler = None
+            sys.exit(0)
+        if opt_parser.options.planin:
+            lr_handler.load_plan(opt_parser.options.planin)
+    except LogrotateHandlerError, e:
+        sys.stderr.write(str(e) + "\n")
+        sys.exit(9)
+
     print ""
     if verbose_level > 0:
         print sep_line + "\n"
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: tests of the module LogRotate.Compress
+'''
+
+import os
+import os.path
+import sys
+import bz2
+import gzip
+import zlib
+import shutil
+import hashlib
+import tarfile
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..')))
+
+import LogRotate.Compress
+from LogRotate.Compress import compressors
+from LogRotate.Compress import pgzip_file
+from LogRotate.Compress import iter_line_blocks
+from LogRotate.Compress import sample_ratio
+from LogRotate.Compress import bundle_format
+from LogRotate.Compress import write_bundle
+from LogRotate.Digest import DigestSet
+
+lzma = LogRotate.Compress.lzma
+zstandard = LogRotate.Compress.zstandard
+
+#========================================================================
+
+class PgzipFileTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_compress.')
+        self.source = os.path.join(self.workdir, 'messages')
+        self.target = self.source + '.gz'
+        self.content = ''.join(['line %d of the logfile\n' % (i)
+                for i in range(10000)])
+        f = open(self.source, 'wb')
+        f.write(self.content)
+        f.close()
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def _compress(self, jobs, block_size):
+        f_out = open(self.target, 'wb')
+        try:
+            blocks = pgzip_file(self.source, f_out, jobs = jobs,
+                    block_size = block_size)
+        finally:
+            f_out.close()
+        f = gzip.open(self.target, 'rb')
+        try:
+            return (blocks, f.read())
+        finally:
+            f.close()
+
+    #------------------------------------------------------------
+    def test_one_job(self):
+        (blocks, data) = self._compress(1, 64 * 1024)
+        self.assertTrue(blocks > 1)
+        self.assertEqual(data, self.content)
+
+    #------------------------------------------------------------
+    def test_parallel_jobs(self):
+        (blocks, data) = self._compress(2, 64 * 1024)
+        self.assertTrue(blocks > 1)
+        self.assertEqual(data, self.content)
+
+    #------------------------------------------------------------
+    def test_empty_file(self):
+        open(self.source, 'wb').close()
+        self.content = ''
+        (blocks, data) = self._compress(2, 64 * 1024)
+        self.assertEqual(blocks, 1)
+        self.assertEqual(data, '')
+
+#========================================================================
+
+class CompressorTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_compress.')
+        self.source = os.path.join(self.workdir, 'messages')
+        self.content = ''.join(['line %d of the logfile\n' % (i)
+                for i in range(20000)])
+        f = open(self.source, 'wb')
+        f.write(self.content)
+        f.close()
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def _compress(self, name, level = None):
+        compressor = compressors[name]
+        target = self.source + compressor['extension']
+        digests = DigestSet(['sha256'])
+        compressor['function'](self.source, target, level, 64 * 1024,
+                input_digests = digests)
+        self.assertEqual(digests.hexdigests()['sha256'],
+                hashlib.sha256(self.content).hexdigest())
+        return open(target, 'rb').read()
+
+    #------------------------------------------------------------
+    def test_gzip_levels(self):
+        fast = self._compress('internal_gzip', 1)
+        best = self._compress('internal_gzip', 9)
+        self.assertTrue(len(best) < len(fast))
+        for data in (fast, best):
+            self.assertEqual(zlib.decompress(data, 16 + zlib.MAX_WBITS),
+                    self.content)
+
+    #------------------------------------------------------------
+    def test_bzip2(self):
+        for level in (None, 1):
+            data = self._compress('internal_bzip2', level)
+            self.assertEqual(bz2.decompress(data), self.content)
+
+    #------------------------------------------------------------
+    @unittest.skipIf(lzma is None, 'module lzma not available')
+    def test_xz(self):
+        for level in (None, 1):
+            data = self._compress('internal_xz', level)
+            self.assertEqual(lzma.decompress(data), self.content)
+
+    #------------------------------------------------------------
+    @unittest.skipIf(zstandard is None, 'module zstandard not available')
+    def test_zstd(self):
+        for level in (None, 1, 19):
+            data = self._compress('internal_zstd', level)
+            decompressor = zstandard.ZstdDecompressor()
+            self.assertEqual(decompressor.decompress(data), self.content)
+
+#========================================================================
+
+class BundleTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_compress.')
+        self.files = {}
+        os.mkdir(os.path.join(self.workdir, 'old'))
+        for name in ('app.log.0', 'web.log.0', os.path.join('old', 'x.1')):
+            filename = os.path.join(self.workdir, name)
+            self.files[name] = 'line of %s\n' % (name) * 1000
+            f = open(filename, 'wb')
+            f.write(self.files[name])
+            f.close()
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def _round_trip(self, compression):
+        target = os.path.join(self.workdir, 'logs.tar.' + compression)
+        files = [os.path.join(self.workdir, x) for x in self.files.keys()]
+        write_bundle(target, files, self.workdir, compression)
+
+        tar = tarfile.open(target, 'r:' + compression)
+        try:
+            content = {}
+            for tarinfo in tar.getmembers():
+                content[tarinfo.name] = tar.extractfile(tarinfo).read()
+        finally:
+            tar.close()
+        self.assertEqual(content, self.files)
+
+    #------------------------------------------------------------
+    def test_gzip(self):
+        self._round_trip('gz')
+
+    #------------------------------------------------------------
+    def test_bzip2(self):
+        self._round_trip('bz2')
+
+    #------------------------------------------------------------
+    def test_bundle_format(self):
+        self.assertEqual(bundle_format(None), 'gz')
+        self.assertEqual(bundle_format('internal_gzip'), 'gz')
+        self.assertEqual(bundle_format('internal_bzip2'), 'bz2')
+        self.assertEqual(bundle_format('/usr/bin/bzip2'), 'bz2')
+
+#========================================================================
+
+class SampleRatioTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_compress.')
+        self.filename = os.path.join(self.workdir, 'messages')
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def _ratio(self, content):
+        f = open(self.filename, 'wb')
+        f.write(content)
+        f.close()
+        return sample_ratio(self.filename)
+
+    #------------------------------------------------------------
+    def test_text(self):
+        content = ''.join(['line %d of the logfile\n' % (i)
+                for i in range(100000)])
+        self.assertTrue(self._ratio(content) < 0.5)
+
+    #------------------------------------------------------------
+    def test_random_data(self):
+        self.assertTrue(self._ratio(os.urandom(1024 * 1024)) > 0.95)
+
+    #------------------------------------------------------------
+    def test_compressed_tail(self):
+        # the chunks are spread over the whole file
+        text = 'line of the logfile\n' * 50000
+        ratio = self._ratio(text + os.urandom(len(text)))
+        self.assertTrue(ratio > 0.3 and ratio < 0.7)
+
+    #------------------------------------------------------------
+    def test_empty_file(self):
+        self.assertEqual(self._ratio(''), None)
+
+#========================================================================
+
+class IterLineBlocksTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_compress.')
+        self.filename = os.path.join(self.workdir, 'messages')
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def _blocks(self, content, block_size):
+        f = open(self.filename, 'wb')
+        f.write(content)
+        f.close()
+        f = open(self.filename, 'rb')
+        try:
+            return list(iter_line_blocks(f.fileno(), block_size))
+        finally:
+            f.close()
+
+    #------------------------------------------------------------
+    def test_complete_lines(self):
+        content = ''.join(['line %d\n' % (i) for i in range(1000)])
+        blocks = self._blocks(content, 100)
+        self.assertEqual(''.join(blocks), content)
+        for block in blocks:
+            self.assertTrue(len(block) >= 100 or block is blocks[-1])
+            self.assertTrue(block.endswith('\n'))
+
+    #------------------------------------------------------------
+    def test_long_line_is_split(self):
+        content = 'x' * 1000 + '\n'
+        blocks = self._blocks(content, 100)
+        self.assertEqual(''.join(blocks), content)
+        for block in blocks:
+            self.assertTrue(len(block) <= 200)
+
+    #------------------------------------------------------------
+    def test_sparse_file(self):
+        f = open(self.filename, 'wb')
+        f.seek(1024 * 1024)
+        f.write('line\n')
+        f.close()
+        f = open(self.filename, 'rb')
+        try:
+            blocks = list(iter_line_blocks(f.fileno(), 64 * 1024))
+        finally:
+            f.close()
+        self.assertEqual(''.join(blocks), '\0' * (1024 * 1024) + 'line\n')
+
+#========================================================================
+
+if __name__ == "__main__":
+    unittest.main()
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: tests of the module LogRotate.Config
+'''
+
+import os
+import os.path
+import sys
+import logging
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..')))
+
+from LogRotate.Config import LogrotateConfigurationReader
+
+logging.getLogger('pylogrotate').addHandler(logging.NullHandler())
+
+#========================================================================
+
+class CompressLevelTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_config.')
+        self.logfile = os.path.join(self.workdir, 'messages')
+        open(self.logfile, 'w').close()
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def _level(self, command, level):
+        config_file = os.path.join(self.workdir, 'logrotate.conf')
+        f = open(config_file, 'w')
+        f.write("%s {\n" % (self.logfile))
+        f.write("    compress\n")
+        f.write("    compresscmd %s\n" % (command))
+        f.write("    compresslevel %d\n" % (level))
+        f.write("}\n")
+        f.close()
+        reader = LogrotateConfigurationReader(config_file)
+        config = reader.get_config()
+        self.assertEqual(len(config), 1)
+        return config[0]['compresslevel']
+
+    #------------------------------------------------------------
+    def test_gzip_levels(self):
+        self.assertEqual(self._level('internal_gzip', 1), 1)
+        self.assertEqual(self._level('internal_gzip', 9), 9)
+        self.assertEqual(self._level('internal_gzip', 12), None)
+
+    #------------------------------------------------------------
+    def test_zstd_levels(self):
+        self.assertEqual(self._level('internal_zstd', 19), 19)
+        self.assertEqual(self._level('internal_zstd', 22), 22)
+        self.assertEqual(self._level('internal_zstd', 23), None)
+
+    #------------------------------------------------------------
+    def test_default_level(self):
+        self.assertEqual(self._level('internal_gzip', 0), None)
+
+#========================================================================
+
+class CachePolicyTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_config.')
+        self.logfile = os.path.join(self.workdir, 'messages')
+        open(self.logfile, 'w').close()
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def _policy(self, option):
+        config_file = os.path.join(self.workdir, 'logrotate.conf')
+        f = open(config_file, 'w')
+        f.write("%s {\n" % (self.logfile))
+        f.write(option)
+        f.write("}\n")
+        f.close()
+        reader = LogrotateConfigurationReader(config_file)
+        config = reader.get_config()
+        self.assertEqual(len(config), 1)
+        return config[0]['cachepolicy']
+
+    #------------------------------------------------------------
+    def test_default(self):
+        self.assertEqual(self._policy(''), 'keep')
+
+    #------------------------------------------------------------
+    def test_valid(self):
+        self.assertEqual(self._policy("    cachepolicy dontneed\n"),
+                'dontneed')
+        self.assertEqual(self._policy("    cachepolicy Sequential\n"),
+                'sequential')
+
+    #------------------------------------------------------------
+    def test_invalid(self):
+        self.assertEqual(self._policy("    cachepolicy never\n"), 'keep')
+
+#========================================================================
+
+if __name__ == "__main__":
+    unittest.main()
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
@@ -0,0 +1,430 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: tests of the module LogRotate.Copy
+'''
+
+import os
+import os.path
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..')))
+
+from LogRotate.Copy import first_data_offset
+from LogRotate.Copy import catchup_max_rounds
+from LogRotate.Copy import copy_strategies
+from LogRotate.Copy import is_sparse
+from LogRotate.Copy import data_extents
+from LogRotate.Copy import iter_chunks
+from LogRotate.Copy import cache_policies
+from LogRotate.Copy import advise_read
+from LogRotate.Copy import drop_cache
+from LogRotate.Copy import LogRotateCopier
+from LogRotate.Copy import LogRotateCopierError
+
+#========================================================================
+
+class FirstDataOffsetTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_copy.')
+        self.filename = os.path.join(self.workdir, 'wtmp')
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def _offset(self):
+        fd = os.open(self.filename, os.O_RDONLY)
+        try:
+            return first_data_offset(fd)
+        finally:
+            os.close(fd)
+
+    #------------------------------------------------------------
+    def test_leading_zero_bytes(self):
+        # records of wtmp start with zero bytes, they are data
+        f = open(self.filename, 'wb')
+        f.write('\0' * 100 + 'record')
+        f.close()
+        self.assertEqual(self._offset(), 0)
+
+    #------------------------------------------------------------
+    def test_hole_before_zero_bytes(self):
+        f = open(self.filename, 'wb')
+        f.seek(1024 * 1024)
+        f.write('\0\0record')
+        f.close()
+        offset = self._offset()
+        self.assertTrue(offset <= 1024 * 1024)
+        f = open(self.filename, 'rb')
+        f.seek(offset)
+        self.assertTrue(f.read().endswith('\0\0record'))
+        f.close()
+
+    #------------------------------------------------------------
+    def test_empty_file(self):
+        open(self.filename, 'wb').close()
+        self.assertEqual(self._offset(), 0)
+
+#========================================================================
+
+class CopyTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_copy.')
+        self.source = os.path.join(self.workdir, 'app.log')
+        self.target = os.path.join(self.workdir, 'app.log.1')
+        self.content = ''.join(
+                ['line %d of the logfile\n' % (i) for i in range(50000)])
+        f = open(self.source, 'wb')
+        f.write(self.content)
+        f.close()
+        os.utime(self.source, (1000000, 2000000))
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def test_strategies(self):
+        # every strategy hands over to the next one, if it isn't usable
+        for strategy in copy_strategies:
+            copier = LogRotateCopier(strategies = [strategy, 'userspace'],
+                    buffer_size = 4096)
+            used = copier.copy(self.source, self.target)
+            self.assertTrue(used.split('+')[0] in (strategy, 'userspace'))
+            self.assertEqual(open(self.target, 'rb').read(), self.content)
+            self.assertEqual(os.stat(self.target).st_mtime, 2000000)
+            os.remove(self.target)
+
+    #------------------------------------------------------------
+    def test_copy_data_count(self):
+        copier = LogRotateCopier()
+        f_in = open(self.source, 'rb')
+        f_out = open(self.target, 'wb')
+        try:
+            os.lseek(f_in.fileno(), 100, os.SEEK_SET)
+            (strategy, copied) = copier.copy_data(
+                    f_in.fileno(), f_out.fileno(), 1000)
+            self.assertEqual(copied, 1000)
+            self.assertEqual(os.lseek(f_in.fileno(), 0, os.SEEK_CUR), 1100)
+        finally:
+            f_out.close()
+            f_in.close()
+        self.assertEqual(open(self.target, 'rb').read(),
+                self.content[100:1100])
+
+    #------------------------------------------------------------
+    def test_invalid_strategy(self):
+        self.assertRaises(LogRotateCopierError, LogRotateCopier,
+                strategies = ['rsync'])
+
+#========================================================================
+
+class SparseTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_copy.')
+        self.source = os.path.join(self.workdir, 'lastlog')
+        self.target = os.path.join(self.workdir, 'lastlog.1')
+        self.hole = 4 * 1024 * 1024
+        self.data = 'x' * 8192
+
+        # data, a hole, data and a trailing hole
+        f = open(self.source, 'wb')
+        f.write(self.data)
+        f.seek(self.hole, os.SEEK_CUR)
+        f.write(self.data)
+        f.truncate(2 * len(self.data) + 2 * self.hole)
+        f.close()
+        self.content = (self.data + '\0' * self.hole +
+                self.data + '\0' * self.hole)
+
+        f = open(self.source, 'rb')
+        sparse = is_sparse(f.fileno())
+        f.close()
+        if not sparse:
+            self.skipTest("The filesystem doesn't support sparse files.")
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def test_data_extents(self):
+        f = open(self.source, 'rb')
+        try:
+            extents = list(data_extents(f.fileno()))
+        finally:
+            f.close()
+        size = len(self.data)
+        self.assertEqual(extents, [(0, size),
+                (size + self.hole, 2 * size + self.hole)])
+
+    #------------------------------------------------------------
+    def test_copy_keeps_holes(self):
+        copier = LogRotateCopier()
+        used = copier.copy(self.source, self.target)
+        self.assertTrue(used.split('+')[0] in ('reflink', 'sparse'))
+        self.assertEqual(open(self.target, 'rb').read(), self.content)
+        statinfo = os.stat(self.target)
+        self.assertEqual(statinfo.st_size, len(self.content))
+        self.assertTrue(statinfo.st_blocks * 512 < self.hole)
+
+    #------------------------------------------------------------
+    def test_iter_chunks(self):
+        f = open(self.source, 'rb')
+        try:
+            chunks = list(iter_chunks(f.fileno(), 64 * 1024))
+        finally:
+            f.close()
+        self.assertEqual(''.join(chunks), self.content)
+        self.assertEqual(max([len(x) for x in chunks]), 64 * 1024)
+
+#========================================================================
+
+class CachePolicyTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_copy.')
+        self.source = os.path.join(self.workdir, 'app.log')
+        self.target = os.path.join(self.workdir, 'app.log.1')
+        self.content = 'line of the logfile\n' * 10000
+        f = open(self.source, 'wb')
+        f.write(self.content)
+        f.close()
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def test_copy(self):
+        copier = LogRotateCopier()
+        for cache_policy in cache_policies:
+            copier.copy(self.source, self.target,
+                    cache_policy = cache_policy)
+            self.assertEqual(open(self.target, 'rb').read(), self.content)
+            os.remove(self.target)
+
+    #------------------------------------------------------------
+    def test_iter_chunks(self):
+        for cache_policy in cache_policies:
+            f = open(self.source, 'rb')
+            try:
+                chunks = list(iter_chunks(f.fileno(), 4096, cache_policy))
+            finally:
+                f.close()
+            self.assertEqual(''.join(chunks), self.content)
+
+    #------------------------------------------------------------
+    def test_hints(self):
+        # the hints never fail, even without posix_fadvise(2)
+        fd = os.open(self.source, os.O_RDWR)
+        try:
+            for cache_policy in cache_policies:
+                advise_read(fd, cache_policy)
+            os.write(fd, 'x')
+            drop_cache(fd, written = True)
+            drop_cache(fd)
+        finally:
+            os.close(fd)
+        self.assertEqual(open(self.source, 'rb').read(),
+                'x' + self.content[1:])
+
+#========================================================================
+
+class MigrateTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_copy.')
+        self.source = os.path.join(self.workdir, '.app.log.1.migrating')
+        self.target = os.path.join(self.workdir, 'app.log.1')
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def test_migrate(self):
+        content = 'line of the logfile\n' * 1000
+        f = open(self.source, 'wb')
+        f.write(content)
+        f.close()
+        os.chmod(self.source, 0640)
+        os.utime(self.source, (1000000, 2000000))
+
+        copier = LogRotateCopier()
+        copier.migrate(self.source, self.target)
+
+        self.assertFalse(os.path.exists(self.source))
+        self.assertEqual(open(self.target, 'rb').read(), content)
+        statinfo = os.stat(self.target)
+        self.assertEqual(statinfo.st_mode & 0777, 0640)
+        self.assertEqual(statinfo.st_mtime, 2000000)
+
+    #------------------------------------------------------------
+    def test_missing_source(self):
+        copier = LogRotateCopier()
+        self.assertRaises(LogRotateCopierError, copier.migrate,
+                self.source, self.target)
+        self.assertFalse(os.path.exists(self.target))
+
+#========================================================================
+
+class CopyInplaceTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_copy.')
+        self.source = os.path.join(self.workdir, 'wtmp')
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def test_no_data_lost(self):
+        # zero bytes at the borders of the copied blocks must survive
+        record = '\0' * 300 + 'user pts/0' + '\0' * 74
+        content = record * 100
+        f = open(self.source, 'wb')
+        f.write(content)
+        f.close()
+
+        copier = LogRotateCopier()
+        rotated = ''
+        for i in range(2):
+            target = os.path.join(self.workdir, 'wtmp.%d' % (i))
+            copier.copy_inplace(self.source, target, 'punchhole')
+            rotated += open(target, 'rb').read()
+
+        f = open(self.source, 'rb')
+        fd = f.fileno()
+        os.lseek(fd, first_data_offset(fd), os.SEEK_SET)
+        rest = os.read(fd, len(content))
+        f.close()
+
+        self.assertEqual(rotated + rest, content)
+
+#========================================================================
+
+class WritingCopier(LogRotateCopier):
+    '''
+    Copier, which simulates a writer by appending to the source after
+    every copy, the sizes of the appended data are taken from appends.
+    '''
+
+    #------------------------------------------------------------
+    def __init__(self, source, appends):
+        LogRotateCopier.__init__(self)
+        self.source = source
+        self.appends = list(appends)
+        self.calls = 0
+        self.written = ''
+
+    #------------------------------------------------------------
+    def copy_data(self, fd_in, fd_out, count = None, digests = None):
+        result = LogRotateCopier.copy_data(self, fd_in, fd_out, count,
+                digests)
+        self.calls += 1
+        if self.appends:
+            data = 'x' * self.appends.pop(0)
+            f = open(self.source, 'ab')
+            f.write(data)
+            f.close()
+            self.written += data
+        return result
+
+#========================================================================
+
+class CopyTruncateTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_copy.')
+        self.source = os.path.join(self.workdir, 'messages')
+        self.target = self.source + '.1'
+        self.content = 'line of the logfile\n' * 1000
+        f = open(self.source, 'wb')
+        f.write(self.content)
+        f.close()
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def _check(self, copier, lost):
+        # the copied and the lost data are everything written
+        copied = open(self.target, 'rb').read()
+        self.assertEqual(copied + 'x' * lost, self.content + copier.written)
+        self.assertEqual(os.path.getsize(self.source), 0)
+
+    #------------------------------------------------------------
+    def test_without_writer(self):
+        copier = WritingCopier(self.source, [])
+        (strategy, lost) = copier.copy_truncate(self.source, self.target,
+                1024)
+        self.assertEqual(lost, 0)
+        self.assertEqual(copier.calls, 1)
+        self._check(copier, lost)
+
+    #------------------------------------------------------------
+    def test_delta_below_threshold(self):
+        # no catch-up round, the final round and the loss behind it
+        copier = WritingCopier(self.source, [100, 200])
+        (strategy, lost) = copier.copy_truncate(self.source, self.target,
+                1024)
+        self.assertEqual(copier.calls, 2)
+        self.assertEqual(lost, 200)
+        self._check(copier, lost)
+
+    #------------------------------------------------------------
+    def test_catch_up_rounds(self):
+        copier = WritingCopier(self.source, [5000, 3000, 500, 50])
+        (strategy, lost) = copier.copy_truncate(self.source, self.target,
+                1024)
+        # two catch-up rounds and the final round
+        self.assertEqual(copier.calls, 4)
+        self.assertEqual(lost, 50)
+        self._check(copier, lost)
+
+    #------------------------------------------------------------
+    def test_round_limit(self):
+        # the writer outpaces the copying
+        copier = WritingCopier(self.source, [10000] * 100)
+        (strategy, lost) = copier.copy_truncate(self.source, self.target,
+                1024)
+        self.assertEqual(copier.calls, catchup_max_rounds + 2)
+        self.assertEqual(lost, 10000)
+        self._check(copier, lost)
+
+#========================================================================
+
+if __name__ == "__main__":
+    unittest.main()
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: tests of the module LogRotate.Digest
+'''
+
+import os
+import os.path
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..')))
+
+from LogRotate.Digest import update_manifest
+
+#========================================================================
+
+class UpdateManifestTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_digest.')
+        self.manifest = os.path.join(self.workdir, 'SHA256SUMS')
+        self.names = ('app', 'app.log', 'app.log.1', 'app.log.1.gz',
+                'app.log.1.gz.idx', 'app.log.10.gz', 'other.log.1')
+        entries = {}
+        for name in self.names:
+            entries[name] = '00ff'
+        update_manifest(self.manifest, add = entries)
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def _entries(self):
+        f = open(self.manifest)
+        try:
+            return sorted([x.split()[1] for x in f])
+        finally:
+            f.close()
+
+    #------------------------------------------------------------
+    def test_exact_name(self):
+        update_manifest(self.manifest, remove = ['app.log.1.gz.idx'],
+                extensions = ['.gz', '.bz2'])
+        expected = [x for x in self.names if x != 'app.log.1.gz.idx']
+        self.assertEqual(self._entries(), sorted(expected))
+
+    #------------------------------------------------------------
+    def test_uncompressed_version(self):
+        update_manifest(self.manifest, remove = ['app.log.1.gz'],
+                extensions = ['.gz', '.bz2'])
+        expected = [x for x in self.names
+                if x not in ('app.log.1', 'app.log.1.gz')]
+        self.assertEqual(self._entries(), sorted(expected))
+
+    #------------------------------------------------------------
+    def test_unrelated_prefixes_kept(self):
+        update_manifest(self.manifest, remove = ['app.log.10.gz'])
+        expected = [x for x in self.names if x != 'app.log.10.gz']
+        self.assertEqual(self._entries(), sorted(expected))
+
+    #------------------------------------------------------------
+    def test_rename(self):
+        update_manifest(self.manifest, rename = {'other.log.1': 'other.log.2'})
+        self.assertTrue('other.log.2' in self._entries())
+        self.assertFalse('other.log.1' in self._entries())
+
+#========================================================================
+
+if __name__ == "__main__":
+    unittest.main()
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: tests of the module LogRotate.Handler
+'''
+
+import os
+import os.path
+import sys
+import gzip
+import logging
+import shutil
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..')))
+
+from LogRotate.Handler import LogrotateHandler
+
+logging.getLogger('pylogrotate').addHandler(logging.NullHandler())
+
+#========================================================================
+
+class HandlerTestCase(unittest.TestCase):
+    '''
+    Base class for tests of a LogrotateHandler in a temporary directory.
+    '''
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_handler.')
+        self.logdir = os.path.join(self.workdir, 'logs')
+        os.mkdir(self.logdir)
+        self.handler = None
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        self.handler = None
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def _write(self, filename, content):
+        f = open(filename, 'wb')
+        f.write(content)
+        f.close()
+
+    #------------------------------------------------------------
+    def _handler(self, config, **kwargs):
+        config_file = os.path.join(self.workdir, 'logrotate.conf')
+        state_file = os.path.join(self.workdir, 'status')
+        self._write(config_file, config % {'logdir': self.logdir})
+        self._write(state_file, "Logrotate State -- Version 3\n")
+        self.handler = LogrotateHandler(config_file,
+                state_file = state_file,
+                pid_file = os.path.join(self.workdir, 'pid'),
+                **kwargs)
+        return self.handler
+
+#========================================================================
+
+class CompressTestCase(HandlerTestCase):
+
+    #------------------------------------------------------------
+    def test_no_pool_without_files(self):
+        self._write(os.path.join(self.logdir, 'app.log'), 'line\n')
+        handler = self._handler("compressjobs 2\n" +
+                "%(logdir)s/app.log {\n    compress\n}\n")
+
+        def _no_pool(max_jobs = None):
+            self.fail("A compression pool was created.")
+        handler._get_compress_pool = _no_pool
+
+        handler.compress()
+        self.assertEqual(handler.compress_pool, None)
+
+#========================================================================
+
+class PipelineTestCase(HandlerTestCase):
+
+    #------------------------------------------------------------
+    def test_rotate_and_compress(self):
+        content = 'line of the logfile\n' * 1000
+        logfiles = []
+        for name in ('app.log', 'web.log'):
+            logfile = os.path.join(self.logdir, name)
+            self._write(logfile, content)
+            logfiles.append(logfile)
+        handler = self._handler("compressjobs 2\n" +
+                "compresspipeline yes\n" +
+                "%(logdir)s/*.log {\n    rotate 2\n    compress\n}\n",
+                force = True)
+
+        handler.rotate()
+        # the compression is submitted already during the rotation
+        for logfile in logfiles:
+            self.assertTrue(logfile + '.0' in handler.compress_pool.submitted)
+
+        handler.compress()
+        self.assertEqual(handler.compress_pool, None)
+        for logfile in logfiles:
+            self.assertFalse(os.path.exists(logfile + '.0'))
+            f = gzip.open(logfile + '.0.gz', 'rb')
+            try:
+                self.assertEqual(f.read(), content)
+            finally:
+                f.close()
+
+#========================================================================
+
+class BudgetLevelTestCase(HandlerTestCase):
+
+    #------------------------------------------------------------
+    def _handler_budget(self, budget):
+        self.logfile = os.path.join(self.logdir, 'app.log.1')
+        self._write(self.logfile, 'line of the logfile\n' * 1000)
+        self._write(os.path.join(self.logdir, 'app.log'), 'line\n')
+        return self._handler("%(logdir)s/app.log {\n    compress\n" +
+                "    compresslevel 6\n" + budget + "}\n")
+
+    #------------------------------------------------------------
+    def test_without_budget(self):
+        handler = self._handler_budget('')
+        self.assertEqual(handler._budget_level(self.logfile, 0), 6)
+
+    #------------------------------------------------------------
+    def test_sufficient_budget(self):
+        handler = self._handler_budget("    compressbudget 1d\n")
+        self.assertEqual(handler.config[0]['compressbudget'], 86400)
+        self.assertEqual(handler._budget_level(self.logfile, 0), 6)
+        self.assertEqual(handler.compress_levels[self.logfile], 6)
+
+    #------------------------------------------------------------
+    def test_exceeded_budget(self):
+        handler = self._handler_budget("    compressbudget 1d\n")
+        handler.compress_deadlines[0] = time.time() - 1
+        self.assertEqual(handler._budget_level(self.logfile, 0), 1)
+        self.assertEqual(handler.compress_levels[self.logfile], 1)
+
+#========================================================================
+
+class IncompressibleTestCase(HandlerTestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        HandlerTestCase.setUp(self)
+        self.logfile = os.path.join(self.logdir, 'app.log')
+        self.source = self.logfile + '.1'
+        self.content = os.urandom(256 * 1024)
+        self._write(self.logfile, 'line\n')
+        self._write(self.source, self.content)
+
+    #------------------------------------------------------------
+    def _compress(self, incompressible):
+        handler = self._handler("%(logdir)s/app.log {\n    compress\n" +
+                "    incompressible " + incompressible + "\n}\n")
+        handler._compress_file(self.source, 0)
+
+    #------------------------------------------------------------
+    def test_skip(self):
+        self._compress('95%%')
+        self.assertEqual(open(self.source, 'rb').read(), self.content)
+        self.assertFalse(os.path.exists(self.source + '.gz'))
+
+    #------------------------------------------------------------
+    def test_store(self):
+        self._compress('0.95 store')
+        self.assertFalse(os.path.exists(self.source))
+        # stored with level 0 the gzip file is larger than its content
+        self.assertTrue(
+                os.path.getsize(self.source + '.gz') > len(self.content))
+        f = gzip.open(self.source + '.gz', 'rb')
+        try:
+            self.assertEqual(f.read(), self.content)
+        finally:
+            f.close()
+
+    #------------------------------------------------------------
+    def test_compressible(self):
+        content = 'line of the logfile\n' * 10000
+        self._write(self.source, content)
+        self._compress('95%%')
+        self.assertFalse(os.path.exists(self.source))
+        self.assertTrue(
+                os.path.getsize(self.source + '.gz') < len(content) / 10)
+
+#========================================================================
+
+class BundleTestCase(HandlerTestCase):
+
+    #------------------------------------------------------------
+    def _run(self):
+        for name in ('app.log', 'web.log'):
+            self._write(os.path.join(self.logdir, name), 'line\n' * 100)
+        handler = self._handler(
+                "%(logdir)s/app.log {\n    rotate 1\n    bundle\n}\n" +
+                "%(logdir)s/web.log {\n    rotate 1\n    bundle\n}\n",
+                force = True)
+        handler.rotate()
+        handler.compress()
+        self.handler = None
+
+    #------------------------------------------------------------
+    def _bundles(self, name):
+        return [x for x in os.listdir(self.logdir)
+                if x.startswith(name + '-') and x.endswith('.tar.gz')]
+
+    #------------------------------------------------------------
+    def test_default_names(self):
+        self._run()
+        self.assertEqual(len(self._bundles('app.log')), 1)
+        self.assertEqual(len(self._bundles('web.log')), 1)
+        # the rotated logfiles are removed after packing
+        self.assertEqual(sorted(os.listdir(self.logdir)),
+                sorted(self._bundles('app.log') + self._bundles('web.log')))
+
+    #------------------------------------------------------------
+    def test_retention_per_definition(self):
+        self._run()
+        self._run()
+        self.assertEqual(len(self._bundles('app.log')), 1)
+        self.assertEqual(len(self._bundles('web.log')), 1)
+
+#========================================================================
+
+class DeviceLimitTestCase(HandlerTestCase):
+
+    #------------------------------------------------------------
+    def test_devicejobs(self):
+        self._write(os.path.join(self.logdir, 'app.log'), 'line\n')
+        handler = self._handler("devicejobs 3\n" +
+                "%(logdir)s/app.log {\n    compress\n}\n")
+        device = os.stat(self.logdir).st_dev
+        self.assertEqual(handler._device_limit(device), 3)
+        self.assertEqual(handler.device_limits, {device: 3})
+
+#========================================================================
+
+class MaxTotalSizeTestCase(HandlerTestCase):
+
+    #------------------------------------------------------------
+    def _collect(self, maxtotalsize):
+        self._write(os.path.join(self.logdir, 'app.log'), 'line\n')
+        handler = self._handler("%(logdir)s/app.log {\n" +
+                "    rotate 10\n    maxtotalsize " + maxtotalsize + "\n}\n")
+        oldfiles = {}
+        sizes = {}
+        for i in range(1, 5):
+            oldfile = os.path.join(self.logdir, 'app.log.%d' % (i))
+            oldfiles[oldfile] = 1000000 - i
+            sizes[oldfile] = 100
+        return handler._collect_files_delete(oldfiles, 0, sizes)
+
+    #------------------------------------------------------------
+    def test_keeps_newest(self):
+        result = self._collect('250')
+        self.assertEqual(sorted(result),
+                [os.path.join(self.logdir, 'app.log.3'),
+                 os.path.join(self.logdir, 'app.log.4')])
+
+    #------------------------------------------------------------
+    def test_below_limit(self):
+        self.assertEqual(self._collect('400'), [])
+
+    #------------------------------------------------------------
+    def test_newest_kept_always(self):
+        result = self._collect('10')
+        self.assertEqual(len(result), 3)
+        self.assertFalse(os.path.join(self.logdir, 'app.log.1') in result)
+
+#========================================================================
+
+class PurgeTestCase(HandlerTestCase):
+
+    #------------------------------------------------------------
+    def test_purge_candidates_not_compressed(self):
+        logfile = os.path.join(self.logdir, 'app.log')
+        self._write(logfile, 'line\n' * 100)
+        self._write(logfile + '.0', 'line\n' * 100)
+        os.utime(logfile + '.0', (1000000, 1000000))
+        handler = self._handler("compressjobs 2\n" +
+                "compresspipeline yes\n" +
+                "minfreespace 99.9%%\n" +
+                "%(logdir)s/app.log {\n    rotate 5\n    compress\n" +
+                "    delaycompress 1\n}\n", force = True)
+
+        handler.rotate()
+        self.assertTrue(logfile + '.1' in handler.files_keep)
+        self.assertTrue(logfile + '.1' in handler.files_compress)
+        self.assertFalse(logfile + '.1' in handler.compress_pool.submitted)
+
+        handler.delete_oldfiles()
+        handler.compress()
+        self.assertEqual(os.listdir(self.logdir), ['app.log.0'])
+
+#========================================================================
+
+class RecoverMigrationsTestCase(HandlerTestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        HandlerTestCase.setUp(self)
+        self.content = 'line of the logfile\n' * 100
+        self._write(os.path.join(self.logdir, 'app.log'), 'line\n')
+        self.staging = os.path.join(self.logdir, '.app.log.1.migrating')
+        self._write(self.staging, self.content)
+
+    #------------------------------------------------------------
+    def test_resume_into_olddir(self):
+        olddir = os.path.join(self.workdir, 'old')
+        os.mkdir(olddir)
+        handler = self._handler("%(logdir)s/app.log {\n" +
+                "    olddir " + olddir + "\n}\n")
+        handler._recover_migrations()
+        self.assertFalse(os.path.exists(self.staging))
+        self.assertEqual(
+                open(os.path.join(olddir, 'app.log.1'), 'rb').read(),
+                self.content)
+
+    #------------------------------------------------------------
+    def test_rename_back_without_olddir(self):
+        handler = self._handler("%(logdir)s/app.log {\n    rotate 2\n}\n")
+        handler._recover_migrations()
+        self.assertFalse(os.path.exists(self.staging))
+        self.assertEqual(
+                open(os.path.join(self.logdir, 'app.log.1'), 'rb').read(),
+                self.content)
+
+#========================================================================
+
+class AtomicCompressionTestCase(HandlerTestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        HandlerTestCase.setUp(self)
+        self.logfile = os.path.join(self.logdir, 'app.log')
+        self.source = self.logfile + '.1'
+        self.target = self.source + '.gz'
+        self.content = 'line of the logfile\n' * 100
+        self._write(self.logfile, 'line\n')
+        self._write(self.source, self.content)
+        self._handler("%(logdir)s/app.log {\n    compress\n}\n")
+
+    #------------------------------------------------------------
+    def _read_target(self):
+        f = gzip.open(self.target, 'rb')
+        try:
+            return f.read()
+        finally:
+            f.close()
+
+    #------------------------------------------------------------
+    def test_orphaned_tempfiles_removed(self):
+        orphan = os.path.join(self.logdir, '.app.log.2.gz.compressing')
+        self._write(orphan, 'partial')
+        self.handler._remove_compress_tempfiles()
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(self.logfile))
+        self.assertTrue(os.path.exists(self.source))
+
+    #------------------------------------------------------------
+    def test_rename_before_unlink(self):
+        tempfile = os.path.join(self.logdir, '.app.log.1.gz.compressing')
+        self._write(tempfile, 'compressed')
+        calls = []
+        rename = os.rename
+        remove = os.remove
+
+        def _rename(old, new):
+            calls.append(('rename', new))
+            rename(old, new)
+
+        def _remove(filename):
+            calls.append(('remove', filename))
+            remove(filename)
+
+        os.rename = _rename
+        os.remove = _remove
+        try:
+            self.assertTrue(self.handler._finish_compression(self.source,
+                    tempfile, self.target))
+        finally:
+            os.rename = rename
+            os.remove = remove
+
+        self.assertEqual(calls, [('rename', self.target),
+                                 ('remove', self.source)])
+        self.assertFalse(os.path.exists(tempfile))
+
+    #------------------------------------------------------------
+    def test_external_command(self):
+        self.assertTrue(self.handler._compress_external(self.source,
+                self.target, 'gzip', '-9'))
+        self.assertEqual(self._read_target(), self.content)
+        self.assertFalse(os.path.exists(self.source))
+        self.assertEqual(sorted(os.listdir(self.logdir)),
+                ['app.log', 'app.log.1.gz'])
+
+    #------------------------------------------------------------
+    def test_failed_external_command(self):
+        # like gzip, but failing after writing a part of the output
+        command = os.path.join(self.workdir, 'failing_gzip')
+        self._write(command, "#!/bin/sh\n" +
+                "if [ \"$1\" = \"-c\" ]; then\n" +
+                "    echo partial\n" +
+                "else\n" +
+                "    echo partial > \"$1.gz\"\n" +
+                "fi\n" +
+                "exit 1\n")
+        os.chmod(command, 0755)
+        # a failing command leaves neither a target nor a tempfile
+        self.assertFalse(self.handler._compress_external(self.source,
+                self.target, command, None))
+        self.assertEqual(sorted(os.listdir(self.logdir)),
+                ['app.log', 'app.log.1'])
+
+#========================================================================
+
+if __name__ == "__main__":
+    unittest.main()
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: tests of the module LogRotate.JobPool
+'''
+
+import os
+import os.path
+import sys
+import time
+import logging
+import multiprocessing
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..')))
+
+from LogRotate.JobPool import LogRotateJobPool
+from LogRotate.JobPool import LogRotateJobPoolError
+
+logging.getLogger('pylogrotate').addHandler(logging.NullHandler())
+
+#========================================================================
+
+class Counter(object):
+    '''
+    Counts the running jobs of all worker processes in shared memory
+    and remembers the maximum.
+    '''
+
+    #------------------------------------------------------------
+    def __init__(self):
+        self.state = multiprocessing.RawArray('i', [0, 0])
+        self.lock = multiprocessing.Lock()
+
+    #------------------------------------------------------------
+    def job(self, duration = 0.1):
+        self.lock.acquire()
+        self.state[0] += 1
+        self.state[1] = max(self.state[0], self.state[1])
+        self.lock.release()
+        time.sleep(duration)
+        self.lock.acquire()
+        self.state[0] -= 1
+        self.lock.release()
+        return True
+
+    #------------------------------------------------------------
+    def maximum(self):
+        return self.state[1]
+
+#========================================================================
+
+class JobPoolTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def test_max_jobs(self):
+        counter = Counter()
+        pool = LogRotateJobPool(max_jobs = 2)
+        for i in range(6):
+            pool.submit('job%d' % (i), counter.job)
+        self.assertTrue(pool.wait())
+        self.assertEqual(counter.maximum(), 2)
+        self.assertEqual(pool.failed, [])
+
+    #------------------------------------------------------------
+    def test_submit_doesnt_block(self):
+        counter = Counter()
+        pool = LogRotateJobPool(max_jobs = 1)
+        start = time.time()
+        for i in range(3):
+            pool.submit('job%d' % (i), counter.job, 0.2)
+        self.assertTrue(time.time() - start < 0.2)
+        self.assertEqual(len(pool.pending), 2)
+        self.assertTrue(pool.wait())
+
+    #------------------------------------------------------------
+    def test_wait_for_names(self):
+        counter = Counter()
+        pool = LogRotateJobPool(max_jobs = 1)
+        pool.submit('short', counter.job, 0.05)
+        pool.submit('long', counter.job, 0.5)
+        self.assertTrue(pool.wait(['short']))
+        # the other job is still running
+        self.assertTrue('long' in pool.running)
+        self.assertTrue(pool.wait())
+        self.assertEqual(pool.running, {})
+
+    #------------------------------------------------------------
+    def test_failed_jobs(self):
+        def _fail():
+            return False
+        def _raise():
+            raise ValueError('broken job')
+        pool = LogRotateJobPool(max_jobs = 2)
+        pool.submit('fail', _fail)
+        pool.submit('raise', _raise)
+        pool.submit('ok', lambda: True)
+        self.assertFalse(pool.wait())
+        self.assertEqual(sorted(pool.failed), ['fail', 'raise'])
+
+    #------------------------------------------------------------
+    def test_group_limit(self):
+        counters = {'disk': Counter(), 'ssd': Counter()}
+        limits = {'disk': 1, 'ssd': None}
+        pool = LogRotateJobPool(max_jobs = 4,
+                group_limit = lambda group: limits[group])
+        for i in range(3):
+            for group in ('disk', 'ssd'):
+                pool.submit('%s%d' % (group, i), counters[group].job,
+                        group = group)
+        self.assertTrue(pool.wait())
+        self.assertEqual(counters['disk'].maximum(), 1)
+        self.assertEqual(counters['ssd'].maximum(), 3)
+
+    #------------------------------------------------------------
+    def test_invalid_max_jobs(self):
+        self.assertRaises(LogRotateJobPoolError, LogRotateJobPool,
+                max_jobs = 0)
+
+#========================================================================
+
+class PriorityTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def test_nice(self):
+        level = min(os.nice(0) + 5, 19)
+        def _check():
+            return os.nice(0) == level
+        pool = LogRotateJobPool(max_jobs = 1, nice = level)
+        pool.submit('nice', _check)
+        self.assertTrue(pool.wait())
+        # the parent keeps its own priority
+        self.assertNotEqual(os.nice(0), level)
+
+    #------------------------------------------------------------
+    def test_affinity(self):
+        status = '/proc/self/status'
+        if not os.path.exists(status):
+            return
+        def _check():
+            for line in open(status):
+                if line.startswith('Cpus_allowed_list:'):
+                    return line.split()[1] == '0'
+            return False
+        pool = LogRotateJobPool(max_jobs = 1, affinity = [0])
+        pool.submit('affinity', _check)
+        self.assertTrue(pool.wait())
+
+#========================================================================
+
+if __name__ == "__main__":
+    unittest.main()
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
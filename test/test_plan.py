@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: tests of the module LogRotate.Plan
+'''
+
+import os
+import os.path
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..')))
+
+from LogRotate.Plan import _to_str
+from LogRotate.Plan import locality_sorted
+from LogRotate.Plan import LogRotatePlan
+from LogRotate.Plan import LogRotatePlanError
+
+#========================================================================
+
+class ToStrTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def test_nested(self):
+        value = {u'files': [u'/var/log/m\xe4il.log', 1, None],
+                 u'olddir': {u'dirname': u'old'}}
+        res = _to_str(value)
+        self.assertEqual(res, {'files': ['/var/log/m\xc3\xa4il.log', 1, None],
+                               'olddir': {'dirname': 'old'}})
+        self.assertTrue(isinstance(res.keys()[0], str))
+        self.assertTrue(isinstance(res['files'][0], str))
+
+#========================================================================
+
+class PlanTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_plan.')
+        self.filename = os.path.join(self.workdir, 'plan.json')
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def test_round_trip(self):
+        entry = {
+            'logfile':    '/var/log/m\xc3\xa4il.log',
+            'desc_index': 0,
+            'olddir':     '.',
+            'method':     'move',
+            'rotations':  {'move': [{'from': 'a.1', 'to': 'a.2'}]},
+            'delete':     ['/var/log/m\xc3\xa4il.log.5.gz'],
+            'compress':   [],
+            'mail':       [],
+        }
+        plan = LogRotatePlan(config_file = '/etc/logrotate.conf')
+        plan.add_rotation(entry)
+        plan.save(self.filename)
+
+        loaded = LogRotatePlan()
+        loaded.load(self.filename)
+        self.assertEqual(loaded.config_file, '/etc/logrotate.conf')
+        self.assertEqual(loaded.created, plan.created)
+        self.assertEqual(loaded.rotations, [entry])
+        self.assertTrue(isinstance(loaded.rotations[0]['logfile'], str))
+
+    #------------------------------------------------------------
+    def test_missing_key(self):
+        plan = LogRotatePlan()
+        plan.add_rotation({'logfile': '/var/log/messages'})
+        plan.save(self.filename)
+        self.assertRaises(LogRotatePlanError,
+                LogRotatePlan().load, self.filename)
+
+    #------------------------------------------------------------
+    def test_invalid_json(self):
+        f = open(self.filename, 'w')
+        f.write('{"format": ')
+        f.close()
+        self.assertRaises(LogRotatePlanError,
+                LogRotatePlan().load, self.filename)
+
+#========================================================================
+
+class LocalitySortedTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_plan.')
+        for name in ('a', 'b'):
+            os.mkdir(os.path.join(self.workdir, name))
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def test_grouped_by_directory(self):
+        a = os.path.join(self.workdir, 'a')
+        b = os.path.join(self.workdir, 'b')
+        files = [os.path.join(b, 'x.log'), os.path.join(a, 'Z.log'),
+                 os.path.join(b, 'a.log'), os.path.join(a, 'y.log')]
+        res = locality_sorted(files)
+        self.assertEqual(res, [os.path.join(a, 'y.log'),
+                               os.path.join(a, 'Z.log'),
+                               os.path.join(b, 'a.log'),
+                               os.path.join(b, 'x.log')])
+
+    #------------------------------------------------------------
+    def test_missing_directory(self):
+        missing = os.path.join(self.workdir, 'missing', 'x.log')
+        existing = os.path.join(self.workdir, 'a', 'x.log')
+        res = locality_sorted([existing, missing])
+        # directories which can't be stated come first
+        self.assertEqual(res, [missing, existing])
+
+#========================================================================
+
+if __name__ == "__main__":
+    unittest.main()
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
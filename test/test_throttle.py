@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: tests of the module LogRotate.Throttle
+'''
+
+import os
+import os.path
+import sys
+import time
+import multiprocessing
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..')))
+
+from LogRotate.Throttle import LogRotateTokenBucket
+
+#========================================================================
+
+class TokenBucketTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def test_burst_without_waiting(self):
+        bucket = LogRotateTokenBucket(1000000, 10000)
+        self.assertEqual(bucket.consume(10000), 0.0)
+
+    #------------------------------------------------------------
+    def test_debt_is_paid_off_by_the_rate(self):
+        bucket = LogRotateTokenBucket(1000000, 10000)
+        start = time.time()
+        waited = bucket.consume(10000 + 200000)
+        self.assertTrue(0.15 < waited <= 0.2)
+        self.assertTrue(time.time() - start >= waited)
+
+    #------------------------------------------------------------
+    def test_average_rate(self):
+        bucket = LogRotateTokenBucket(1000000, 1000)
+        start = time.time()
+        for i in range(10):
+            bucket.consume(30000)
+        elapsed = time.time() - start
+        # 300 kB at 1 MB/s minus the initial burst
+        self.assertTrue(elapsed >= 0.29)
+
+    #------------------------------------------------------------
+    def test_shared_by_processes(self):
+        bucket = LogRotateTokenBucket(100000, 10000)
+        proc = multiprocessing.Process(target = bucket.consume,
+                args = (10000, ))
+        proc.start()
+        proc.join()
+        # the bucket was emptied by the other process
+        self.assertTrue(bucket.consume(10000) > 0.05)
+
+#========================================================================
+
+if __name__ == "__main__":
+    unittest.main()
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab
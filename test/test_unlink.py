@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# $Id$
+# $URL$
+
+'''
+@author: Frank Brehm
+@contact: frank@brehm-online.com
+@license: GPL3
+@copyright: (c) 2010-2011 by Frank Brehm, Berlin
+@version: 0.1.0
+@summary: tests of the module LogRotate.Unlink
+'''
+
+import os
+import os.path
+import sys
+import time
+import errno
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..')))
+
+from LogRotate.Unlink import shrink_file
+from LogRotate.Unlink import LogRotateDeleter
+
+import LogRotate.Throttle
+from LogRotate.Throttle import LogRotateTokenBucket
+
+#========================================================================
+
+class ShrinkFileTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_unlink.')
+        self.filename = os.path.join(self.workdir, 'messages.1')
+        self.content = ''.join([chr(i % 256) for i in range(10500)])
+        f = open(self.filename, 'wb')
+        f.write(self.content)
+        f.close()
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        LogRotate.Throttle.bucket = None
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def test_steps(self):
+        steps = shrink_file(self.filename, step = 1000, pause = 0)
+        self.assertEqual(steps, 10)
+        # truncated from the end, the beginning is untouched
+        self.assertEqual(open(self.filename, 'rb').read(),
+                self.content[:500])
+
+    #------------------------------------------------------------
+    def test_small_file(self):
+        steps = shrink_file(self.filename, step = 20000, pause = 0)
+        self.assertEqual(steps, 0)
+        self.assertEqual(os.path.getsize(self.filename), len(self.content))
+
+    #------------------------------------------------------------
+    def test_symlink_not_followed(self):
+        link = os.path.join(self.workdir, 'link')
+        os.symlink(self.filename, link)
+        try:
+            shrink_file(link, step = 1000, pause = 0)
+        except OSError, e:
+            self.assertEqual(e.errno, errno.ELOOP)
+        else:
+            self.fail("shrink_file() followed a symlink.")
+        self.assertEqual(os.path.getsize(self.filename), len(self.content))
+
+    #------------------------------------------------------------
+    def test_throttled(self):
+        LogRotate.Throttle.bucket = LogRotateTokenBucket(50000, 1000)
+        start = time.time()
+        steps = shrink_file(self.filename, step = 1000, pause = 0)
+        elapsed = time.time() - start
+        self.assertEqual(steps, 10)
+        # 10 steps of 1000 bytes at 50 kB/s minus the burst
+        self.assertTrue(elapsed >= 0.17)
+
+    #------------------------------------------------------------
+    def test_gradual_delete(self):
+        deleter = LogRotateDeleter(truncate_threshold = 5000,
+                truncate_step = 1000, truncate_pause = 0)
+        deleter.delete([self.filename])
+        self.assertFalse(os.path.exists(self.filename))
+
+#========================================================================
+
+class DeleterTestCase(unittest.TestCase):
+
+    #------------------------------------------------------------
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix = 'test_unlink.')
+        self.files = []
+        for directory in ('a', 'b', 'c'):
+            os.mkdir(os.path.join(self.workdir, directory))
+            for i in range(20):
+                filename = os.path.join(self.workdir, directory,
+                        'messages.%d' % (i))
+                f = open(filename, 'wb')
+                f.write('x' * 100)
+                f.close()
+                self.files.append(filename)
+
+    #------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    #------------------------------------------------------------
+    def _open_fds(self):
+        return len(os.listdir('/proc/self/fd'))
+
+    #------------------------------------------------------------
+    def test_delete(self):
+        fds = self._open_fds()
+        deleter = LogRotateDeleter(max_jobs = 4)
+        deleted = deleter.delete(self.files)
+
+        for directory in ('a', 'b', 'c'):
+            path = os.path.join(self.workdir, directory)
+            self.assertEqual(os.listdir(path), [])
+            self.assertEqual(sorted(deleted[path]),
+                    sorted(['messages.%d' % (i) for i in range(20)]))
+        self.assertEqual(deleter.files, 60)
+        self.assertEqual(deleter.bytes, 6000)
+        self.assertEqual(deleter.errors, 0)
+        # all directories are closed again
+        self.assertEqual(self._open_fds(), fds)
+
+    #------------------------------------------------------------
+    def test_missing_file(self):
+        missing = os.path.join(self.workdir, 'a', 'missing')
+        deleter = LogRotateDeleter(max_jobs = 2)
+        deleted = deleter.delete([missing] + self.files[:5])
+        self.assertEqual(deleter.errors, 1)
+        self.assertEqual(len(deleted[os.path.dirname(missing)]), 5)
+        for filename in self.files[:5]:
+            self.assertFalse(os.path.exists(filename))
+
+    #------------------------------------------------------------
+    def test_test_mode(self):
+        deleter = LogRotateDeleter(test_mode = True)
+        deleted = deleter.delete(self.files)
+        self.assertEqual(sum([len(x) for x in deleted.values()]), 60)
+        for filename in self.files:
+            self.assertTrue(os.path.exists(filename))
+
+#========================================================================
+
+if __name__ == "__main__":
+    unittest.main()
+
+#========================================================================
+
+# vim: fileencoding=utf-8 filetype=python ts=4 expandtab